@@ -1,5 +1,7 @@
 from langchain.tools import BaseTool
+import hashlib
 import json
+import time
 from pydoc import doc
 from typing import Iterator
 from langchain.document_loaders.base import BaseLoader
@@ -7,6 +9,9 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.vectorstores.base import VectorStore
 from langchain.docstore.document import Document
 from pydantic import BaseModel as PydanticBaseModel, Field
+from assistant_core._knowledge.bm25 import BM25Index
+from assistant_core._knowledge.embedding_cache import embed_queries
+from assistant_core._knowledge.query_cache import QueryCache
 
 
 class BaseModel(PydanticBaseModel):
@@ -14,10 +19,69 @@ class BaseModel(PydanticBaseModel):
         arbitrary_types_allowed = True
 
 
+def chunk_id(document: Document) -> str:
+    """Deterministic id of a chunk built from its source, position and content"""
+    content_hash = hashlib.sha256(document.page_content.encode("utf-8")).hexdigest()
+    key = "|".join(
+        str(document.metadata.get(field, ""))
+        for field in ("source", "page", "start_index")
+    )
+    return hashlib.sha256(f"{key}|{content_hash}".encode("utf-8")).hexdigest()
+
+
+def reciprocal_rank_fusion(
+    result_lists: list[list[Document]], k: int = 60
+) -> list[Document]:
+    """Merges ranked result lists, deduplicating documents by id (or content).
+
+    Each document scores the sum of 1 / (k + rank) over the lists it appears in.
+    """
+    scores: dict[str, float] = {}
+    documents: dict[str, Document] = {}
+    for results in result_lists:
+        for rank, document in enumerate(results, 1):
+            key = document.id or document.page_content
+            documents.setdefault(key, document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def _format_documents(documents: list[Document]) -> str:
+    formatted_results = []
+    for i, doc in enumerate(documents, 1):
+        formatted_results.append(f"Document {i}:\n{doc.page_content}\n")
+    return "\n".join(formatted_results)
+
+
+class StageStats(BaseModel):
+    """Throughput counters of one ingestion stage"""
+
+    files: int = 0
+    chunks: int = 0
+    busy_seconds: float = 0.0
+    idle_seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.busy_seconds if self.busy_seconds else 0.0
+
+
+class IngestionStats(BaseModel):
+    """Per-stage statistics of the last AssistantKnowledge.load call"""
+
+    parse: StageStats = Field(default_factory=StageStats)
+    embed: StageStats = Field(default_factory=StageStats)
+    max_queued_files: int = 0
+    wall_seconds: float = 0.0
+
+
 class AssistantKnowledge(BaseModel):
     loader: BaseLoader | None = None
     vector_db: VectorStore | None = None
     num_documents: int = 0
+    stats: IngestionStats = Field(default_factory=IngestionStats)
+    query_cache: QueryCache | None = None
+    keyword_index: BM25Index | None = None
 
     @property
     def document_lists(self) -> Iterator[list[Document]]:
@@ -26,26 +90,264 @@ class AssistantKnowledge(BaseModel):
         """
         raise NotImplementedError
 
-    def search(self, query: str, num_documents: int | None = None) -> list[str]:
-        """ "Returns relevant documents matching the query"""
+    def search(
+        self, query: str, num_documents: int | None = None, mode: str = "vector"
+    ) -> list[str]:
+        """ "Returns relevant documents matching the query
+
+        Args:
+            query (str): The search query.
+            num_documents (int, optional): Number of documents to return.
+            mode (str): "vector" for similarity search, "keyword" for BM25 over the
+                keyword index or "hybrid" to fuse both rankings with reciprocal rank fusion.
+        """
 
         _num_documents = num_documents or self.num_documents
 
-        return self.vector_db.similarity_search(query, k=_num_documents)
+        if mode == "vector":
+            return self._vector_search(query, _num_documents)
+        if self.keyword_index is None:
+            raise Exception("No keyword index provided")
+        if mode == "keyword":
+            return self._keyword_search(query, _num_documents)
+        if mode == "hybrid":
+            # Fetch deeper lists so documents ranked well by only one retriever still surface
+            fetch_k = 2 * _num_documents
+            return reciprocal_rank_fusion(
+                [
+                    self._vector_search(query, fetch_k),
+                    self._keyword_search(query, fetch_k),
+                ]
+            )[:_num_documents]
+        raise ValueError(f"Unknown search mode {mode}")
+
+    def _keyword_search(self, query: str, num_documents: int) -> list[Document]:
+        ids = [doc_id for doc_id, _ in self.keyword_index.search(query, num_documents)]
+        documents = self._documents_by_ids(ids)
+        return [documents[doc_id] for doc_id in ids if doc_id in documents]
+
+    def _vector_search(self, query: str, _num_documents: int) -> list[Document]:
+        if self.query_cache is None:
+            return self.vector_db.similarity_search(query, k=_num_documents)
+
+        cached = self.query_cache.get(query, _num_documents)
+        if cached is not None:
+            return cached
+
+        embedding = self.vector_db.embeddings.embed_query(query)
+        results = self.query_cache.get_similar(embedding, _num_documents)
+        if results is None:
+            results = self.vector_db.similarity_search_by_vector(
+                embedding, k=_num_documents
+            )
+        self.query_cache.put(query, _num_documents, results, embedding)
+        return results
+
+    def _search_vectors(
+        self, embeddings: list[list[float]], num_documents: int
+    ) -> list[list[Document]]:
+        if not embeddings:
+            return []
+        if hasattr(self.vector_db, "similarity_search_with_score_by_vectors"):
+            hits = self.vector_db.similarity_search_with_score_by_vectors(
+                embeddings, k=num_documents
+            )
+            return [[doc for doc, _ in query_hits] for query_hits in hits]
+        return [
+            self.vector_db.similarity_search_by_vector(embedding, k=num_documents)
+            for embedding in embeddings
+        ]
+
+    def search_many(
+        self, queries: list[str], num_documents: int | None = None
+    ) -> list[Document]:
+        """Returns the num_documents most relevant documents of several queries,
+        merged and deduplicated.
+
+        The queries are embedded as queries, like in search, in one batch when the
+        embeddings support it (see embed_queries), and when the vector store supports
+        it searched with a single matrix top-k. Results are merged with reciprocal rank fusion, so documents relevant to several
+        queries come first.
+        """
+        _num_documents = num_documents or self.num_documents
+
+        result_lists: list[list[Document] | None] = [None] * len(queries)
+        if self.query_cache is not None:
+            for i, query in enumerate(queries):
+                result_lists[i] = self.query_cache.get(query, _num_documents)
+
+        pending = [i for i, results in enumerate(result_lists) if results is None]
+        embeddings = embed_queries(self.vector_db.embeddings, [queries[i] for i in pending])
+
+        to_search = []
+        for i, embedding in zip(pending, embeddings):
+            if self.query_cache is not None:
+                result_lists[i] = self.query_cache.get_similar(embedding, _num_documents)
+            if result_lists[i] is None:
+                to_search.append((i, embedding))
+
+        found = self._search_vectors([embedding for _, embedding in to_search], _num_documents)
+        for (i, _), results in zip(to_search, found):
+            result_lists[i] = results
+
+        if self.query_cache is not None:
+            for i, embedding in zip(pending, embeddings):
+                self.query_cache.put(queries[i], _num_documents, result_lists[i], embedding)
+
+        return reciprocal_rank_fusion(result_lists)[:_num_documents]
+
+    def invalidate_cache(self) -> None:
+        """Drops cached search results, call it after changing vector_db directly"""
+        if self.query_cache is not None:
+            self.query_cache.invalidate()
+
+    def chunk_lists(self) -> Iterator[list[Document]]:
+        """Iterator that yields the chunks of each list in document_lists"""
+        for document_list in self.document_lists:
+            start = time.perf_counter()
+            chunks = self._split(document_list)
+            self.stats.parse.files += 1
+            self.stats.parse.chunks += len(chunks)
+            self.stats.parse.busy_seconds += time.perf_counter() - start
+            yield chunks
+
+    def _split(self, documents: list[Document]) -> list[Document]:
+        """Splits documents into chunks that keep their offset in the source"""
+        return RecursiveCharacterTextSplitter(add_start_index=True).split_documents(
+            documents
+        )
+
+    def _stored_documents(self) -> dict[str, Document]:
+        """Returns every document in the vector store keyed by its id"""
+        if hasattr(self.vector_db, "stored_documents"):
+            return self.vector_db.stored_documents()
+
+        docstore = getattr(self.vector_db, "docstore", None)
+        if docstore is not None and isinstance(getattr(docstore, "_dict", None), dict):
+            return dict(docstore._dict)
+
+        store = getattr(self.vector_db, "store", None)
+        if isinstance(store, dict):
+            return {
+                doc_id: Document(
+                    id=doc_id, page_content=record["text"], metadata=record["metadata"]
+                )
+                for doc_id, record in store.items()
+            }
+
+        raise NotImplementedError(
+            f"{type(self.vector_db).__name__} does not expose its stored documents"
+        )
+
+    def _documents_by_ids(self, ids: list[str]) -> dict[str, Document]:
+        """Returns the stored documents among ids keyed by their id. FAISS only gained
+        get_by_ids in later langchain-community releases, so its docstore is read directly."""
+        docstore = getattr(self.vector_db, "docstore", None)
+        if docstore is not None and isinstance(getattr(docstore, "_dict", None), dict):
+            stored = docstore._dict
+        else:
+            try:
+                documents = self.vector_db.get_by_ids(ids)
+                return {doc.id: doc for doc in documents if doc.id is not None}
+            except NotImplementedError:
+                stored = self._stored_documents()
+        return {doc_id: stored[doc_id] for doc_id in ids if doc_id in stored}
+
+    def _ids_by_source(self) -> dict[str, set[str]]:
+        """Returns the ids of the stored chunks grouped by their source"""
+        ids_by_source: dict[str, set[str]] = {}
+        for doc_id, doc in self._stored_documents().items():
+            source = doc.metadata.get("source")
+            if source:
+                ids_by_source.setdefault(source, set()).add(doc_id)
+        return ids_by_source
+
+    def _clear(self) -> None:
+        stored_ids = list(self._stored_documents())
+        if stored_ids:
+            self.vector_db.delete(stored_ids)
+            self.invalidate_cache()
+        if self.keyword_index is not None:
+            self.keyword_index.clear()
+
+    def _load_chunks(
+        self,
+        chunks: list[Document],
+        upsert: bool,
+        skip_existing: bool,
+        ids_by_source: dict[str, set[str]] | None = None,
+    ) -> int:
+        """Adds chunks under deterministic ids and returns how many were embedded.
+
+        Chunks whose id is already stored are skipped when skip_existing is set and
+        replaced otherwise. With upsert, chunks of the same sources that are no longer
+        produced are deleted. ids_by_source (see _ids_by_source) is read from the store
+        when not given, and kept up to date, so load() reads the store only once.
+        """
+        chunks_by_id = {chunk_id(chunk): chunk for chunk in chunks}
+        ids = list(chunks_by_id)
+
+        existing_ids = set(self._documents_by_ids(ids))
+
+        ids_to_delete = [] if skip_existing else list(existing_ids)
+        if upsert:
+            if ids_by_source is None:
+                ids_by_source = self._ids_by_source()
+            for source in {chunk.metadata.get("source") for chunk in chunks} - {None, ""}:
+                stale = ids_by_source.get(source, set()) - chunks_by_id.keys()
+                ids_to_delete.extend(stale)
+                ids_by_source[source] = ids_by_source.get(source, set()) - stale
+        if ids_to_delete:
+            self.vector_db.delete(ids_to_delete)
+            if self.keyword_index is not None:
+                self.keyword_index.delete(ids_to_delete)
+
+        if skip_existing:
+            ids = [doc_id for doc_id in ids if doc_id not in existing_ids]
+        if ids:
+            documents = [chunks_by_id[doc_id] for doc_id in ids]
+            self.vector_db.add_documents(documents, ids=ids)
+            if self.keyword_index is not None:
+                self.keyword_index.add_documents(documents, ids=ids)
+            if ids_by_source is not None:
+                for doc_id, document in zip(ids, documents):
+                    if document.metadata.get("source"):
+                        ids_by_source.setdefault(document.metadata["source"], set()).add(doc_id)
+        if ids or ids_to_delete:
+            self.invalidate_cache()
+        return len(ids)
 
     def load(
         self, recreate: bool = False, upsert: bool = False, skip_existing: bool = True
     ) -> None:
+        """Loads every document of the knowledge base into the vector store.
+
+        Args:
+            recreate (bool): Remove everything from the vector store first.
+            upsert (bool): Delete stale chunks of the sources being loaded.
+            skip_existing (bool): Do not re-embed chunks that are already stored.
+        """
 
         if self.vector_db is None:
             raise Exception("No vectorDB provided")
 
-        num_documents = 0
-        for document_list in self.document_lists:
-            documents_to_load = document_list
-            num_documents += len(documents_to_load)
-            docs = self.loader.load_and_split(documents_to_load)
-            self.vector_db.add_documents(docs)
+        if recreate:
+            self._clear()
+
+        self.stats = IngestionStats()
+        start = time.perf_counter()
+        # Read once, every file only updates the entries of its own source
+        ids_by_source = self._ids_by_source() if upsert else None
+        waiting_since = start
+        for chunks in self.chunk_lists():
+            embed_start = time.perf_counter()
+            self.stats.embed.idle_seconds += embed_start - waiting_since
+            self.stats.embed.chunks += self._load_chunks(
+                chunks, upsert, skip_existing, ids_by_source)
+            self.stats.embed.files += 1
+            waiting_since = time.perf_counter()
+            self.stats.embed.busy_seconds += waiting_since - embed_start
+        self.stats.wall_seconds = time.perf_counter() - start
 
     def load_documents(
         self,
@@ -57,8 +359,9 @@ class AssistantKnowledge(BaseModel):
         if self.vector_db is None:
             raise Exception("No vectorDB provided")
 
-        docs = RecursiveCharacterTextSplitter().split_documents(documents)
-        self.vector_db.add_documents(docs)
+        if recreate:
+            self._clear()
+        self._load_chunks(self._split(documents), upsert, skip_existing)
 
     def load_document(
         self,
@@ -67,11 +370,9 @@ class AssistantKnowledge(BaseModel):
         upsert: bool = False,
         skip_existing: bool = True,
     ) -> None:
-        if self.vector_db is None:
-            raise Exception("No vectorDB provided")
-
-        docs = RecursiveCharacterTextSplitter().split_documents([document])
-        self.vector_db.add_documents(docs)
+        self.load_documents(
+            [document], recreate=recreate, upsert=upsert, skip_existing=skip_existing
+        )
 
     def load_text(
         self,
@@ -79,12 +380,15 @@ class AssistantKnowledge(BaseModel):
         recreate: bool = False,
         upsert: bool = False,
         skip_existing: bool = True,
+        source: str | None = None,
     ) -> None:
-        if self.vector_db is None:
-            raise Exception("No vectorDB provided")
-
-        docs = RecursiveCharacterTextSplitter().split_text(text)
-        self.vector_db.add_documents(docs)
+        metadata = {"source": source} if source else {}
+        self.load_documents(
+            [Document(page_content=text, metadata=metadata)],
+            recreate=recreate,
+            upsert=upsert,
+            skip_existing=skip_existing,
+        )
 
 
 class KnowledgeSearchTool(BaseTool):
@@ -93,6 +397,9 @@ class KnowledgeSearchTool(BaseTool):
     knowledge_base: AssistantKnowledge = Field(
         ..., description="The assistant's knowledge base"
     )
+    mode: str = Field(
+        "vector", description="Search mode, one of 'vector', 'keyword' or 'hybrid'"
+    )
 
     @property
     def description(self) -> str:
@@ -118,13 +425,51 @@ class KnowledgeSearchTool(BaseTool):
             if not query:
                 return "Invalid input. 'query' is required."
 
-            results = self.knowledge_base.search(query, num_documents)
+            results = self.knowledge_base.search(query, num_documents, mode=self.mode)
+
+            return _format_documents(results)
+
+        except Exception as e:
+            print(e)
+            return f"An error occurred: {str(e)}"
+
+
+class KnowledgeMultiSearchTool(BaseTool):
+    name: str = "knowledge_multi_search"
+    custom_description: str | None = None
+    knowledge_base: AssistantKnowledge = Field(
+        ..., description="The assistant's knowledge base"
+    )
+
+    @property
+    def description(self) -> str:
+
+        description_template = """
+        Args:
+            queries (list[str]): The search queries, for example several phrasings or
+                related aspects of the same question.
+            num_documents (int, optional): Number of documents to return. Defaults to 5.
+
+        Returns:
+            str: A deduplicated list of the most relevant documents matching any of the queries.
+        """
+
+        if self.custom_description:
+            return self.custom_description + "\n" + description_template
+        return (
+            "Use this tool to run several similarity searches on the assistant's knowledge base at once.\n"
+            + description_template
+        )
+
+    def _run(self, queries: list[str], num_documents: int = 5) -> str:
+        try:
+            queries = [query for query in queries if query]
+            if not queries:
+                return "Invalid input. 'queries' is required."
 
-            formatted_results = []
-            for i, doc in enumerate(results, 1):
-                formatted_results.append(f"Document {i}:\n{doc.page_content}\n")
+            results = self.knowledge_base.search_many(queries, num_documents)
 
-            return "\n".join(formatted_results)
+            return _format_documents(results)
 
         except Exception as e:
             print(e)
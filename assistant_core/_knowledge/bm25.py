@@ -0,0 +1,119 @@
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+
+from langchain_core.documents import Document
+from pydantic import BaseModel, PrivateAttr
+
+# Keeps identifiers such as part numbers ("ab-1234", "v2.1") as single terms
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index(BaseModel):
+    """
+    Inverted index scoring chunks with Okapi BM25.
+
+    Only chunk ids are stored, so results are resolved to documents through the
+    vector store that holds the same chunks under the same ids.
+    """
+
+    k1: float = 1.5
+    b: float = 0.75
+
+    _postings: dict[str, dict[str, int]] = PrivateAttr(default_factory=dict)
+    _lengths: dict[str, int] = PrivateAttr(default_factory=dict)
+    _doc_terms: dict[str, list[str]] = PrivateAttr(default_factory=dict)
+    _total_length: int = PrivateAttr(default=0)
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add_documents(self, documents: list[Document], ids: list[str] | None = None) -> None:
+        ids = ids or [document.id for document in documents]
+        for doc_id, document in zip(ids, documents):
+            if doc_id in self._lengths:
+                self.delete([doc_id])
+            terms = tokenize(document.page_content)
+            frequencies = Counter(terms)
+            for term, frequency in frequencies.items():
+                self._postings.setdefault(term, {})[doc_id] = frequency
+            self._doc_terms[doc_id] = list(frequencies)
+            self._lengths[doc_id] = len(terms)
+            self._total_length += len(terms)
+
+    def delete(self, ids: list[str]) -> None:
+        for doc_id in ids:
+            if doc_id not in self._lengths:
+                continue
+            for term in self._doc_terms.pop(doc_id, []):
+                postings = self._postings[term]
+                del postings[doc_id]
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._lengths.pop(doc_id)
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._lengths.clear()
+        self._doc_terms.clear()
+        self._total_length = 0
+
+    def search(self, query: str, k: int = 4) -> list[tuple[str, float]]:
+        """Returns the (id, score) of the k best matching chunks"""
+        if not self._lengths:
+            return []
+        num_docs = len(self._lengths)
+        average_length = self._total_length / num_docs or 1
+        scores: dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (
+                    frequency + norm
+                )
+        best = heapq.nlargest(k, scores, key=scores.get)
+        return [(doc_id, scores[doc_id]) for doc_id in best]
+
+    def save_local(self, folder_path: str, index_name: str = "index") -> None:
+        os.makedirs(folder_path, exist_ok=True)
+        path = os.path.join(folder_path, f"{index_name}.bm25.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(
+                {
+                    "k1": self.k1,
+                    "b": self.b,
+                    "postings": self._postings,
+                    "lengths": self._lengths,
+                },
+                f,
+            )
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load_local(cls, folder_path: str, index_name: str = "index") -> "BM25Index | None":
+        path = os.path.join(folder_path, f"{index_name}.bm25.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index._postings = data["postings"]
+        index._lengths = data["lengths"]
+        index._total_length = sum(index._lengths.values())
+        # Chunks without any term (only punctuation) are in lengths but in no posting
+        index._doc_terms = {doc_id: [] for doc_id in index._lengths}
+        for term, postings in index._postings.items():
+            for doc_id in postings:
+                index._doc_terms.setdefault(doc_id, []).append(term)
+        return index
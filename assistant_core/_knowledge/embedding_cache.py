@@ -0,0 +1,185 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from langchain_core.embeddings.embeddings import Embeddings
+
+
+def embedding_model_id(embedding: Embeddings) -> str:
+    """Identifier of the model behind an embeddings object, used to namespace cache keys"""
+    model = getattr(embedding, "model", None) or getattr(embedding, "model_name", "")
+    return f"{embedding.__class__.__name__}:{model}"
+
+
+def embed_queries(embedding: Embeddings, queries: list[str]) -> list[list[float]]:
+    """Embeds several queries as queries (asymmetric models embed them differently
+    from documents), in one batch when the model has an embed_queries method and
+    concurrently with embed_query otherwise"""
+    if hasattr(embedding, "embed_queries"):
+        return embedding.embed_queries(queries)
+    if len(queries) <= 1:
+        return [embedding.embed_query(query) for query in queries]
+    with ThreadPoolExecutor(max_workers=min(8, len(queries))) as executor:
+        return list(executor.map(embedding.embed_query, queries))
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Persistent, content-addressed cache in front of any Embeddings.
+
+    Document vectors are stored in a SQLite database keyed by the embedding model id
+    and the SHA-256 of the chunk text, so re-indexing unchanged chunks costs a lookup
+    instead of an embedding call. The cache keeps at most `max_entries` vectors and
+    evicts the least recently used ones first. Query embeddings are not cached.
+
+    Example:
+        embedding = CachedEmbeddings(OllamaEmbeddings(model="nomic-embed-text"), "vectors/cache.db")
+        db = get_faiss("testing_dir/", "vectors/", embedding=embedding, recreate=True)
+        print(embedding.hits, embedding.misses)
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        path: str | Path,
+        namespace: str | None = None,
+        max_entries: int | None = 1_000_000,
+    ):
+        self.embedding = embedding
+        self.path = Path(path)
+        self.namespace = namespace or embedding_model_id(embedding)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, hash)
+            )"""
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()
+        return count
+
+    def _lookup(self, hashes: list[str]) -> dict[str, list[float]]:
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        # Stay below SQLite's limit on bound parameters
+        for i in range(0, len(unique), 500):
+            batch = unique[i : i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._connection.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                [self.namespace, *batch],
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+        if found:
+            self._connection.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                [(time.time(), self.namespace, key) for key in found],
+            )
+        return found
+
+    def _store(self, vectors: dict[str, list[float]]) -> None:
+        now = time.time()
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, hash, vector, last_used) VALUES (?, ?, ?, ?)",
+            [
+                (self.namespace, key, array("f", vector).tobytes(), now)
+                for key, vector in vectors.items()
+            ],
+        )
+        self._evict()
+
+    def _evict(self) -> None:
+        if self.max_entries is None:
+            return
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            self._connection.execute(
+                """DELETE FROM embeddings WHERE rowid IN (
+                    SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?
+                )""",
+                (count - self.max_entries,),
+            )
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed search docs, calling the wrapped model only for uncached texts"""
+        hashes = [self._hash(text) for text in texts]
+
+        with self._lock:
+            cached = self._lookup(hashes)
+            self._connection.commit()
+
+        missing = {key: text for key, text in zip(hashes, texts) if key not in cached}
+        # A text repeated in the call is embedded once, its other occurrences are hits
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            new_vectors = self.embedding.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            with self._lock:
+                self._store(computed)
+                self._connection.commit()
+            cached.update(computed)
+
+        return [cached[key] for key in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed query text"""
+        return self.embedding.embed_query(text)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed several query texts, not cached"""
+        return embed_queries(self.embedding, texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed query text"""
+        return await self.embedding.aembed_query(text)
+
+    def clear(self) -> None:
+        """Remove every cached vector of this model"""
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM embeddings WHERE model = ?", (self.namespace,)
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        self._connection.close()
@@ -0,0 +1,333 @@
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Iterable, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings.embeddings import Embeddings
+from langchain_core.vectorstores.base import VectorStore
+
+from assistant_core._knowledge.vector_ops import normalize, top_k
+
+FORMAT_VERSION = 1
+
+
+class MmapVectorStore(VectorStore):
+    """
+    Vector store kept in a set of append-only files that are memory-mapped on open.
+
+    Files in `folder_path`, all prefixed with `index_name`:
+        .meta.json  dimensions, row count and the byte size of the variable length files
+        .vectors    float32 matrix, one row per chunk
+        .offsets    uint64 (offset, length) of every chunk record in .docs
+        .docs       JSON records with the id, text and metadata of every chunk
+        .mask       uint8 flag per row, 0 once the row is deleted
+        .ids        chunk ids, one per line, only read for id based operations
+
+    Opening a store only maps the files, so startup cost does not depend on the
+    corpus size and the OS page cache is shared by every process that opens the
+    same index, including processes that can only read its directory. Searches scan the mapped vectors and read the records of the
+    returned hits only. Nothing is pickled, so loading an index never executes code.
+    """
+
+    def __init__(
+        self,
+        folder_path: str | Path,
+        embedding: Embeddings,
+        index_name: str = "index",
+        normalize_vectors: bool = True,
+    ):
+        self.folder_path = Path(folder_path)
+        self.index_name = index_name
+        self._embedding = embedding
+        self.folder_path.mkdir(parents=True, exist_ok=True)
+
+        if self._path("meta.json").exists():
+            with open(self._path("meta.json"), "r") as f:
+                self._meta = json.load(f)
+        else:
+            self._meta = {
+                "version": FORMAT_VERSION,
+                "dim": None,
+                "count": 0,
+                "docs_bytes": 0,
+                "ids_bytes": 0,
+                "normalize": normalize_vectors,
+            }
+        self._open()
+
+    def _path(self, suffix: str) -> Path:
+        return self.folder_path / f"{self.index_name}.{suffix}"
+
+    def _open(self) -> None:
+        count, dim = self._meta["count"], self._meta["dim"]
+        self._id_rows: dict[str, int] | None = None
+        if count == 0:
+            self._vectors = np.empty((0, dim or 0), dtype=np.float32)
+            self._offsets = np.empty((0, 2), dtype=np.uint64)
+            self._mask = np.empty((0,), dtype=np.uint8)
+            return
+        self._vectors = np.memmap(
+            self._path("vectors"), dtype=np.float32, mode="r", shape=(count, dim)
+        )
+        self._offsets = np.memmap(
+            self._path("offsets"), dtype=np.uint64, mode="r", shape=(count, 2)
+        )
+        # Read only, so readers can open an index they cannot write (see delete)
+        self._mask = np.memmap(
+            self._path("mask"), dtype=np.uint8, mode="r", shape=(count,)
+        )
+
+    def _save_meta(self) -> None:
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._mask))
+
+    def _id_to_row(self) -> dict[str, int]:
+        """Maps the id of every live row to its row, read from the ids file on first use"""
+        if self._id_rows is None:
+            self._id_rows = {}
+            if self._meta["count"]:
+                with open(self._path("ids"), "rb") as f:
+                    data = f.read(self._meta["ids_bytes"]).decode("utf-8")
+                for row, doc_id in enumerate(data.splitlines()):
+                    if self._mask[row]:
+                        self._id_rows[doc_id] = row
+        return self._id_rows
+
+    def _read_documents(self, rows: Iterable[int]) -> list[Document]:
+        rows = list(rows)
+        if not rows:
+            return []
+        documents = []
+        with open(self._path("docs"), "rb") as f:
+            for row in rows:
+                offset, length = self._offsets[row]
+                f.seek(int(offset))
+                record = json.loads(f.read(int(length)))
+                documents.append(
+                    Document(
+                        id=record["id"],
+                        page_content=record["text"],
+                        metadata=record["metadata"],
+                    )
+                )
+        return documents
+
+    def add_embeddings(
+        self,
+        texts: list[str],
+        embeddings: np.ndarray,
+        metadatas: list[dict],
+        ids: list[str],
+    ) -> list[str]:
+        """Appends already embedded texts. Rows with an id that is already stored are replaced."""
+        vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if self._meta["dim"] is None:
+            self._meta["dim"] = int(vectors.shape[1])
+        elif vectors.shape[1] != self._meta["dim"]:
+            raise ValueError(
+                f"Expected vectors of dimension {self._meta['dim']}, got {vectors.shape[1]}"
+            )
+        if self._meta["normalize"]:
+            vectors = normalize(vectors)
+
+        replaced = [doc_id for doc_id in ids if doc_id in self._id_to_row()]
+        if replaced:
+            self.delete(replaced)
+
+        count = self._meta["count"]
+        dim = self._meta["dim"]
+        # Drop anything a crashed write left after the last committed row
+        for suffix, size in (
+            ("vectors", count * dim * 4),
+            ("offsets", count * 16),
+            ("mask", count),
+            ("docs", self._meta["docs_bytes"]),
+            ("ids", self._meta["ids_bytes"]),
+        ):
+            with open(self._path(suffix), "ab") as f:
+                f.truncate(size)
+
+        offsets = np.empty((len(texts), 2), dtype=np.uint64)
+        position = self._meta["docs_bytes"]
+        with open(self._path("docs"), "ab") as f:
+            for i, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+                record = json.dumps(
+                    {"id": doc_id, "text": text, "metadata": metadata}
+                ).encode("utf-8")
+                f.write(record)
+                offsets[i] = (position, len(record))
+                position += len(record)
+        ids_data = "".join(f"{doc_id}\n" for doc_id in ids).encode("utf-8")
+
+        with open(self._path("vectors"), "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self._path("offsets"), "ab") as f:
+            f.write(offsets.tobytes())
+        with open(self._path("mask"), "ab") as f:
+            f.write(np.ones(len(texts), dtype=np.uint8).tobytes())
+        with open(self._path("ids"), "ab") as f:
+            f.write(ids_data)
+
+        self._meta["count"] = count + len(texts)
+        self._meta["docs_bytes"] = position
+        self._meta["ids_bytes"] += len(ids_data)
+        self._save_meta()
+
+        id_rows = self._id_to_row()
+        self._open()
+        self._id_rows = id_rows
+        self._id_rows.update({doc_id: count + i for i, doc_id in enumerate(ids)})
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: list[dict] | None = None,
+        *,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids found in the ids list.")
+        embeddings = self._embedding.embed_documents(texts)
+        return self.add_embeddings(texts, np.asarray(embeddings), metadatas, ids)
+
+    def delete(self, ids: list[str] | None = None, **kwargs: Any) -> bool | None:
+        """Marks rows as deleted. Space is not reclaimed."""
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        id_rows = self._id_to_row()
+        rows = [id_rows.pop(doc_id) for doc_id in ids if doc_id in id_rows]
+        if rows:
+            # Shared mappings, the read only one sees the write
+            mask = np.memmap(
+                self._path("mask"), dtype=np.uint8, mode="r+", shape=self._mask.shape
+            )
+            mask[rows] = 0
+            mask.flush()
+            del mask
+        return True
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        id_rows = self._id_to_row()
+        return self._read_documents(id_rows[doc_id] for doc_id in ids if doc_id in id_rows)
+
+    def stored_documents(self) -> dict[str, Document]:
+        """Returns every live document keyed by its id"""
+        return {doc.id: doc for doc in self._read_documents(np.flatnonzero(self._mask))}
+
+    def similarity_search_with_score_by_vectors(
+        self, embeddings: list[list[float]], k: int = 4, **kwargs: Any
+    ) -> list[list[tuple[Document, float]]]:
+        """Searches several query vectors with a single pass over the mapped vectors"""
+        queries = np.asarray(embeddings, dtype=np.float32)
+        if len(self) == 0:
+            return [[] for _ in queries]
+        if self._meta["normalize"]:
+            queries = normalize(queries)
+        scores = np.where(self._mask.astype(bool), queries @ self._vectors.T, -np.inf)
+        results = []
+        for query_scores, rows in zip(scores, top_k(scores, k)):
+            rows = [row for row in rows if np.isfinite(query_scores[row])]
+            documents = self._read_documents(rows)
+            results.append(
+                [(doc, float(query_scores[row])) for doc, row in zip(documents, rows)]
+            )
+        return results
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: list[float], k: int = 4, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vectors([embedding], k, **kwargs)[0]
+
+    def similarity_search_by_vector(
+        self, embedding: list[float], k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        return [
+            doc
+            for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)
+        ]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda score: score
+
+    def save_local(self, folder_path: str, index_name: str = "index") -> None:
+        """Every write is already persisted. Saving elsewhere copies the live rows."""
+        if Path(folder_path) == self.folder_path and index_name == self.index_name:
+            return
+        target = MmapVectorStore(
+            folder_path, self._embedding, index_name, self._meta["normalize"]
+        )
+        rows = np.flatnonzero(self._mask)
+        for start in range(0, len(rows), 1000):
+            batch = rows[start : start + 1000]
+            documents = self._read_documents(batch)
+            target.add_embeddings(
+                [doc.page_content for doc in documents],
+                np.asarray(self._vectors[batch]),
+                [doc.metadata for doc in documents],
+                [doc.id for doc in documents],
+            )
+
+    @classmethod
+    def load_local(
+        cls, folder_path: str, embeddings: Embeddings, index_name: str = "index"
+    ) -> "MmapVectorStore":
+        return cls(folder_path, embeddings, index_name)
+
+    @classmethod
+    def delete_local(cls, folder_path: str, index_name: str = "index") -> None:
+        """Removes every file of an index, including the IVF centroids NumpyVectorStore
+        saves next to it"""
+        for suffix in ("meta.json", "vectors", "offsets", "docs", "mask", "ids", "ivf.npy"):
+            path = Path(folder_path) / f"{index_name}.{suffix}"
+            if path.exists():
+                path.unlink()
+
+    @classmethod
+    def exists(cls, folder_path: str, index_name: str = "index") -> bool:
+        return (Path(folder_path) / f"{index_name}.meta.json").exists()
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: list[dict] | None = None,
+        *,
+        ids: list[str] | None = None,
+        folder_path: str | None = None,
+        index_name: str = "index",
+        **kwargs: Any,
+    ) -> "MmapVectorStore":
+        if folder_path is None:
+            raise ValueError("folder_path is required to create a MmapVectorStore")
+        store = cls(folder_path, embedding, index_name, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
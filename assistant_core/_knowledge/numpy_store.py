@@ -0,0 +1,327 @@
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Iterable, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings.embeddings import Embeddings
+from langchain_core.vectorstores.base import VectorStore
+
+from assistant_core._knowledge.mmap_store import MmapVectorStore
+from assistant_core._knowledge.vector_ops import normalize, top_k
+
+_ASSIGN_BLOCK = 65536
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid (highest inner product) of every vector"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _ASSIGN_BLOCK):
+        block = vectors[start : start + _ASSIGN_BLOCK]
+        assignments[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def kmeans(
+    vectors: np.ndarray, n_clusters: int, n_iter: int = 10, seed: int = 0
+) -> np.ndarray:
+    """Spherical k-means, returns unit length centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = normalize(vectors[rng.choice(len(vectors), n_clusters, replace=False)])
+    for _ in range(n_iter):
+        assignments = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = normalize(sums)
+    return centroids
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-memory vector store on top of a contiguous float32 NumPy matrix.
+
+    Two search modes are available:
+        exact  one matrix-vector product over every row and an argpartition top-k
+        ivf    rows are clustered with k-means into `n_lists` inverted lists and a search
+               only scores the rows of the `n_probe` lists closest to the query
+
+    The IVF lists are trained on the first IVF search (or by calling `train`), rows
+    added afterwards are assigned to the existing lists. Call `train` again after
+    large additions to rebalance them.
+
+    With metric="cosine" vectors are normalized on insert, with metric="ip" raw inner
+    products are used.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        metric: str = "cosine",
+        mode: str = "exact",
+        n_lists: int | None = None,
+        n_probe: int = 8,
+    ):
+        if metric not in ("cosine", "ip"):
+            raise ValueError(f"Unknown metric {metric}, expected 'cosine' or 'ip'")
+        if mode not in ("exact", "ivf"):
+            raise ValueError(f"Unknown mode {mode}, expected 'exact' or 'ivf'")
+        self._embedding = embedding
+        self.metric = metric
+        self.mode = mode
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._count = 0
+        self._ids: list[str] = []
+        self._documents: list[Document] = []
+        self._id_rows: dict[str, int] = {}
+        self._centroids: np.ndarray | None = None
+        self._assignments = np.empty((0,), dtype=np.int32)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the stored vectors, one row per document"""
+        return self._vectors[: self._count]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _reserve(self, extra: int, dim: int) -> None:
+        """Grows the matrix geometrically so appends are amortized O(1)"""
+        if self._vectors.shape[1] == 0:
+            self._vectors = np.empty((0, dim), dtype=np.float32)
+        elif self._vectors.shape[1] != dim:
+            raise ValueError(
+                f"Expected vectors of dimension {self._vectors.shape[1]}, got {dim}"
+            )
+        needed = self._count + extra
+        if needed <= len(self._vectors):
+            return
+        capacity = max(needed, 2 * len(self._vectors), 1024)
+        vectors = np.empty((capacity, dim), dtype=np.float32)
+        vectors[: self._count] = self._vectors[: self._count]
+        assignments = np.full(capacity, -1, dtype=np.int32)
+        assignments[: self._count] = self._assignments[: self._count]
+        self._vectors, self._assignments = vectors, assignments
+
+    def add_embeddings(
+        self,
+        texts: list[str],
+        embeddings: np.ndarray,
+        metadatas: list[dict],
+        ids: list[str],
+    ) -> list[str]:
+        """Adds already embedded texts. Rows with an id that is already stored are replaced."""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if self.metric == "cosine":
+            vectors = normalize(vectors)
+
+        replaced = [doc_id for doc_id in ids if doc_id in self._id_rows]
+        if replaced:
+            self.delete(replaced)
+
+        self._reserve(len(texts), vectors.shape[1])
+        start = self._count
+        self._vectors[start : start + len(texts)] = vectors
+        if self._centroids is not None:
+            self._assignments[start : start + len(texts)] = _assign(
+                vectors, self._centroids
+            )
+        for i, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+            self._ids.append(doc_id)
+            self._documents.append(Document(id=doc_id, page_content=text, metadata=metadata))
+            self._id_rows[doc_id] = start + i
+        self._count += len(texts)
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: list[dict] | None = None,
+        *,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids found in the ids list.")
+        embeddings = self._embedding.embed_documents(texts)
+        return self.add_embeddings(texts, np.asarray(embeddings), metadatas, ids)
+
+    def delete(self, ids: list[str] | None = None, **kwargs: Any) -> bool | None:
+        """Removes rows by moving the last row into their place, keeping the matrix contiguous"""
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        for doc_id in ids:
+            row = self._id_rows.pop(doc_id, None)
+            if row is None:
+                continue
+            last = self._count - 1
+            if row != last:
+                self._vectors[row] = self._vectors[last]
+                self._assignments[row] = self._assignments[last]
+                self._ids[row] = self._ids[last]
+                self._documents[row] = self._documents[last]
+                self._id_rows[self._ids[row]] = row
+            self._ids.pop()
+            self._documents.pop()
+            self._count -= 1
+        return True
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        return [self._documents[self._id_rows[doc_id]] for doc_id in ids if doc_id in self._id_rows]
+
+    def stored_documents(self) -> dict[str, Document]:
+        """Returns every document keyed by its id"""
+        return dict(zip(self._ids, self._documents))
+
+    def train(self, n_lists: int | None = None, n_iter: int = 10, seed: int = 0) -> None:
+        """Clusters the stored vectors into the IVF lists"""
+        if self._count == 0:
+            return
+        self.n_lists = n_lists or self.n_lists or max(1, int(np.sqrt(self._count)))
+        n_clusters = min(self.n_lists, self._count)
+        rng = np.random.default_rng(seed)
+        sample_size = min(self._count, 256 * n_clusters)
+        sample = self.vectors[rng.choice(self._count, sample_size, replace=False)]
+        self._centroids = kmeans(sample, n_clusters, n_iter=n_iter, seed=seed)
+        self._assignments[: self._count] = _assign(self.vectors, self._centroids)
+
+    def _candidate_rows(self, query: np.ndarray, n_probe: int) -> np.ndarray | None:
+        """Rows of the IVF lists closest to the query, None to search every row"""
+        if self.mode != "ivf":
+            return None
+        if self._centroids is None:
+            self.train()
+        probed = np.zeros(len(self._centroids), dtype=bool)
+        probed[top_k(self._centroids @ query, n_probe)] = True
+        return np.flatnonzero(probed[self._assignments[: self._count]])
+
+    def _search(
+        self, queries: np.ndarray, k: int, n_probe: int | None = None
+    ) -> list[list[tuple[int, float]]]:
+        """(row, score) of the top k rows for every query"""
+        if self._count == 0:
+            return [[] for _ in queries]
+        if self.metric == "cosine":
+            queries = normalize(queries)
+        n_probe = n_probe or self.n_probe
+
+        if self.mode == "exact":
+            scores = queries @ self.vectors.T
+            rows = top_k(scores, k)
+            return [
+                [(int(row), float(scores[i, row])) for row in rows[i]]
+                for i in range(len(queries))
+            ]
+
+        results = []
+        for query in queries:
+            candidates = self._candidate_rows(query, n_probe)
+            scores = self._vectors[candidates] @ query
+            results.append(
+                [(int(candidates[j]), float(scores[j])) for j in top_k(scores, k)]
+            )
+        return results
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: list[float], k: int = 4, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        query = np.asarray([embedding], dtype=np.float32)
+        hits = self._search(query, k, kwargs.get("n_probe"))[0]
+        return [(self._documents[row], score) for row, score in hits]
+
+    def similarity_search_with_score_by_vectors(
+        self, embeddings: list[list[float]], k: int = 4, **kwargs: Any
+    ) -> list[list[tuple[Document, float]]]:
+        """Searches several query vectors at once, with one matrix product in exact mode"""
+        queries = np.asarray(embeddings, dtype=np.float32)
+        return [
+            [(self._documents[row], score) for row, score in hits]
+            for hits in self._search(queries, k, kwargs.get("n_probe"))
+        ]
+
+    def similarity_search_by_vector(
+        self, embedding: list[float], k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        return [
+            doc
+            for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)
+        ]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda score: score
+
+    def save_local(self, folder_path: str, index_name: str = "index") -> None:
+        """Saves the vectors in the MmapVectorStore format"""
+        MmapVectorStore.delete_local(folder_path, index_name)
+        store = MmapVectorStore(folder_path, self._embedding, index_name, normalize_vectors=False)
+        store.add_embeddings(
+            [doc.page_content for doc in self._documents],
+            self.vectors,
+            [doc.metadata for doc in self._documents],
+            list(self._ids),
+        )
+        if self._centroids is not None:
+            np.save(Path(folder_path) / f"{index_name}.ivf.npy", self._centroids)
+
+    @classmethod
+    def load_local(
+        cls,
+        folder_path: str,
+        embeddings: Embeddings,
+        index_name: str = "index",
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        """Loads an index saved with save_local (or any MmapVectorStore) into memory"""
+        source = MmapVectorStore.load_local(folder_path, embeddings, index_name)
+        store = cls(embeddings, **kwargs)
+        documents = source.stored_documents()
+        rows = [source._id_to_row()[doc_id] for doc_id in documents]
+        store.add_embeddings(
+            [doc.page_content for doc in documents.values()],
+            np.asarray(source._vectors[rows]),
+            [doc.metadata for doc in documents.values()],
+            list(documents),
+        )
+        centroids_path = Path(folder_path) / f"{index_name}.ivf.npy"
+        if store.mode == "ivf" and centroids_path.exists():
+            store._centroids = np.load(centroids_path)
+            store._assignments[: store._count] = _assign(store.vectors, store._centroids)
+        return store
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: list[dict] | None = None,
+        *,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
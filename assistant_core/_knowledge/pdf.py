@@ -1,18 +1,40 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from pathlib import Path
 from typing import List, Iterator
-from unittest import loader
 
 from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
 from assistant_core._knowledge.base import AssistantKnowledge
 
 
+def _parse_pdf(
+    path: str, chunk_size: int, chunk_overlap: int
+) -> tuple[list[Document], float]:
+    """Parses and splits a single PDF. Runs inside the worker processes."""
+    start = time.perf_counter()
+    pages = PyPDFLoader(path).load()
+    for page in pages:
+        page.metadata["source"] = path
+    chunks = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+    ).split_documents(pages)
+    return chunks, time.perf_counter() - start
+
+
 class PDFKnowledgeBase(AssistantKnowledge):
     path: str | Path
-    loader: PyPDFLoader
+    loader: PyPDFLoader | None = None
+    chunk_size: int = 4000
+    chunk_overlap: int = 200
+    max_workers: int | None = None
+    """Number of parser processes, defaults to the number of CPUs"""
+    queue_size: int = 8
+    """Maximum number of parsed or in-progress files waiting for the embedding stage"""
 
     @classmethod
-    def from_path(cls, path: str | Path) -> 'PDFKnowledgeBase':
+    def from_path(cls, path: str | Path, **kwargs) -> 'PDFKnowledgeBase':
         """
         Factory method to create a PDFKnowledgeBase instance from a given path.
 
@@ -23,8 +45,19 @@ class PDFKnowledgeBase(AssistantKnowledge):
             PDFKnowledgeBase: An instance of PDFKnowledgeBase with initialized reader.
         """
         _path = Path(path) if isinstance(path, str) else path
-        loader = PyPDFLoader(str(_path))
-        return cls(path=_path, loader=loader)
+        loader = PyPDFLoader(str(_path)) if _path.is_file() else None
+        return cls(path=_path, loader=loader, **kwargs)
+
+    @property
+    def pdf_paths(self) -> Iterator[Path]:
+        """Iterate over the PDF files of the knowledge base"""
+        _pdf_path: Path = Path(self.path) if isinstance(
+            self.path, str) else self.path
+
+        if _pdf_path.exists() and _pdf_path.is_dir():
+            yield from _pdf_path.glob("**/*.pdf")
+        elif _pdf_path.exists() and _pdf_path.is_file() and _pdf_path.suffix == ".pdf":
+            yield _pdf_path
 
     @property
     def document_lists(self) -> Iterator[List[Document]]:
@@ -34,12 +67,40 @@ class PDFKnowledgeBase(AssistantKnowledge):
         Returns:
             Iterator[List[Document]]: Iterator yielding list of documents
         """
+        for _pdf in self.pdf_paths:
+            yield PyPDFLoader(str(_pdf)).load()
 
-        _pdf_path: Path = Path(self.path) if isinstance(
-            self.path, str) else self.path
+    def chunk_lists(self) -> Iterator[List[Document]]:
+        """Parse and split PDFs in a process pool and yield the chunks of each file.
 
-        if _pdf_path.exists() and _pdf_path.is_dir():
-            for _pdf in _pdf_path.glob("**/*.pdf"):
-                yield self.loader.read(pdf=_pdf)
-        elif _pdf_path.exists() and _pdf_path.is_file() and _pdf_path.suffix == ".pdf":
-            yield self.loader.read(pdf=_pdf_path)
+        At most `queue_size` files are submitted to the pool without having been
+        consumed, so a slow embedding stage stops the parsers instead of letting
+        parsed chunks pile up in memory. Files are yielded in completion order.
+        """
+        paths = iter(self.pdf_paths)
+        pending: set[Future] = set()
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+
+            def submit_next() -> None:
+                _pdf = next(paths, None)
+                if _pdf is not None:
+                    pending.add(executor.submit(
+                        _parse_pdf, str(_pdf), self.chunk_size, self.chunk_overlap))
+
+            for _ in range(max(1, self.queue_size)):
+                submit_next()
+
+            while pending:
+                self.stats.max_queued_files = max(
+                    self.stats.max_queued_files, len(pending))
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    chunks, parse_seconds = future.result()
+                    self.stats.parse.files += 1
+                    self.stats.parse.chunks += len(chunks)
+                    self.stats.parse.busy_seconds += parse_seconds
+                    yield chunks
+                    # Only refill the queue once the consumer took the chunks
+                    submit_next()
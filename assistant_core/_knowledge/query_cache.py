@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.documents import Document
+from pydantic import BaseModel, Field, PrivateAttr
+
+from assistant_core._knowledge.vector_ops import normalize
+
+
+class QueryCacheStats(BaseModel):
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0
+
+
+class _Entry:
+    __slots__ = ("k", "embedding", "results", "created")
+
+    def __init__(self, k: int, embedding: np.ndarray | None, results: list[Document]):
+        self.k = k
+        self.embedding = embedding
+        self.results = results
+        self.created = time.monotonic()
+
+
+class QueryCache(BaseModel):
+    """
+    Two level cache of search results.
+
+    The first level matches the normalized query text exactly. The second level
+    compares the query embedding against the embeddings of the cached queries and
+    reuses the results of the closest one if its cosine similarity is at least
+    `similarity_threshold` (set it to None to disable the semantic level).
+
+    Entries expire after `ttl_seconds` and the least recently used ones are evicted
+    beyond `max_entries`. Results cached for k documents also answer searches for
+    fewer documents. Call `invalidate` whenever the underlying index changes.
+    """
+
+    max_entries: int = 256
+    ttl_seconds: float | None = 600
+    similarity_threshold: float | None = 0.95
+    stats: QueryCacheStats = Field(default_factory=QueryCacheStats)
+
+    _entries: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _matrix: tuple[list[str], np.ndarray] | None = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _expired(self, entry: _Entry) -> bool:
+        return (
+            self.ttl_seconds is not None
+            and time.monotonic() - entry.created > self.ttl_seconds
+        )
+
+    def _remove(self, key: str) -> None:
+        del self._entries[key]
+        self._matrix = None
+
+    def get(self, query: str, k: int) -> list[Document] | None:
+        """Results cached for exactly this query, if any"""
+        key = self.normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._remove(key)
+                entry = None
+            if entry is None or entry.k < k:
+                return None
+            self._entries.move_to_end(key)
+            self.stats.exact_hits += 1
+            return entry.results[:k]
+
+    def get_similar(self, embedding: list[float], k: int) -> list[Document] | None:
+        """Results of the most similar cached query above the threshold, if any"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if self._expired(entry)]:
+                self._remove(key)
+
+            if self._matrix is None:
+                keys = [
+                    key for key, entry in self._entries.items() if entry.embedding is not None
+                ]
+                vectors = np.array([self._entries[key].embedding for key in keys])
+                self._matrix = (keys, vectors)
+            keys, vectors = self._matrix
+
+            if self.similarity_threshold is None or not keys:
+                self.stats.misses += 1
+                return None
+
+            similarities = vectors @ normalize(np.asarray(embedding, dtype=np.float32))
+            usable = np.array([self._entries[key].k >= k for key in keys])
+            similarities = np.where(usable, similarities, -np.inf)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                self.stats.misses += 1
+                return None
+
+            self._entries.move_to_end(keys[best])
+            self.stats.semantic_hits += 1
+            return self._entries[keys[best]].results[:k]
+
+    def put(
+        self,
+        query: str,
+        k: int,
+        results: list[Document],
+        embedding: list[float] | None = None,
+    ) -> None:
+        key = self.normalize_query(query)
+        vector = (
+            normalize(np.asarray(embedding, dtype=np.float32))
+            if embedding is not None
+            else None
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(k, vector, list(results))
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Drops every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.stats.invalidations += 1
@@ -1,14 +1,116 @@
+import asyncio
+from typing import Any, AsyncIterator, Iterator
 from langchain.chat_models.base import BaseChatModel
 from langchain.tools import BaseTool
-from langchain.schema import HumanMessage, BaseMessage
-from langgraph.prebuilt import create_react_agent
+from langchain.schema import HumanMessage, BaseMessage, AIMessage
+from langchain_core.messages import ToolMessage
 from pydantic import BaseModel, Field
+from .graph import GraphFactory, default_graph_factory
 from .memory import Memory, BasicMemory
+from .prompt import PromptAssembler, PromptBreakdown
+from .tokens import message_text
+
+
+class ToolCallResult(BaseModel):
+    id: str | None = None
+    name: str
+    args: dict = {}
+    output: str | None = Field(None, description="The tool output, None if the tool did not run")
+    status: str = "success"
 
 
 class ResponseSchema(BaseModel):
     content: str = Field(..., description="The content of the response")
     tool_call: dict | None = Field(None, description="Optional tool call information")
+    tool_calls: list[ToolCallResult] = Field(
+        [], description="Every tool call of the turn with its result")
+
+
+class TranscriptPolicy(BaseModel):
+    """
+    What is stored in memory from the messages the agent produces in a turn.
+
+        final    only the final answer
+        compact  every message, with tool results cut to max_tool_result_chars
+        full     every message as it is
+    """
+
+    mode: str = "compact"
+    max_tool_result_chars: int = 500
+
+    def model_post_init(self, __context: Any) -> None:
+        if self.mode not in ("final", "compact", "full"):
+            raise ValueError(
+                f"Unknown transcript mode {self.mode}, expected 'final', 'compact' or 'full'")
+
+    def select(self, new_messages: list[BaseMessage]) -> list[BaseMessage]:
+        if self.mode == "full":
+            return new_messages
+        if self.mode == "final":
+            for message in reversed(new_messages):
+                if not isinstance(message, AIMessage):
+                    continue
+                if message.tool_calls:
+                    # Keep the text only, a tool call without its result is rejected by most APIs
+                    message = message.model_copy(update={
+                        "tool_calls": [],
+                        "additional_kwargs": {key: value for key, value in message.additional_kwargs.items()
+                                              if key != "tool_calls"},
+                    })
+                # A message that only called tools has nothing left to store
+                if message_text(message).strip():
+                    return [message]
+            return []
+        compacted = []
+        for message in new_messages:
+            text = message_text(message)
+            if isinstance(message, ToolMessage) and len(text) > self.max_tool_result_chars:
+                message = message.model_copy(update={
+                    "content": text[: self.max_tool_result_chars]
+                    + f"\n[... {len(text) - self.max_tool_result_chars} characters elided]"
+                })
+            compacted.append(message)
+        return compacted
+
+
+class AssistantEvent(BaseModel):
+    type: str = Field(..., description="One of 'token', 'tool_start', 'tool_end' or 'final'")
+    content: str = Field("", description="Text delta of a token event or the output of a tool")
+    tool_name: str | None = None
+    tool_call_id: str | None = None
+    tool_args: dict | None = None
+    response: ResponseSchema | None = Field(None, description="The response of a final event")
+
+
+def translate_stream_chunk(
+    mode: str, payload: Any
+) -> tuple[list[AssistantEvent], list[BaseMessage]]:
+    """Translates a chunk of graph.stream(stream_mode=["messages", "updates"]) into
+    assistant events and the complete messages it adds to the conversation"""
+    if mode == "messages":
+        message, metadata = payload
+        if metadata.get("langgraph_node") != "agent" or message.type not in ("ai", "AIMessageChunk"):
+            return [], []
+        text = message_text(message)
+        return ([AssistantEvent(type="token", content=text)] if text else []), []
+
+    events, messages = [], []
+    for update in payload.values():
+        for message in (update or {}).get("messages", []):
+            messages.append(message)
+            if isinstance(message, AIMessage):
+                events.extend(
+                    AssistantEvent(type="tool_start", tool_name=call["name"],
+                                   tool_call_id=call["id"], tool_args=call["args"])
+                    for call in message.tool_calls
+                )
+            elif isinstance(message, ToolMessage):
+                events.append(
+                    AssistantEvent(type="tool_end", tool_name=message.name,
+                                   tool_call_id=message.tool_call_id,
+                                   content=message_text(message))
+                )
+    return events, messages
 
 
 class Assistant:
@@ -18,20 +120,43 @@ class Assistant:
     ReAct agent, and handles tool calls if necessary.
 
     Attributes:
-        graph (ReActAgent): The ReAct agent used to generate responses.
+        graph (ReActAgent): The ReAct agent used to generate responses, shared by every Assistant
+            with the same configuration.
         memory (Memory): The memory object used to store the conversation history and summaries.
+        prompt_assembler (PromptAssembler): Fits the input messages of every turn in a token budget,
+            by default one that fits all the history the memory keeps.
+        last_prompt_breakdown (PromptBreakdown | None): Tokens by source of the last prompt.
+        transcript_policy (TranscriptPolicy): What is stored in memory from every turn.
 
     Methods:
-        __init__(model: BaseChatModel, tools: list[BaseTool], memory: Memory | None, description: str | None) -> None:
-            Initializes the Assistant with the given model, tools, memory, and description.
+        __init__(model: BaseChatModel, tools: list[BaseTool], memory: Memory | None, description: str | None,
+                 prompt_assembler: PromptAssembler | None, transcript_policy: TranscriptPolicy | str | None,
+                 graph_factory: GraphFactory | None, tool_timeout: float | dict[str, float] | None,
+                 max_tool_concurrency: int) -> None:
+            Initializes the Assistant with the given model, tools, memory, description, prompt assembler
+            and transcript policy ("final", "compact" or "full"). The agent graph is taken from the
+            graph factory, shared with every other Assistant with the same model, tools and description.
+            The tool calls of one step run concurrently, at most max_tool_concurrency at once and each
+            one for at most tool_timeout seconds (a float, or timeouts by tool name).
 
         _create_input_messages() -> list[BaseMessage]:
-            Creates a list of input messages for the ReAct agent, including the summary and chat history.
+            Creates a list of input messages for the ReAct agent, including the summary, the past
+            turns recalled from the long term memory and the chat history, within the token budget
+            of the prompt assembler.
 
         get_response(input: str) -> ResponseSchema:
             Processes the user's input, generates a response using the ReAct agent, and handles
             potential tool calls. Updates the assistant's memory with the conversation history.
 
+        aget_response(input: str) -> ResponseSchema:
+            Async version of get_response.
+
+        stream(input: str) -> Iterator[AssistantEvent]:
+            Streams the token deltas, tool calls and final response of a turn.
+
+        astream(input: str) -> AsyncIterator[AssistantEvent]:
+            Async version of stream.
+
         print_response(input: str) -> None:
             Processes the user's input, generates a response using the ReAct agent, and prints
             the response. Updates the assistant's memory with the conversation history.
@@ -54,18 +179,44 @@ class Assistant:
         name: str | None = "jarvis",
         description: str | None = None,
         tools: list[BaseTool] | None = [],
+        prompt_assembler: PromptAssembler | None = None,
+        transcript_policy: TranscriptPolicy | str | None = None,
+        graph_factory: GraphFactory | None = None,
+        tool_timeout: float | dict[str, float] | None = None,
+        max_tool_concurrency: int = 8,
     ):
-        self.graph = create_react_agent(
-            model=model, tools=tools, state_modifier=description
+        # Assistants with the same model, tools and description share one compiled graph
+        self.graph = (graph_factory or default_graph_factory).get(
+            model=model,
+            tools=tools,
+            system_prompt=description,
+            tool_timeout=tool_timeout,
+            max_tool_concurrency=max_tool_concurrency,
         )
         self.memory = memory or BasicMemory()
         self.name = name
+        self.description = description
+        # The budget fits the whole history the memory keeps, so turns are never
+        # dropped from the prompt before the memory has compacted them
+        self.prompt_assembler = prompt_assembler or PromptAssembler.for_memory(
+            self.memory, system_prompt=description)
+        self.last_prompt_breakdown: PromptBreakdown | None = None
+        if isinstance(transcript_policy, str):
+            transcript_policy = TranscriptPolicy(mode=transcript_policy)
+        self.transcript_policy = transcript_policy or TranscriptPolicy()
 
     def _create_input_messages(self) -> list[BaseMessage]:
-        messages = []
-        if self.memory.summary.content:
-            messages.append(self.memory.summary)
-        messages.extend(self.memory.chat_history)
+        history, token_counts = self.memory.counted_history()
+        recalled = None
+        if self.memory.long_term_memory is not None:
+            recalled = self.memory.long_term_memory.recall_for(history)
+        messages, self.last_prompt_breakdown = self.prompt_assembler.assemble(
+            history,
+            token_counts,
+            system_prompt=self.description,
+            summary=self.memory.summary if self.memory.summary.content else None,
+            recalled=recalled,
+        )
         return messages
 
     def get_response(self, input: str) -> ResponseSchema:
@@ -102,50 +253,136 @@ class Assistant:
             final_result = chunk
 
         if final_result:
-            # Search for tool call message and final response
-            tool_call_message = None
-            final_response = None
-            for message in reversed(final_result["messages"]):
-                if message.type == "ai":
-                    if not final_response:
-                        final_response = message
-                    if message.content == "" and message.additional_kwargs.get(
-                        "tool_calls"
-                    ):
-                        tool_call_message = message
-                        break
-
-            # Add final response to memory
-            if final_response:
-                # Only add last message
-                # self.memory.add_chat_message(final_response)
-                # Or add everything to the memory
-                self.memory.chat_history = final_result["messages"]
-
-            # Return appropriate ResponseSchema
-            if tool_call_message:
-                tool_call = tool_call_message.additional_kwargs["tool_calls"][0]
-                return ResponseSchema(
-                    content=final_response.content, tool_call=tool_call
-                )
-            elif final_response:
-                return ResponseSchema(content=final_response.content)
+            # The summary and recalled turns at the start of the inputs are not part of the history
+            new_messages = final_result["messages"][len(inputs["messages"]):]
+            response = self._build_response(new_messages)
+            if response:
+                # Append what the transcript policy keeps of this turn to the memory
+                self.memory.add_chat_messages(self.transcript_policy.select(new_messages))
+                return response
 
         return ResponseSchema(content="No response generated")
 
+    def _build_response(self, new_messages: list[BaseMessage]) -> ResponseSchema | None:
+        """ResponseSchema of the messages produced in a turn, None if there is no AI answer"""
+        # Search for tool call message and final response
+        tool_call_message = None
+        final_response = None
+        for message in reversed(new_messages):
+            if message.type == "ai":
+                if not final_response:
+                    final_response = message
+                if message.content == "" and message.additional_kwargs.get(
+                    "tool_calls"
+                ):
+                    tool_call_message = message
+                    break
+
+        # Every tool call of the turn with the output of its ToolMessage
+        outputs = {
+            message.tool_call_id: message for message in new_messages
+            if isinstance(message, ToolMessage)
+        }
+        tool_calls = [
+            ToolCallResult(
+                id=call["id"],
+                name=call["name"],
+                args=call["args"],
+                output=message_text(outputs[call["id"]]) if call["id"] in outputs else None,
+                status=outputs[call["id"]].status if call["id"] in outputs else "not_run",
+            )
+            for message in new_messages if isinstance(message, AIMessage)
+            for call in message.tool_calls
+        ]
+
+        # Return appropriate ResponseSchema
+        if tool_call_message:
+            tool_call = tool_call_message.additional_kwargs["tool_calls"][0]
+            return ResponseSchema(
+                content=final_response.content, tool_call=tool_call, tool_calls=tool_calls
+            )
+        elif final_response:
+            return ResponseSchema(content=final_response.content, tool_calls=tool_calls)
+        return None
+
+    def stream(self, input: str) -> Iterator[AssistantEvent]:
+        """
+        Streams the events of a turn as they happen: "token" events with the text
+        deltas of the answer, "tool_start" and "tool_end" events around every tool
+        call and a last "final" event with the ResponseSchema of the turn.
+        """
+        self.memory.add_chat_message(HumanMessage(content=input))
+        inputs = {"messages": self._create_input_messages()}
+
+        new_messages = []
+        for mode, payload in self.graph.stream(
+            inputs, stream_mode=["messages", "updates"]
+        ):
+            events, messages = translate_stream_chunk(mode, payload)
+            new_messages.extend(messages)
+            yield from events
+
+        response = self._build_response(new_messages)
+        if response:
+            self.memory.add_chat_messages(self.transcript_policy.select(new_messages))
+        yield AssistantEvent(
+            type="final",
+            response=response or ResponseSchema(content="No response generated"),
+        )
+
+    async def _acreate_input_messages(self) -> list[BaseMessage]:
+        if self.memory.long_term_memory is None:
+            return self._create_input_messages()
+        # Recalling embeds the query, keep it off the event loop
+        return await asyncio.to_thread(self._create_input_messages)
+
+    async def astream(self, input: str) -> AsyncIterator[AssistantEvent]:
+        """
+        Async version of stream. Runs entirely on the event loop, so many sessions (one Assistant each) can be
+        served concurrently by a single process.
+        """
+        await self.memory.aadd_chat_message(HumanMessage(content=input))
+        inputs = {"messages": await self._acreate_input_messages()}
+
+        new_messages = []
+        async for mode, payload in self.graph.astream(
+            inputs, stream_mode=["messages", "updates"]
+        ):
+            events, messages = translate_stream_chunk(mode, payload)
+            new_messages.extend(messages)
+            for event in events:
+                yield event
+
+        response = self._build_response(new_messages)
+        if response:
+            await self.memory.aadd_chat_messages(self.transcript_policy.select(new_messages))
+        yield AssistantEvent(
+            type="final",
+            response=response or ResponseSchema(content="No response generated"),
+        )
+
+    async def aget_response(self, input: str) -> ResponseSchema:
+        """Async version of get_response"""
+        async for event in self.astream(input):
+            if event.type == "final":
+                return event.response
+        return ResponseSchema(content="No response generated")
+
     def print_response(self, input: str):
         human_message = HumanMessage(content=input)
         self.memory.add_chat_message(human_message)
 
         inputs = {"messages": self._create_input_messages()}
 
+        final_result = None
         for chunk in self.graph.stream(inputs, stream_mode="values"):
             message = chunk["messages"][-1]
             if isinstance(message, tuple):
                 print(message)
             else:
                 message.pretty_print()
+            final_result = chunk
 
-        # Assuming the last message in the stream is the AI's response
-        ai_message = chunk["messages"][-1]
-        self.memory.add_chat_message(ai_message)
+        if final_result:
+            new_messages = final_result["messages"][len(inputs["messages"]):]
+            self.memory.add_chat_messages(self.transcript_policy.select(new_messages))
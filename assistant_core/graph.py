@@ -0,0 +1,152 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any
+
+from langchain.chat_models.base import BaseChatModel
+from langchain.tools import BaseTool
+from langgraph.prebuilt import create_react_agent
+from pydantic import BaseModel, Field, PrivateAttr, SecretStr
+
+from assistant_core.tools.executor import ParallelToolNode
+
+
+class GraphFactoryStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    build_seconds: float = 0.0
+    """Total time spent building graphs"""
+
+    @property
+    def saved_seconds(self) -> float:
+        """Estimated build time saved by the hits, at the average build time"""
+        return self.hits * self.build_seconds / self.misses if self.misses else 0.0
+
+
+_PROCESS_ID = uuid.uuid4().hex
+"""Identities are only meaningful within one process, fingerprints stored on disk
+(see tools/cache.py) must not match an object of another process at the same address"""
+
+
+def _fingerprint_value(value: Any) -> Any:
+    """JSON friendly values are compared by value, secrets by their hash and anything
+    else by identity"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, SecretStr):
+        return "<secret " + hashlib.sha256(value.get_secret_value().encode("utf-8")).hexdigest() + ">"
+    if isinstance(value, (list, tuple)):
+        return [_fingerprint_value(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _fingerprint_value(item) for key, item in value.items()}
+    return f"<{type(value).__qualname__} {id(value)} {_PROCESS_ID}>"
+
+
+def model_fingerprint(model: BaseChatModel) -> Any:
+    # The whole configuration: _identifying_params leaves out the API key, endpoint and headers
+    params = model.model_dump()
+    # Excluded from the dump, but set by the caller and change where the requests go
+    for name in ("http_client", "http_async_client", "rate_limiter"):
+        params[name] = getattr(model, name, None)
+    return [type(model).__module__, type(model).__qualname__, _fingerprint_value(params)]
+
+
+def tool_fingerprint(tool: BaseTool) -> Any:
+    fields = {
+        name: _fingerprint_value(getattr(tool, name, None))
+        for name in type(tool).model_fields
+        if name not in ("name", "description", "args_schema", "callbacks", "callback_manager")
+    }
+    return [
+        type(tool).__module__,
+        type(tool).__qualname__,
+        tool.name,
+        tool.description,
+        _fingerprint_value(tool.args),
+        fields,
+    ]
+
+
+class GraphFactory(BaseModel):
+    """
+    Cache of compiled ReAct agent graphs keyed by the model configuration, the
+    tool set and the system prompt.
+
+    Assistants with the same configuration share one compiled graph (the graph
+    holds no conversation state, that stays in each Assistant's memory), so a
+    new session does not pay for graph compilation and tool schema generation.
+
+    Models are compared by their whole configuration, API keys and endpoints
+    included (secrets by their hash). Tools are compared by
+    their schema and their configuration, where values that are not plain data
+    (a knowledge base, a client) are compared by identity, so tools backed by
+    different objects never share a graph.
+    """
+
+    max_graphs: int = 64
+    stats: GraphFactoryStats = Field(default_factory=GraphFactoryStats)
+
+    _graphs: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @staticmethod
+    def key(
+        model: BaseChatModel,
+        tools: list[BaseTool],
+        system_prompt: str | None,
+        tool_timeout: float | dict[str, float] | None = None,
+        max_tool_concurrency: int = 8,
+    ) -> str:
+        fingerprint = json.dumps(
+            [model_fingerprint(model), [tool_fingerprint(tool) for tool in tools], system_prompt,
+             tool_timeout, max_tool_concurrency],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def get(
+        self,
+        model: BaseChatModel,
+        tools: list[BaseTool] | None = None,
+        system_prompt: str | None = None,
+        tool_timeout: float | dict[str, float] | None = None,
+        max_tool_concurrency: int = 8,
+    ):
+        """Returns the compiled graph of this configuration, building it on the first request.
+        The tool calls of one step run concurrently, see ParallelToolNode. tool_timeout is
+        either one timeout for every tool or the timeouts of some tools by name."""
+        tools = tools or []
+        key = self.key(model, tools, system_prompt, tool_timeout, max_tool_concurrency)
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+                self.stats.hits += 1
+                return graph
+
+            start = time.perf_counter()
+            tool_node = ParallelToolNode(
+                tools,
+                timeout=None if isinstance(tool_timeout, dict) else tool_timeout,
+                tool_timeouts=tool_timeout if isinstance(tool_timeout, dict) else None,
+                max_concurrency=max_tool_concurrency,
+            ) if tools else []
+            graph = create_react_agent(model=model, tools=tool_node, state_modifier=system_prompt)
+            self.stats.build_seconds += time.perf_counter() - start
+            self.stats.misses += 1
+            self._graphs[key] = graph
+            while len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+            return graph
+
+    def clear(self):
+        with self._lock:
+            self._graphs.clear()
+
+
+default_graph_factory = GraphFactory()
+"""Factory shared by every Assistant created without one"""
@@ -1,4 +1,6 @@
-from langchain_community.document_loaders import PyPDFDirectoryLoader
+from pathlib import Path
+from langchain_community.document_loaders import PyPDFDirectoryLoader, PyPDFLoader
+from langchain_core.documents import Document
 from langchain_core.vectorstores.base import VectorStore
 from langchain_core.embeddings.embeddings import Embeddings
 from langchain_community.vectorstores.faiss import FAISS
@@ -7,7 +9,13 @@ from utils.ollama import OllamaEmbeddings
 from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.tools.base import BaseTool
+from assistant_core._knowledge.base import AssistantKnowledge, chunk_id
+from assistant_core._knowledge.bm25 import BM25Index
+from assistant_core._knowledge.embedding_cache import CachedEmbeddings
+from assistant_core._knowledge.mmap_store import MmapVectorStore
 
+import hashlib
+import json
 import os
 
 
@@ -17,19 +25,200 @@ def load_existing_index(
     full_path = os.path.join(vectors_path, f"{index_name}.faiss")
     if os.path.exists(full_path):
         return FAISS.load_local(
-            vectors_path, allow_dangerous_deserialization=True, embeddings=embedding
+            vectors_path,
+            allow_dangerous_deserialization=True,
+            embeddings=embedding,
+            index_name=index_name,
         )
     return None
 
 
-def create_faiss_index(docs, embedding: Embeddings, batch_size: int = 20) -> FAISS:
-    db = None
+def load_keyword_index(vectors_path: str, index_name: str) -> BM25Index | None:
+    """Loads the BM25 index saved next to a vector index by get_faiss, sync_faiss or get_mmap_index"""
+    return BM25Index.load_local(vectors_path, index_name)
+
+
+def create_faiss_index(
+    docs,
+    embedding: Embeddings,
+    batch_size: int = 20,
+    ids: list[str] | None = None,
+    db: FAISS | None = None,
+) -> FAISS:
     for i in tqdm(range(0, len(docs), batch_size), desc="Processing docs"):
         batch = docs[i : i + batch_size]
+        batch_ids = ids[i : i + batch_size] if ids is not None else None
         if db is None:
-            db = FAISS.from_documents(documents=batch, embedding=embedding)
+            db = FAISS.from_documents(documents=batch, embedding=embedding, ids=batch_ids)
         else:
-            db.add_documents(documents=batch)
+            db.add_documents(documents=batch, ids=batch_ids)
+    return db
+
+
+def _resolve_embedding(
+    embedding: Embeddings | None, embedding_cache_path: str | None
+) -> Embeddings:
+    if embedding is None:
+        embedding = OpenAIEmbeddings()
+    if embedding_cache_path is not None and not isinstance(embedding, CachedEmbeddings):
+        embedding = CachedEmbeddings(embedding, embedding_cache_path)
+    return embedding
+
+
+def _manifest_path(vectors_path: str, index_name: str) -> str:
+    return os.path.join(vectors_path, f"{index_name}.manifest.json")
+
+
+def load_manifest(vectors_path: str, index_name: str) -> dict[str, dict]:
+    """Returns the per-file manifest of an index, mapping each source PDF to its
+    mtime, size, content hash and the docstore ids of its chunks"""
+    path = _manifest_path(vectors_path, index_name)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)["files"]
+
+
+def save_manifest(vectors_path: str, index_name: str, files: dict[str, dict]) -> None:
+    path = _manifest_path(vectors_path, index_name)
+    os.makedirs(vectors_path, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": 1, "files": files}, f)
+    os.replace(tmp_path, path)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _manifest_from_docstore(db: FAISS) -> dict[str, dict]:
+    """Manifest of an index saved without one (get_faiss keeps none), built from the
+    source metadata of its chunks. The entries have no mtime, size or hash, so
+    sync_faiss checks every file against the chunk ids before trusting them."""
+    files: dict[str, dict] = {}
+    for doc_id, doc in db.docstore._dict.items():
+        source = doc.metadata.get("source")
+        if source is None:
+            continue
+        entry = files.setdefault(
+            str(source), {"mtime": None, "size": None, "sha256": None, "ids": []}
+        )
+        entry["ids"].append(doc_id)
+    return files
+
+
+def _split_pdf(path: Path, text_splitter: RecursiveCharacterTextSplitter) -> list[Document]:
+    pages = PyPDFLoader(str(path)).load()
+    for page in pages:
+        page.metadata["source"] = str(path)
+    return text_splitter.split_documents(pages)
+
+
+def sync_faiss(
+    data_path: str,
+    vectors_path: str,
+    index_name: str = "index",
+    embedding: Embeddings | None = None,
+    recreate: bool = False,
+    embedding_cache_path: str | None = None,
+) -> FAISS:
+    """
+    Brings the saved index in sync with the PDFs under data_path without re-embedding
+    unchanged files.
+
+    Files are compared with the manifest saved next to the index: chunks of new files
+    are added, chunks of removed files are deleted and chunks of changed files are
+    replaced. Unchanged files are detected by mtime and size, falling back to the
+    content hash when those differ. The index and manifest are written back only
+    when something changed.
+    """
+    embedding = _resolve_embedding(embedding, embedding_cache_path)
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500, chunk_overlap=0, add_start_index=True
+    )
+
+    db = None if recreate else load_existing_index(vectors_path, index_name, embedding)
+    manifest = load_manifest(vectors_path, index_name) if db else {}
+    if db and not manifest:
+        manifest = _manifest_from_docstore(db)
+    keyword_index = load_keyword_index(vectors_path, index_name) if db else None
+    if keyword_index is None:
+        keyword_index = BM25Index()
+        if db:
+            keyword_index.add_documents(
+                list(db.docstore._dict.values()), ids=list(db.docstore._dict)
+            )
+
+    current_files = {
+        str(path): path
+        for path in sorted(Path(data_path).glob("**/[!.]*.pdf"))
+        if path.is_file()
+    }
+
+    updated_manifest = {}
+    ids_to_delete = []
+    files_to_index = []
+    for source, entry in manifest.items():
+        if source not in current_files:
+            ids_to_delete.extend(entry["ids"])
+
+    for source, path in current_files.items():
+        stat = path.stat()
+        entry = manifest.get(source)
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            updated_manifest[source] = entry
+            continue
+
+        content_hash = _file_sha256(path)
+        docs = None
+        if entry and entry["sha256"] is None:
+            # Entry seeded from the docstore, the file is unchanged if it still
+            # splits into the same chunks (chunk ids hash the content)
+            docs = _split_pdf(path, text_splitter)
+            if sorted(chunk_id(doc) for doc in docs) == sorted(entry["ids"]):
+                entry = {**entry, "sha256": content_hash}
+        if entry and entry["sha256"] == content_hash:
+            updated_manifest[source] = {
+                **entry,
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+            }
+            continue
+
+        if entry:
+            ids_to_delete.extend(entry["ids"])
+        files_to_index.append((source, path, stat, content_hash, docs))
+
+    if ids_to_delete:
+        db.delete(ids_to_delete)
+        keyword_index.delete(ids_to_delete)
+
+    for source, path, stat, content_hash, docs in tqdm(files_to_index, desc="Indexing files"):
+        if docs is None:
+            docs = _split_pdf(path, text_splitter)
+        ids = [chunk_id(doc) for doc in docs]
+        if docs:
+            db = create_faiss_index(docs, embedding, ids=ids, db=db)
+            keyword_index.add_documents(docs, ids=ids)
+        updated_manifest[source] = {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": content_hash,
+            "ids": ids,
+        }
+
+    if db is None:
+        raise Exception(f"No PDF documents found in {data_path}")
+
+    if ids_to_delete or files_to_index or updated_manifest != manifest:
+        db.save_local(vectors_path, index_name)
+        keyword_index.save_local(vectors_path, index_name)
+        save_manifest(vectors_path, index_name, updated_manifest)
     return db
 
 
@@ -39,21 +228,86 @@ def get_faiss(
     index_name: str = "index",
     embedding: Embeddings | None = None,
     recreate: bool = False,
+    embedding_cache_path: str | None = None,
+    incremental: bool = False,
 ) -> FAISS:
-    if embedding is None:
-        embedding = OpenAIEmbeddings()
+    if incremental:
+        return sync_faiss(
+            data_path,
+            vectors_path,
+            index_name=index_name,
+            embedding=embedding,
+            recreate=recreate,
+            embedding_cache_path=embedding_cache_path,
+        )
+
+    embedding = _resolve_embedding(embedding, embedding_cache_path)
 
     if not recreate:
         existing_index = load_existing_index(vectors_path, index_name, embedding)
         if existing_index:
             return existing_index
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=0)
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500, chunk_overlap=0, add_start_index=True
+    )
     loader = PyPDFDirectoryLoader(data_path)
     docs = loader.load_and_split(text_splitter)
+    ids = [chunk_id(doc) for doc in docs]
 
-    db = create_faiss_index(docs, embedding)
+    db = create_faiss_index(docs, embedding, ids=ids)
     db.save_local(vectors_path, index_name)
+    keyword_index = BM25Index()
+    keyword_index.add_documents(docs, ids=ids)
+    keyword_index.save_local(vectors_path, index_name)
+    # A full rebuild assigns new docstore ids, the old manifest no longer applies
+    if os.path.exists(_manifest_path(vectors_path, index_name)):
+        os.remove(_manifest_path(vectors_path, index_name))
+    return db
+
+
+def load_existing_mmap_index(
+    vectors_path: str, index_name: str, embedding: Embeddings
+) -> MmapVectorStore | None:
+    if MmapVectorStore.exists(vectors_path, index_name):
+        return MmapVectorStore.load_local(vectors_path, embedding, index_name)
+    return None
+
+
+def get_mmap_index(
+    data_path: str,
+    vectors_path: str,
+    index_name: str = "index",
+    embedding: Embeddings | None = None,
+    recreate: bool = False,
+    embedding_cache_path: str | None = None,
+    batch_size: int = 20,
+) -> MmapVectorStore:
+    """Same as get_faiss but stores the index in the memory-mapped MmapVectorStore format,
+    which opens without reading the index into memory or unpickling anything."""
+    embedding = _resolve_embedding(embedding, embedding_cache_path)
+
+    if not recreate:
+        existing_index = load_existing_mmap_index(vectors_path, index_name, embedding)
+        if existing_index:
+            return existing_index
+
+    MmapVectorStore.delete_local(vectors_path, index_name)
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500, chunk_overlap=0, add_start_index=True
+    )
+    loader = PyPDFDirectoryLoader(data_path)
+    docs = loader.load_and_split(text_splitter)
+
+    db = MmapVectorStore(vectors_path, embedding, index_name)
+    keyword_index = BM25Index()
+    for i in tqdm(range(0, len(docs), batch_size), desc="Processing docs"):
+        batch = docs[i : i + batch_size]
+        batch_ids = [chunk_id(doc) for doc in batch]
+        db.add_documents(batch, ids=batch_ids)
+        keyword_index.add_documents(batch, ids=batch_ids)
+    keyword_index.save_local(vectors_path, index_name)
     return db
 
 
@@ -61,6 +315,10 @@ class KnowledgeSearchTool(BaseTool):
     name: str = "knowledge_search"
     custom_description: str | None = None
     knowledge_base: VectorStore
+    keyword_index: BM25Index | None = None
+    """BM25 index of the same chunks, see load_keyword_index. Required by the keyword and hybrid modes"""
+    mode: str = "vector"
+    """Search mode, one of 'vector', 'keyword' or 'hybrid'"""
 
     @property
     def description(self) -> str:
@@ -86,9 +344,15 @@ class KnowledgeSearchTool(BaseTool):
             if not query:
                 return "Invalid input. 'query' is required."
 
-            results = self.knowledge_base.similarity_search(
-                query=query, k=num_documents
-            )
+            if self.mode == "vector":
+                results = self.knowledge_base.similarity_search(
+                    query=query, k=num_documents
+                )
+            else:
+                knowledge = AssistantKnowledge(
+                    vector_db=self.knowledge_base, keyword_index=self.keyword_index
+                )
+                results = knowledge.search(query, num_documents, mode=self.mode)
 
             formatted_results = []
             for i, doc in enumerate(results, 1):
@@ -0,0 +1,162 @@
+import time
+import threading
+import uuid
+
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
+from langchain.tools import BaseTool
+from langchain_core.documents import Document
+from langchain_core.embeddings.embeddings import Embeddings
+from pydantic import BaseModel, Field, PrivateAttr
+
+from assistant_core._knowledge.mmap_store import MmapVectorStore
+from assistant_core._knowledge.numpy_store import NumpyVectorStore
+from assistant_core.tokens import TiktokenCounter, TokenCounter, message_text
+
+RECALL_PREFIX = "These excerpts of earlier parts of the conversation may be relevant:\n\n"
+
+
+def _turn_texts(messages: list[BaseMessage]) -> list[str]:
+    """Groups messages into turns, each starting at a human message.
+    Tool results are left out, only what the user and the assistant said is kept."""
+    turns: list[list[str]] = []
+    for message in messages:
+        if message.type not in ("human", "ai"):
+            continue
+        text = message_text(message).strip()
+        if not text:
+            continue
+        if message.type == "human" or not turns:
+            turns.append([])
+        turns[-1].append(f"{'User' if message.type == 'human' else 'Assistant'}: {text}")
+    return ["\n".join(turn) for turn in turns]
+
+
+class LongTermMemory(BaseModel):
+    """
+    Vector index of the turns evicted from the chat history of one session.
+
+    Memory adds the evicted messages here, grouped into turns, and the Assistant
+    retrieves the past turns most relevant to the last user message. At most
+    `top_k` turns within `max_tokens` tokens are added to the prompt, so the
+    cost of recalling old facts does not grow with the length of the conversation.
+
+    If `path` is set the index is kept there in append-only files, one index per
+    session_id, otherwise it lives in memory.
+
+    Example:
+        long_term_memory = LongTermMemory(embedding=OllamaEmbeddings(model="nomic-embed-text"),
+                                          path="memory_files/long_term", session_id=user_id)
+        memory = SQLiteMemory(path="memory_files/memory.db", session_id=user_id,
+                              long_term_memory=long_term_memory)
+    """
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    embedding: Embeddings
+    path: str | None = None
+    session_id: str = "default"
+    top_k: int = 4
+    max_tokens: int = 500
+    min_score: float | None = None
+    token_counter: TokenCounter = Field(default_factory=TiktokenCounter)
+
+    _store: MmapVectorStore | NumpyVectorStore | None = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def index_name(self) -> str:
+        return f"long_term_{self.session_id}"
+
+    @property
+    def store(self) -> MmapVectorStore | NumpyVectorStore:
+        if self._store is None:
+            if self.path:
+                self._store = MmapVectorStore(self.path, self.embedding, self.index_name)
+            else:
+                self._store = NumpyVectorStore(self.embedding)
+        return self._store
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def add_messages(self, messages: list[BaseMessage]):
+        """Embeds the turns of the given messages into the index"""
+        texts = _turn_texts(messages)
+        if not texts:
+            return
+        now = time.time()
+        metadatas = [{"session_id": self.session_id, "time": now} for _ in texts]
+        with self._lock:
+            self.store.add_texts(texts, metadatas, ids=[str(uuid.uuid4()) for _ in texts])
+
+    def search(self, query: str, k: int | None = None) -> list[Document]:
+        """Past turns most similar to the query, most relevant first"""
+        with self._lock:
+            if not query or len(self.store) == 0:
+                return []
+            results = self.store.similarity_search_with_score(query, k or self.top_k)
+        return [
+            document for document, score in results
+            if self.min_score is None or score >= self.min_score
+        ]
+
+    def recall(self, query: str) -> SystemMessage | None:
+        """System message with the relevant past turns that fit in max_tokens, if any"""
+        excerpts = []
+        budget = self.max_tokens
+        for document in self.search(query):
+            tokens = self.token_counter.count_text(document.page_content)
+            if tokens > budget:
+                continue
+            excerpts.append(document.page_content)
+            budget -= tokens
+        if not excerpts:
+            return None
+        return SystemMessage(content=RECALL_PREFIX + "\n\n".join(excerpts))
+
+    def recall_for(self, messages: list[BaseMessage]) -> SystemMessage | None:
+        """Recalls the past turns relevant to the last human message"""
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                return self.recall(message_text(message))
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._store = None
+            if self.path:
+                MmapVectorStore.delete_local(self.path, self.index_name)
+
+
+class LongTermMemorySearchTool(BaseTool):
+    name: str = "long_term_memory_search"
+    description: str = """Use this tool to look up what was said earlier in the conversation with the user.
+
+        Args:
+            query (str): What to look for.
+            num_results (int, optional): Number of past turns to return. Defaults to 4.
+
+        Returns:
+            str: The most relevant past turns of the conversation.
+        """
+    long_term_memory: LongTermMemory = Field(
+        ..., description="The long term memory of the conversation"
+    )
+
+    def _run(self, query: str, num_results: int = 4) -> str:
+        try:
+            if not query:
+                return "Invalid input. 'query' is required."
+
+            results = self.long_term_memory.search(query, num_results)
+            if not results:
+                return "Nothing relevant was found in earlier parts of the conversation."
+
+            return "\n\n".join(
+                f"Turn {i}:\n{doc.page_content}" for i, doc in enumerate(results, 1)
+            )
+
+        except Exception as e:
+            print(e)
+            return f"An error occurred: {str(e)}"
@@ -1,45 +1,167 @@
+import asyncio
 import json
 import os
+import sqlite3
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any
 from langchain.chat_models.base import BaseChatModel
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema import StrOutputParser, BaseMessage, HumanMessage, AIMessage, SystemMessage
-from pydantic import BaseModel, Field
+from langchain_core.messages import messages_from_dict
+from pydantic import BaseModel, Field, PrivateAttr
+
+from assistant_core.long_term_memory import LongTermMemory
+from assistant_core.tokens import TiktokenCounter, TokenCounter, message_text
+
+
+SUMMARY_PREFIX = "This is a summary of the older messages in the conversation "
+
+SERIALIZATION_VERSION = 2
+"""Version 1 stored only the class name and content of Human, AI and System messages"""
+
+_LEGACY_MESSAGE_TYPES = {
+    'HumanMessage': HumanMessage,
+    'AIMessage': AIMessage,
+    'SystemMessage': SystemMessage
+}
+
+
+def serialize_message(message: BaseMessage) -> dict:
+    """Compact dict of a message, only the fields that differ from their defaults
+    are kept, along with the message type. Round trips every LangChain message
+    type, including ids, tool calls and additional_kwargs."""
+    data = message.model_dump(exclude_defaults=True)
+    data['type'] = message.type
+    return data
+
+
+def deserialize_message(data: dict) -> BaseMessage:
+    """Reads a message written by serialize_message, langchain's message_to_dict
+    or a version 1 memory file"""
+    if 'data' in data:
+        return messages_from_dict([data])[0]
+    if data['type'] in _LEGACY_MESSAGE_TYPES:
+        return _LEGACY_MESSAGE_TYPES[data['type']](content=data['content'])
+    fields = dict(data)
+    return messages_from_dict([{'type': fields.pop('type'), 'data': fields}])[0]
+
+
+def serialize_messages(messages: list[BaseMessage]) -> list[dict]:
+    return [serialize_message(message) for message in messages]
+
+
+def deserialize_messages(data: list[dict]) -> list[BaseMessage]:
+    return [deserialize_message(message) for message in data]
+
+
+class CompactionStats(BaseModel):
+    """Cost of one compaction of the chat history"""
+
+    messages: int = 0
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    seconds: float = 0.0
 
 
 class Memory(ABC, BaseModel):
     chat_history: list[BaseMessage] = []
     summary: SystemMessage = SystemMessage(content="")
+    summary_segments: list[str] = []
     max_tokens: int = 32000
     safe_tokens: int = 24000
+    max_summary_tokens: int = 400
+    max_summary_segments: int = 8
     summary_model: BaseChatModel | None = None
+    compactions: list[CompactionStats] = []
+    background_compaction: bool = False
+    token_counter: TokenCounter = Field(default_factory=TiktokenCounter)
+    long_term_memory: LongTermMemory | None = None
+    pending_evicted: list[BaseMessage] = []
+    """Messages evicted from chat_history and not compacted yet. They are stored with
+    the memory and stay here until their compaction succeeds"""
+
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+    _executor: ThreadPoolExecutor | None = PrivateAttr(default=None)
+    _pending_compactions: list[Future] = PrivateAttr(default_factory=list)
+    # Token count of every message in chat_history, in the same order
+    _counted_history: list[BaseMessage] | None = PrivateAttr(default=None)
+    _token_counts: list[int] = PrivateAttr(default_factory=list)
+    _total_tokens: int = PrivateAttr(default=0)
+
+    def _count_tokens(self, text: str) -> int:
+        return self.token_counter.count_text(text)
+
+    def _sync_token_counts(self):
+        """Counts the messages appended since the last call.
+
+        Counts are kept per message, so each message is only tokenized once. If
+        chat_history was replaced by another list everything is counted again.
+        """
+        if (self._counted_history is not self.chat_history
+                or len(self._token_counts) > len(self.chat_history)):
+            self._counted_history = self.chat_history
+            self._token_counts = []
+            self._total_tokens = 0
+        for msg in self.chat_history[len(self._token_counts):]:
+            count = self.token_counter.count_message(msg)
+            self._token_counts.append(count)
+            self._total_tokens += count
+
+    def counted_history(self) -> tuple[list[BaseMessage], list[int]]:
+        """Copy of the chat history with the token count of every message"""
+        with self._lock:
+            self._sync_token_counts()
+            return list(self.chat_history), list(self._token_counts)
+
+    @property
+    def total_tokens(self) -> int:
+        """Tokens taken by the chat history"""
+        with self._lock:
+            self._sync_token_counts()
+            return self._total_tokens
+
+    def _summarize_segments(
+        self, messages_to_summarize: list[BaseMessage]
+    ) -> tuple[list[str], CompactionStats]:
+        """Summary segments with the evicted messages summarized into a new one.
+
+        Only the evicted messages are sent to the model, older text is never re-read.
+        Once there are more than max_summary_segments segments, the oldest half is
+        folded into a single segment, so the summary stays bounded.
+        """
+        start = time.perf_counter()
+        stats = CompactionStats(messages=len(messages_to_summarize))
 
-    def _update_summary(self, messages_to_summarize: list[BaseMessage]):
         # Convert messages to a format suitable for summarization
         text_to_summarize = "\n\n".join(
-            f"<{msg.type}> Message: {msg.content}"
+            f"<{msg.type}> Message: {message_text(msg)}"
             for msg in messages_to_summarize
         )
+        segments = self.summary_segments + [self._summarize_text(text_to_summarize, stats)]
+
+        if len(segments) > self.max_summary_segments:
+            num_folded = (len(segments) + 1) // 2
+            folded = self._summarize_text("\n\n".join(segments[:num_folded]), stats)
+            segments = [folded] + segments[num_folded:]
 
-       # Perform summarization using custom LCEL chain
-        summary = self._summarize_text(text_to_summarize)
-
-        # Update the summary
-        current_summary = self.summary.content
-        if current_summary == "":
-            self.summary.content = f"This is a summary of the older messages in the conversation {
-                summary}"
-        else:
-            final_summary = self._summarize_text(f'''This is a conversation where this is older:\n{
-                current_summary}\n\nAnd this is more recent:\n{summary}''')
-            self.summary.content = f"This is a summary of the older messages in the conversation {
-                final_summary}"
-
-    def _summarize_text(self, text: str) -> str:
+        stats.seconds = time.perf_counter() - start
+        return segments, stats
+
+    def _on_compacted(self, count: int):
+        """Called after the first `count` messages of pending_evicted were compacted,
+        and the new summary (if any) was swapped in"""
+        pass
+
+    def _summarize_text(self, text: str, stats: CompactionStats | None = None) -> str:
         # Prompt for summarization
         summarize_prompt = ChatPromptTemplate.from_template(
             "Summarize the following conversation in a concise manner:\n\n{text}\n\n \
-            Your summary must include details about both the User queries and the Ai responses. Summary:"
+            Your summary must include details about both the User queries and the Ai responses. \
+            Use at most {max_words} words. Summary:"
         )
 
         # LCEL chain for summarization
@@ -50,24 +172,123 @@ class Memory(ABC, BaseModel):
         )
 
         # Run the chain
-        return summarize_chain.invoke({"text": text})
+        summary = summarize_chain.invoke(
+            {"text": text, "max_words": self.max_summary_tokens}
+        )
+        if stats is not None:
+            stats.calls += 1
+            stats.input_tokens += self._count_tokens(text)
+            stats.output_tokens += self._count_tokens(summary)
+        return summary
+
+    @property
+    def _compacts(self) -> bool:
+        """Whether evicted messages are kept, summarized or archived"""
+        return self.summary_model is not None or self.long_term_memory is not None
+
+    def _compact(self):
+        """Summarizes the pending evicted messages and archives them in the long term
+        memory (without a summary_model they are only archived), then drops them
+        from pending_evicted.
+
+        The new summary is swapped in together with that drop, so if the model or
+        the archive fails nothing changes and the messages are compacted again
+        with the next eviction.
+        """
+        with self._lock:
+            evicted = list(self.pending_evicted)
+        if not evicted:
+            return
+        segments = stats = None
+        if self.summary_model is not None:
+            segments, stats = self._summarize_segments(evicted)
+        if self.long_term_memory is not None:
+            self.long_term_memory.add_messages(evicted)
+        # Swap in the new summary at once so readers never see a partial update
+        with self._lock:
+            if segments is not None:
+                self.summary_segments = segments
+                self.summary = SystemMessage(content=SUMMARY_PREFIX + "\n\n".join(segments))
+                self.compactions.append(stats)
+            del self.pending_evicted[:len(evicted)]
+            self._on_compacted(len(evicted))
 
     def _manage_chat_history(self):
-        to_summarize = self._trim_chat_history()
-        if to_summarize:
-            self._update_summary(to_summarize)
+        # Messages left by a failed compaction are retried even without a new eviction
+        evicted = self._trim_chat_history()
+        if not self._compacts or not (evicted or self.pending_evicted):
+            return
+        if not self.background_compaction:
+            self._compact()
+            return
+
+        # Compactions run one at a time, in order, on a single worker thread, each
+        # one takes every message evicted so far. Until one finishes, prompts use
+        # the trimmed history and the previous summary.
+        with self._lock:
+            if not evicted and any(not future.done() for future in self._pending_compactions):
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="memory-compaction")
+            # Failed compactions are kept until flush reports them
+            self._pending_compactions = [
+                future for future in self._pending_compactions
+                if not future.done() or future.exception() is not None
+            ]
+            self._pending_compactions.append(self._executor.submit(self._compact))
+
+    def flush(self, timeout: float | None = None):
+        """Blocks until every submitted background compaction has finished.
+
+        Raises the error of a failed compaction, or an ExceptionGroup with all of
+        them if several failed. Their messages stay in pending_evicted. Raises
+        TimeoutError if compactions are still running after `timeout` seconds.
+        """
+        with self._lock:
+            pending, self._pending_compactions = self._pending_compactions, []
+        done, not_done = wait(pending, timeout=timeout)
+        if not_done:
+            with self._lock:
+                self._pending_compactions = [
+                    future for future in pending if future in not_done or future.exception()
+                ] + self._pending_compactions
+            raise TimeoutError(f"{len(not_done)} compactions still running")
+        errors = [future.exception() for future in pending if future.exception() is not None]
+        if len(errors) == 1:
+            raise errors[0]
+        if errors:
+            raise ExceptionGroup("background compactions failed", errors)
+
+    async def aflush(self):
+        await asyncio.to_thread(self.flush)
+
+    def close(self):
+        """Waits for pending compactions and stops the background worker"""
+        self.flush()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
 
     def _trim_chat_history(self):
-        to_summarize = []
-        total_tokens = sum(len(msg.content.split())
-                           for msg in self.chat_history)
-        if total_tokens < self.max_tokens:
-            return []
-        while total_tokens > self.safe_tokens:
-            oldest_message = self.chat_history.pop(0)
-            total_tokens -= len(oldest_message.content.split())
-            to_summarize.append(oldest_message)
-        return to_summarize
+        with self._lock:
+            self._sync_token_counts()
+            if self._total_tokens < self.max_tokens:
+                return []
+            num_evicted = 0
+            evicted_tokens = 0
+            while (num_evicted < len(self.chat_history)
+                   and self._total_tokens - evicted_tokens > self.safe_tokens):
+                evicted_tokens += self._token_counts[num_evicted]
+                num_evicted += 1
+            to_summarize = self.chat_history[:num_evicted]
+            del self.chat_history[:num_evicted]
+            del self._token_counts[:num_evicted]
+            self._total_tokens -= evicted_tokens
+            if self._compacts:
+                self.pending_evicted.extend(to_summarize)
+            return to_summarize
 
     @abstractmethod
     def add_chat_message(self, message: BaseMessage):
@@ -77,15 +298,26 @@ class Memory(ABC, BaseModel):
     def add_chat_messages(self, messages: list[BaseMessage]):
         pass
 
+    async def aadd_chat_message(self, message: BaseMessage):
+        """Runs add_chat_message in a worker thread, so storage and summarization
+        never block the event loop"""
+        await asyncio.to_thread(self.add_chat_message, message)
+
+    async def aadd_chat_messages(self, messages: list[BaseMessage]):
+        await asyncio.to_thread(self.add_chat_messages, messages)
+
 
 class BasicMemory(Memory):
 
     def add_chat_message(self, message: BaseMessage):
-        self.chat_history.append(message)
+        # Under the lock, a background compaction may be snapshotting the history
+        with self._lock:
+            self.chat_history.append(message)
         self._manage_chat_history()
 
     def add_chat_messages(self, messages: list[BaseMessage]):
-        self.chat_history.extend(messages)
+        with self._lock:
+            self.chat_history.extend(messages)
         self._manage_chat_history()
 
 
@@ -100,36 +332,465 @@ class FileMemory(Memory):
     def _load_memory(self):
         if os.path.exists(self.path):
             with open(self.path, 'r') as f:
-                data = json.load(f)
-                self.chat_history = self._deserialize_messages(
-                    data['chat_history'])
-                self.summary = SystemMessage(content=data['summary'])
+                self._load_data(json.load(f))
+
+    def _load_data(self, data: dict):
+        self.chat_history = self._deserialize_messages(
+            data['chat_history'])
+        self.summary = SystemMessage(content=data['summary'])
+        # Files written before summaries were segmented hold a single summary
+        self.summary_segments = data.get('summary_segments') or (
+            [data['summary'].removeprefix(SUMMARY_PREFIX)] if data['summary'] else [])
+        self.pending_evicted = self._deserialize_messages(
+            data.get('pending_evicted', []))
 
     def _save_memory(self):
-        data = {
-            'chat_history': self._serialize_messages(self.chat_history),
-            'summary': self.summary.content
-        }
-        with open(self.path, 'w') as f:
-            json.dump(data, f)
+        with self._lock:
+            data = {
+                'version': SERIALIZATION_VERSION,
+                'chat_history': self._serialize_messages(self.chat_history),
+                'summary': self.summary.content,
+                'summary_segments': self.summary_segments,
+                'pending_evicted': self._serialize_messages(self.pending_evicted)
+            }
+            with open(self.path, 'w') as f:
+                json.dump(data, f)
+
+    def _on_compacted(self, count: int):
+        self._save_memory()
 
     def _serialize_messages(self, messages: list[BaseMessage]) -> list[dict]:
-        return [{'type': msg.__class__.__name__, 'content': msg.content} for msg in messages]
+        return serialize_messages(messages)
 
     def _deserialize_messages(self, data: list[dict]) -> list[BaseMessage]:
-        message_types = {
-            'HumanMessage': HumanMessage,
-            'AIMessage': AIMessage,
-            'SystemMessage': SystemMessage
-        }
-        return [message_types[msg['type']](content=msg['content']) for msg in data]
+        return deserialize_messages(data)
 
     def add_chat_message(self, message: BaseMessage):
-        self.chat_history.append(message)
-        self._manage_chat_history()
-        self._save_memory()
+        with self._lock:
+            self.chat_history.append(message)
+        try:
+            self._manage_chat_history()
+        finally:
+            self._save_memory()
 
     def add_chat_messages(self, messages: list[BaseMessage]):
-        self.chat_history.extend(messages)
-        self._manage_chat_history()
-        self._save_memory()
+        with self._lock:
+            self.chat_history.extend(messages)
+        try:
+            self._manage_chat_history()
+        finally:
+            self._save_memory()
+
+
+class JournalFileMemory(FileMemory):
+    """
+    FileMemory stored as an append-only journal of JSON lines.
+
+    Every message is appended as one record and trims and summary updates are
+    recorded as small records too, so a turn writes only what changed. Once
+    `compact_every` records follow the last snapshot, the journal is rewritten
+    as a single snapshot record and atomically renamed over the old file.
+    Loading only replays the last snapshot and the records after it. A file written
+    by FileMemory is converted into a snapshot the first time it is opened.
+
+    With fsync_every=N the journal is fsynced every N records, 0 leaves it to the OS.
+    """
+
+    fsync_every: int = 1
+    compact_every: int = 1000
+
+    _journal: Any = PrivateAttr(default=None)
+    # chat_history list and number of its messages already in the journal
+    _journaled_history: list[BaseMessage] | None = PrivateAttr(default=None)
+    _journaled_count: int = PrivateAttr(default=0)
+    _records_since_snapshot: int = PrivateAttr(default=0)
+    _unsynced_records: int = PrivateAttr(default=0)
+
+    def _load_memory(self):
+        self._journaled_history = self.chat_history
+        self._journaled_count = len(self.chat_history)
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        try:
+            legacy = json.loads(data)
+        except ValueError:
+            # A journal of several records, or one with a torn tail
+            legacy = None
+        if isinstance(legacy, dict) and 'op' not in legacy:
+            # Written by FileMemory, rewrite it as a snapshot (atomically, the old
+            # file is only replaced once the snapshot is on disk)
+            self._load_data(legacy)
+            self.compact()
+            return
+
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            # Drop a record left half written by a crash
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+        records = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        start = 0
+        for i in range(len(records) - 1, -1, -1):
+            if records[i].get('op') == 'snapshot':
+                start = i
+                break
+        for record in records[start:]:
+            self._replay(record)
+        self._records_since_snapshot = len(records) - start
+        self._journaled_history = self.chat_history
+        self._journaled_count = len(self.chat_history)
+
+    def _replay(self, record: dict):
+        op = record['op']
+        if op == 'snapshot':
+            self.chat_history = self._deserialize_messages(record['chat_history'])
+        elif op == 'append':
+            self.chat_history.extend(self._deserialize_messages([record['message']]))
+        elif op == 'trim':
+            if self._compacts:
+                self.pending_evicted.extend(self.chat_history[:record['count']])
+            del self.chat_history[:record['count']]
+        if op == 'snapshot':
+            self.pending_evicted = self._deserialize_messages(record.get('pending_evicted', []))
+        elif op == 'summary':
+            # Journals written before compactions were recorded compacted every trim
+            del self.pending_evicted[:record.get('compacted', len(self.pending_evicted))]
+        if op in ('snapshot', 'summary'):
+            self.summary = SystemMessage(content=record['summary'])
+            self.summary_segments = record['summary_segments']
+
+    def _write(self, records: list[dict]):
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self.path, 'a', encoding='utf-8')
+            self._journal.write("".join(json.dumps(record) + "\n" for record in records))
+            self._journal.flush()
+            self._unsynced_records += len(records)
+            if self.fsync_every and self._unsynced_records >= self.fsync_every:
+                os.fsync(self._journal.fileno())
+                self._unsynced_records = 0
+            self._records_since_snapshot += len(records)
+            if self._records_since_snapshot >= self.compact_every:
+                self.compact()
+
+    def _sync_journal(self):
+        """Appends the messages added since the last write.
+        If chat_history was replaced by another list a snapshot is written instead."""
+        with self._lock:
+            if (self._journaled_history is not self.chat_history
+                    or self._journaled_count > len(self.chat_history)):
+                self.compact()
+                return
+            new_messages = self.chat_history[self._journaled_count:]
+            if new_messages:
+                self._journaled_count = len(self.chat_history)
+                self._write([{'op': 'append', 'message': message}
+                             for message in self._serialize_messages(new_messages)])
+
+    def _trim_chat_history(self):
+        with self._lock:
+            self._sync_journal()
+            to_summarize = super()._trim_chat_history()
+            if to_summarize:
+                self._journaled_count -= len(to_summarize)
+                self._write([{'op': 'trim', 'count': len(to_summarize)}])
+            return to_summarize
+
+    def _save_memory(self):
+        self._sync_journal()
+
+    def _on_compacted(self, count: int):
+        with self._lock:
+            self._write([{'op': 'summary',
+                          'summary': self.summary.content,
+                          'summary_segments': self.summary_segments,
+                          'compacted': count}])
+
+    def compact(self):
+        """Rewrites the journal as a single snapshot of the current state"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            record = {
+                'op': 'snapshot',
+                'version': SERIALIZATION_VERSION,
+                'chat_history': self._serialize_messages(self.chat_history),
+                'summary': self.summary.content,
+                'summary_segments': self.summary_segments,
+                'pending_evicted': self._serialize_messages(self.pending_evicted)
+            }
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._journaled_history = self.chat_history
+            self._journaled_count = len(self.chat_history)
+            self._records_since_snapshot = 1
+            self._unsynced_records = 0
+
+    def close(self):
+        """Waits for pending compactions, then syncs and closes the journal"""
+        super().close()
+        with self._lock:
+            self._sync_journal()
+            if self._journal is not None:
+                os.fsync(self._journal.fileno())
+                self._journal.close()
+                self._journal = None
+
+
+class SQLiteMemory(Memory):
+    """
+    Memory of many sessions kept in one SQLite database.
+
+    Every session has a row with its summary and the sequence number where its
+    live chat history starts. Messages are stored with their token counts and
+    are indexed by (session_id, seq), so opening a session only reads the live
+    tail window and reuses the stored counts instead of tokenizing it again.
+    Evicted messages stay in the database as a transcript unless keep_evicted
+    is False, in which case they are deleted once they have been compacted.
+
+    The database runs in WAL mode, so other processes can read sessions while
+    one is being written.
+
+    Example:
+        memory = SQLiteMemory(path="memory_files/memory.db", session_id=user_id,
+                              summary_model=model)
+        memory.prune_sessions(older_than=30 * 24 * 3600)
+    """
+
+    path: str = Field(...,
+                      description="Path to the SQLite database shared by every session")
+    session_id: str = "default"
+    keep_evicted: bool = True
+
+    _connection: sqlite3.Connection | None = PrivateAttr(default=None)
+    # chat_history list and number of its messages already stored
+    _stored_history: list[BaseMessage] | None = PrivateAttr(default=None)
+    _stored_count: int = PrivateAttr(default=0)
+    _window_start: int = PrivateAttr(default=0)
+    # Messages from here to _window_start are pending_evicted
+    _compacted_until: int = PrivateAttr(default=0)
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL DEFAULT '',
+                summary_segments TEXT NOT NULL DEFAULT '[]',
+                window_start INTEGER NOT NULL DEFAULT 0,
+                compacted_until INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            ) WITHOUT ROWID;"""
+        )
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(sessions)")]
+        if "compacted_until" not in columns:
+            # Databases written before compactions were tracked compacted every trim
+            self._connection.execute(
+                "ALTER TABLE sessions ADD COLUMN compacted_until INTEGER NOT NULL DEFAULT 0")
+            self._connection.execute("UPDATE sessions SET compacted_until = window_start")
+        self._connection.commit()
+        self._load_memory()
+
+    def _load_memory(self):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT summary, summary_segments, window_start, compacted_until "
+                "FROM sessions WHERE session_id = ?",
+                (self.session_id,),
+            ).fetchone()
+            if row is None:
+                now = time.time()
+                self._connection.execute(
+                    "INSERT INTO sessions (session_id, created_at, updated_at) VALUES (?, ?, ?)",
+                    (self.session_id, now, now),
+                )
+                self._connection.commit()
+                self._stored_history = self.chat_history
+                self._sync_store()
+                return
+
+            summary, segments, self._window_start, self._compacted_until = row
+            self.summary = SystemMessage(content=summary)
+            self.summary_segments = json.loads(segments)
+            pending = self._connection.execute(
+                "SELECT message FROM messages WHERE session_id = ? AND seq >= ? AND seq < ? "
+                "ORDER BY seq",
+                (self.session_id, self._compacted_until, self._window_start),
+            ).fetchall()
+            self.pending_evicted = deserialize_messages(
+                [json.loads(message) for (message,) in pending])
+            rows = self._connection.execute(
+                "SELECT message, tokens FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq",
+                (self.session_id, self._window_start),
+            ).fetchall()
+            self.chat_history = deserialize_messages([json.loads(message) for message, _ in rows])
+            self._stored_history = self.chat_history
+            self._stored_count = len(self.chat_history)
+            # Reuse the stored counts instead of tokenizing the window again
+            self._counted_history = self.chat_history
+            self._token_counts = [tokens for _, tokens in rows]
+            self._total_tokens = sum(self._token_counts)
+
+    def _sync_store(self):
+        """Inserts the messages added since the last write.
+        If chat_history was replaced by another list the live window is rewritten."""
+        with self._lock:
+            if (self._stored_history is not self.chat_history
+                    or self._stored_count > len(self.chat_history)):
+                self._connection.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND seq >= ?",
+                    (self.session_id, self._window_start),
+                )
+                self._stored_history = self.chat_history
+                self._stored_count = 0
+            new_messages = self.chat_history[self._stored_count:]
+            if not new_messages:
+                self._connection.commit()
+                return
+            self._sync_token_counts()
+            now = time.time()
+            start = self._window_start + self._stored_count
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO messages (session_id, seq, message, tokens, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (self.session_id, start + i, json.dumps(serialize_message(message)),
+                     self._token_counts[self._stored_count + i], now)
+                    for i, message in enumerate(new_messages)
+                ],
+            )
+            self._stored_count = len(self.chat_history)
+            self._touch()
+            self._connection.commit()
+
+    def _trim_chat_history(self):
+        with self._lock:
+            self._sync_store()
+            to_summarize = super()._trim_chat_history()
+            if to_summarize:
+                self._window_start += len(to_summarize)
+                self._stored_count -= len(to_summarize)
+                if not self._compacts:
+                    self._compacted_until = self._window_start
+                    self._delete_compacted()
+                self._touch()
+                self._connection.commit()
+            return to_summarize
+
+    def _delete_compacted(self):
+        if not self.keep_evicted:
+            self._connection.execute(
+                "DELETE FROM messages WHERE session_id = ? AND seq < ?",
+                (self.session_id, self._compacted_until),
+            )
+
+    def _touch(self):
+        self._connection.execute(
+            "UPDATE sessions SET window_start = ?, compacted_until = ?, updated_at = ? "
+            "WHERE session_id = ?",
+            (self._window_start, self._compacted_until, time.time(), self.session_id),
+        )
+
+    def _on_compacted(self, count: int):
+        with self._lock:
+            self._compacted_until += count
+            self._delete_compacted()
+            self._connection.execute(
+                "UPDATE sessions SET summary = ?, summary_segments = ?, compacted_until = ?, "
+                "updated_at = ? WHERE session_id = ?",
+                (self.summary.content, json.dumps(self.summary_segments),
+                 self._compacted_until, time.time(), self.session_id),
+            )
+            self._connection.commit()
+
+    def add_chat_message(self, message: BaseMessage):
+        with self._lock:
+            self.chat_history.append(message)
+        try:
+            self._manage_chat_history()
+        finally:
+            self._sync_store()
+
+    def add_chat_messages(self, messages: list[BaseMessage]):
+        with self._lock:
+            self.chat_history.extend(messages)
+        try:
+            self._manage_chat_history()
+        finally:
+            self._sync_store()
+
+    def transcript(self, limit: int | None = None) -> list[BaseMessage]:
+        """Stored messages of the session including the evicted ones, the last `limit` if given"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (self.session_id, -1 if limit is None else limit),
+            ).fetchall()
+        return deserialize_messages([json.loads(message) for (message,) in reversed(rows)])
+
+    def list_sessions(self) -> list[dict]:
+        """Every session in the database, most recently updated first"""
+        with self._lock:
+            rows = self._connection.execute(
+                """SELECT s.session_id, s.created_at, s.updated_at,
+                          (SELECT COUNT(*) FROM messages m WHERE m.session_id = s.session_id)
+                   FROM sessions s ORDER BY s.updated_at DESC"""
+            ).fetchall()
+        return [
+            {"session_id": session_id, "created_at": created_at,
+             "updated_at": updated_at, "messages": messages}
+            for session_id, created_at, updated_at, messages in rows
+        ]
+
+    def delete_session(self, session_id: str):
+        with self._lock:
+            self._connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._connection.commit()
+
+    def prune_sessions(self, older_than: float) -> int:
+        """Deletes the sessions not updated in the last `older_than` seconds,
+        except the current one. Returns the number of deleted sessions."""
+        cutoff = time.time() - older_than
+        with self._lock:
+            session_ids = [
+                session_id for (session_id,) in self._connection.execute(
+                    "SELECT session_id FROM sessions WHERE updated_at < ? AND session_id != ?",
+                    (cutoff, self.session_id),
+                ).fetchall()
+            ]
+            for session_id in session_ids:
+                self.delete_session(session_id)
+        return len(session_ids)
+
+    def close(self):
+        """Waits for pending compactions, then stores the history and closes the database"""
+        super().close()
+        with self._lock:
+            if self._connection is not None:
+                self._sync_store()
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,142 @@
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages import ToolMessage
+from pydantic import BaseModel, Field
+
+from assistant_core.long_term_memory import RECALL_PREFIX
+from assistant_core.memory import SUMMARY_PREFIX, Memory
+from assistant_core.tokens import TiktokenCounter, TokenCounter, message_text
+
+
+class PromptBreakdown(BaseModel):
+    """Tokens of one prompt by source"""
+
+    system: int = 0
+    summary: int = 0
+    recalled: int = 0
+    history: int = 0
+    tool_results: int = 0
+    elided_tool_results: int = 0
+    """Number of old tool results that were truncated"""
+    dropped_messages: int = 0
+    """Number of history messages left out of the prompt"""
+
+    @property
+    def total(self) -> int:
+        return self.system + self.summary + self.recalled + self.history + self.tool_results
+
+
+class PromptAssembler(BaseModel):
+    """
+    Builds the input messages of a turn within a token budget.
+
+    The last `keep_last_turns` turns (a turn starts at a human message) are sent
+    verbatim. In older turns, tool results longer than `max_tool_result_tokens`
+    are truncated. If the prompt is still over `max_tokens`, the oldest turns are
+    dropped whole, so a tool call is never separated from its result, and then the
+    recalled long term memory. The most recent turns are always kept.
+
+    Turns dropped here are not summarized, use `for_memory` to get a budget that
+    fits all the history a memory keeps.
+    """
+
+    max_tokens: int = 16000
+    keep_last_turns: int = 3
+    max_tool_result_tokens: int = 300
+    token_counter: TokenCounter = Field(default_factory=TiktokenCounter)
+
+    @classmethod
+    def for_memory(cls, memory: Memory, system_prompt: str | None = None, **kwargs) -> "PromptAssembler":
+        """Assembler with a budget for all the memory keeps: the history up to
+        memory.max_tokens, the summary, the recalled turns and the system prompt.
+
+        The memory evicts and compacts the history before it reaches max_tokens, so
+        old turns are only dropped if the summary or the recalled turns run over
+        their own limits. Both are allowed twice their limits, as summary segments
+        are asked for max_summary_tokens words and recalled turns are counted with
+        the token counter of the long term memory.
+        """
+        counter = kwargs.setdefault("token_counter", memory.token_counter)
+        max_tokens = memory.max_tokens
+        if system_prompt:
+            max_tokens += counter.count_text(system_prompt)
+        if memory.summary_model is not None:
+            max_tokens += counter.count_message(SystemMessage(content=SUMMARY_PREFIX))
+            max_tokens += 2 * memory.max_summary_tokens * memory.max_summary_segments
+        if memory.long_term_memory is not None:
+            max_tokens += counter.count_message(SystemMessage(content=RECALL_PREFIX))
+            max_tokens += 2 * memory.long_term_memory.max_tokens
+        return cls(max_tokens=max_tokens, **kwargs)
+
+    def _elide(self, message: ToolMessage, tokens: int) -> tuple[ToolMessage, int]:
+        text = message_text(message)
+        kept = text[: len(text) * self.max_tool_result_tokens // tokens]
+        elided = message.model_copy(update={
+            "content": f"{kept}\n[... {tokens - self.max_tool_result_tokens} tokens of this tool result were elided]"
+        })
+        return elided, self.token_counter.count_message(elided)
+
+    def assemble(
+        self,
+        history: list[BaseMessage],
+        token_counts: list[int] | None = None,
+        system_prompt: str | None = None,
+        summary: SystemMessage | None = None,
+        recalled: SystemMessage | None = None,
+    ) -> tuple[list[BaseMessage], PromptBreakdown]:
+        """Returns the messages to send and their token breakdown.
+
+        Args:
+            history: The chat history.
+            token_counts: Token count of every history message, counted here if not given.
+            system_prompt: Only counted, the agent adds it to the prompt itself.
+            summary: Summary of the evicted messages.
+            recalled: Past turns recalled from the long term memory.
+        """
+        counter = self.token_counter
+        if token_counts is None:
+            token_counts = [counter.count_message(message) for message in history]
+        breakdown = PromptBreakdown(
+            system=counter.count_text(system_prompt) if system_prompt else 0,
+            summary=counter.count_message(summary) if summary else 0,
+            recalled=counter.count_message(recalled) if recalled else 0,
+        )
+
+        turns: list[list[tuple[BaseMessage, int]]] = []
+        for message, tokens in zip(history, token_counts):
+            if not turns and isinstance(message, ToolMessage):
+                # Its tool call was evicted, a result without a call is rejected by most APIs
+                breakdown.dropped_messages += 1
+                continue
+            if isinstance(message, HumanMessage) or not turns:
+                turns.append([])
+            turns[-1].append((message, tokens))
+
+        num_old = max(len(turns) - self.keep_last_turns, 0)
+        old_turns, recent_turns = turns[:num_old], turns[num_old:]
+        for turn in old_turns:
+            for i, (message, tokens) in enumerate(turn):
+                if isinstance(message, ToolMessage) and tokens > self.max_tool_result_tokens:
+                    turn[i] = self._elide(message, tokens)
+                    breakdown.elided_tool_results += 1
+
+        def turn_tokens(turn: list[tuple[BaseMessage, int]]) -> int:
+            return sum(tokens for _, tokens in turn)
+
+        fixed = breakdown.system + breakdown.summary + sum(map(turn_tokens, recent_turns))
+        old_tokens = sum(map(turn_tokens, old_turns))
+        while old_turns and fixed + breakdown.recalled + old_tokens > self.max_tokens:
+            dropped = old_turns.pop(0)
+            old_tokens -= turn_tokens(dropped)
+            breakdown.dropped_messages += len(dropped)
+        if recalled and fixed + breakdown.recalled + old_tokens > self.max_tokens:
+            recalled = None
+            breakdown.recalled = 0
+
+        messages = [message for message in (summary, recalled) if message]
+        for message, tokens in (pair for turn in old_turns + recent_turns for pair in turn):
+            messages.append(message)
+            if isinstance(message, ToolMessage):
+                breakdown.tool_results += tokens
+            else:
+                breakdown.history += tokens
+        return messages, breakdown
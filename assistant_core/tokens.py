@@ -0,0 +1,132 @@
+import json
+import threading
+import warnings
+from abc import ABC, abstractmethod
+from typing import Any
+
+from langchain.chat_models.base import BaseChatModel
+from langchain.schema import AIMessage, BaseMessage
+from pydantic import BaseModel, PrivateAttr
+
+# Loaded encodings, None if one could not be loaded, so it is only attempted once
+_ENCODINGS: dict[str, Any] = {}
+_ENCODINGS_LOCK = threading.Lock()
+
+
+def _load_encoding(name: str, timeout: float) -> Any:
+    """The tiktoken encoding `name`, or None if it cannot be loaded within timeout
+    seconds. tiktoken downloads encodings it has not cached without a timeout, so
+    the download runs in a daemon thread that is abandoned when it takes too long."""
+    with _ENCODINGS_LOCK:
+        if name in _ENCODINGS:
+            return _ENCODINGS[name]
+        result: dict[str, Any] = {}
+
+        def load():
+            try:
+                import tiktoken
+
+                result["encoding"] = tiktoken.get_encoding(name)
+            except Exception as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=load, name=f"tiktoken-{name}", daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if "encoding" in result:
+            _ENCODINGS[name] = result["encoding"]
+        else:
+            reason = result.get("error") or f"not loaded within {timeout} seconds"
+            warnings.warn(f"tiktoken encoding {name} unavailable, counting words: {reason}",
+                          RuntimeWarning, stacklevel=3)
+            _ENCODINGS[name] = None
+        return _ENCODINGS[name]
+
+
+def message_text(message: BaseMessage) -> str:
+    """Text of a message, including the text parts of list (multimodal) content"""
+    if isinstance(message.content, str):
+        return message.content
+    parts = []
+    for part in message.content:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type") == "text":
+            parts.append(part.get("text", ""))
+    return "\n".join(parts)
+
+
+def _count_non_text_parts(message: BaseMessage) -> int:
+    if isinstance(message.content, str):
+        return 0
+    return sum(
+        1
+        for part in message.content
+        if isinstance(part, dict) and part.get("type") != "text"
+    )
+
+
+class TokenCounter(ABC, BaseModel):
+    """Counts the tokens a message takes in the model context window"""
+
+    message_overhead: int = 4
+    """Tokens added per message for the role and separators"""
+    non_text_part_tokens: int = 85
+    """Flat cost of every non-text content part, e.g. an image"""
+
+    @abstractmethod
+    def count_text(self, text: str) -> int:
+        pass
+
+    def count_message(self, message: BaseMessage) -> int:
+        tokens = self.message_overhead + self.count_text(message_text(message))
+        tokens += self.non_text_part_tokens * _count_non_text_parts(message)
+        if isinstance(message, AIMessage) and message.tool_calls:
+            tokens += self.count_text(
+                json.dumps([[call["name"], call["args"]] for call in message.tool_calls])
+            )
+        return tokens
+
+
+class WhitespaceTokenCounter(TokenCounter):
+    """Counts whitespace separated words, a rough estimate used as a fallback"""
+
+    message_overhead: int = 0
+
+    def count_text(self, text: str) -> int:
+        return len(text.split())
+
+
+class TiktokenCounter(TokenCounter):
+    """Counts BPE tokens with tiktoken, falls back to words if the encoding is unavailable.
+
+    The encoding is loaded on the first count, not when the counter is created, and
+    a download that takes longer than load_timeout seconds falls back to words too.
+    """
+
+    encoding: str = "cl100k_base"
+    load_timeout: float = 10.0
+
+    _encoder: Any = PrivateAttr(default=None)
+    _loaded: bool = PrivateAttr(default=False)
+
+    def _get_encoder(self) -> Any:
+        if not self._loaded:
+            self._encoder = _load_encoding(self.encoding, self.load_timeout)
+            self._loaded = True
+        return self._encoder
+
+    def count_text(self, text: str) -> int:
+        encoder = self._get_encoder()
+        if encoder is None:
+            return len(text.split())
+        return len(encoder.encode(text, disallowed_special=()))
+
+
+class ChatModelTokenCounter(TokenCounter):
+    """Counts tokens with the tokenizer of a chat model"""
+
+    model: BaseChatModel
+
+    def count_text(self, text: str) -> int:
+        return self.model.get_num_tokens(text)
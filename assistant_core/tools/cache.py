@@ -0,0 +1,255 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from langchain.tools import BaseTool
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun, CallbackManagerForToolRun
+from pydantic import BaseModel, Field, PrivateAttr
+
+from assistant_core.graph import tool_fingerprint
+
+
+class ToolCacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    seconds: float = 0.0
+    """Time spent running the tool on misses"""
+
+    @property
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+    @property
+    def saved_seconds(self) -> float:
+        """Estimated time saved by the hits, at the average run time"""
+        return self.hits * self.seconds / self.misses if self.misses else 0.0
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    return value
+
+
+def cache_key(tool: BaseTool, args: dict) -> str:
+    """Key of a call built from the tool configuration and its normalized arguments.
+
+    The configuration is the fingerprint used by GraphFactory, so two instances of a
+    tool with different settings (two email accounts) never share results. Settings
+    that are not plain data (a knowledge base) are compared by identity, results of
+    such tools are only reused within one process.
+
+    Arguments are validated with the tool's input schema, so defaults are filled in
+    and types coerced ({"n": "5"} and {} give the same key when n defaults to 5), and
+    whitespace in strings is collapsed.
+    """
+    try:
+        args = tool.get_input_schema().model_validate(args).model_dump()
+    except Exception:
+        pass
+    normalized = json.dumps([tool_fingerprint(tool), _normalize(args)], sort_keys=True, default=str)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _is_error(result: Any) -> bool:
+    # Tools in this package report failures as text instead of raising
+    return isinstance(result, str) and result.startswith(("An error occurred", "Error:"))
+
+
+class ToolResultCache(BaseModel):
+    """
+    LRU cache of tool results shared by CachedTool wrappers.
+
+    Results are kept in memory, at most `max_entries` of them. With a `path` they
+    are also stored in a SQLite database, so they survive restarts and can be
+    shared by several processes. Every entry expires at the TTL of its tool.
+    """
+
+    max_entries: int = 1024
+    path: str | None = None
+    stats: dict[str, ToolCacheStats] = Field(default_factory=dict)
+
+    _entries: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _connection: sqlite3.Connection | None = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        if self.path is None:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS tool_results (
+                key TEXT PRIMARY KEY,
+                tool TEXT NOT NULL,
+                result TEXT NOT NULL,
+                expires_at REAL
+            )"""
+        )
+        self._connection.commit()
+
+    def tool_stats(self, tool_name: str) -> ToolCacheStats:
+        with self._lock:
+            return self.stats.setdefault(tool_name, ToolCacheStats())
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """(True, result) if a live result is cached for the key, else (False, None)"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _, result = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    return True, result
+                del self._entries[key]
+
+            if self._connection is None:
+                return False, None
+            row = self._connection.execute(
+                "SELECT tool, result, expires_at FROM tool_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[2] is not None and row[2] <= now):
+                return False, None
+            result = json.loads(row[1])
+            self._remember(key, row[0], row[2], result)
+            return True, result
+
+    def _remember(self, key: str, tool_name: str, expires_at: float | None, result: Any):
+        self._entries[key] = (expires_at, tool_name, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key: str, tool_name: str, result: Any, ttl_seconds: float | None):
+        expires_at = None if ttl_seconds is None else time.time() + ttl_seconds
+        with self._lock:
+            self._remember(key, tool_name, expires_at, result)
+            if self._connection is None:
+                return
+            try:
+                data = json.dumps(result)
+            except TypeError:
+                return
+            self._connection.execute(
+                "INSERT OR REPLACE INTO tool_results (key, tool, result, expires_at) VALUES (?, ?, ?, ?)",
+                (key, tool_name, data, expires_at),
+            )
+            self._connection.execute(
+                "DELETE FROM tool_results WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            )
+            self._connection.commit()
+
+    def clear(self, tool_name: str | None = None):
+        """Drops every cached result, or only the results of one tool"""
+        with self._lock:
+            if tool_name is None:
+                self._entries.clear()
+            else:
+                for key in [key for key, entry in self._entries.items() if entry[1] == tool_name]:
+                    del self._entries[key]
+            if self._connection is not None:
+                if tool_name is None:
+                    self._connection.execute("DELETE FROM tool_results")
+                else:
+                    self._connection.execute("DELETE FROM tool_results WHERE tool = ?", (tool_name,))
+                self._connection.commit()
+
+
+class CachedTool(BaseTool):
+    """
+    Wraps a tool and reuses its results for calls with the same configuration and
+    normalized arguments.
+
+    The wrapper has the name, description and input schema of the wrapped tool, so
+    the model sees no difference. Results older than `ttl_seconds` are run again,
+    errors are never cached.
+    """
+
+    tool: BaseTool
+    cache: ToolResultCache
+    ttl_seconds: float | None = 300
+
+    def __init__(self, tool: BaseTool, cache: ToolResultCache, ttl_seconds: float | None = 300, **kwargs):
+        super().__init__(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.get_input_schema(),
+            return_direct=tool.return_direct,
+            tool=tool,
+            cache=cache,
+            ttl_seconds=ttl_seconds,
+            **kwargs,
+        )
+
+    def _lookup(self, kwargs: dict) -> tuple[str, bool, Any]:
+        key = cache_key(self.tool, kwargs)
+        found, result = self.cache.get(key)
+        stats = self.cache.tool_stats(self.name)
+        if found:
+            stats.hits += 1
+        return key, found, result
+
+    def _store(self, key: str, result: Any, seconds: float):
+        stats = self.cache.tool_stats(self.name)
+        stats.misses += 1
+        stats.seconds += seconds
+        if not _is_error(result):
+            self.cache.put(key, self.name, result, self.ttl_seconds)
+
+    def _run(self, run_manager: CallbackManagerForToolRun | None = None, **kwargs: Any) -> Any:
+        key, found, result = self._lookup(kwargs)
+        if found:
+            return result
+        start = time.perf_counter()
+        result = self.tool.invoke(kwargs, {"callbacks": run_manager.get_child() if run_manager else None})
+        self._store(key, result, time.perf_counter() - start)
+        return result
+
+    async def _arun(
+        self, run_manager: AsyncCallbackManagerForToolRun | None = None, **kwargs: Any
+    ) -> Any:
+        key, found, result = self._lookup(kwargs)
+        if found:
+            return result
+        start = time.perf_counter()
+        result = await self.tool.ainvoke(
+            kwargs, {"callbacks": run_manager.get_child() if run_manager else None})
+        self._store(key, result, time.perf_counter() - start)
+        return result
+
+
+def cache_tools(
+    tools: list[BaseTool],
+    cache: ToolResultCache | None = None,
+    ttl_seconds: float | None = 300,
+    tool_ttls: dict[str, float | None] | None = None,
+) -> list[BaseTool]:
+    """Wraps every tool in a CachedTool sharing one cache.
+
+    Tools with `cacheable = False` (tools with side effects, like EmailSenderTool)
+    and tools with a TTL of 0 in `tool_ttls` are returned unwrapped.
+    """
+    cache = cache or ToolResultCache()
+    tool_ttls = tool_ttls or {}
+    wrapped = []
+    for tool in tools:
+        ttl = tool_ttls.get(tool.name, ttl_seconds)
+        if getattr(tool, "cacheable", True) is False or ttl == 0:
+            wrapped.append(tool)
+        else:
+            wrapped.append(CachedTool(tool, cache, ttl))
+    return wrapped
@@ -1,13 +1,13 @@
-import imaplib
 import smtplib
 import traceback
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.parser import BytesParser
 from langchain.tools import BaseTool
 from langchain_core.tools.base import BaseToolkit
 from pydantic import Field
 
+from assistant_core.tools.imap import get_mailbox
+
 
 class EmailReaderTool(BaseTool):
     name: str = "email_reader"
@@ -20,56 +20,29 @@ class EmailReaderTool(BaseTool):
     username: str = Field(..., description="Email address")
     password: str = Field(..., description="Email password")
     server: str = Field(..., description="IMAP server address")
+    port: int | None = Field(None, description="IMAP server port, 993 with SSL and 143 without")
+    use_ssl: bool = Field(True, description="Connect with IMAP over SSL")
+    mailbox: str = Field("INBOX", description="Mailbox to read")
+    max_body_bytes: int = Field(16384, description="Bytes of each email body downloaded")
 
     def _run(self, n: int = 5) -> str:
         print(f"\n--- EmailReaderTool: _run started with n={n} ---")
         try:
-            print(f"Connecting to email server: {self.server}...")
-            # Connect to the email server
-            mail = imaplib.IMAP4_SSL(self.server)
-            print(f"Logging in with username: {self.username}...")
-            mail.login(self.username, self.password)
-            print(f"Selecting inbox...")
-            mail.select('inbox')
-
-            print(f"Searching for {n} most recent emails...")
-            # Search for the n most recent emails
-            _, search_data = mail.search(None, 'ALL')
-            msg_ids = search_data[0].split()
-            msg_ids = msg_ids[-n:]  # Get the n most recent email ids
-            print(f"Found {len(msg_ids)} email ids.")
-
-            results = []
-            print(f"Fetching and formatting email contents...")
-            # Fetch and format the contents of the emails
-            for i, msg_id in enumerate(msg_ids):
-                print(f"Fetching email {i+1} of {n}...")
-                _, msg_data = mail.fetch(msg_id, '(RFC822)')
-                raw_email = msg_data[0][1]
-                email_message = BytesParser().parsebytes(raw_email)
-
-                email_content = f"Subject: {email_message['Subject']}\n"
-                email_content += f"From: {email_message['From']}\n"
-                email_content += f"Date: {email_message['Date']}\n\n"
-
-                print(f"Extracting email body...")
-                for part in email_message.walk():
-                    if part.get_content_type() == 'text/plain':
-                        charset = part.get_content_charset()
-                        if charset is None:
-                            charset = 'utf-8'
-                        body = part.get_payload(decode=True).decode(
-                            charset, errors='replace')
-                        email_content += body
-
-                results.append(email_content)
-                print(f"Email {i+1} of {n} processed.")
-
-            print(f"Closing email connection...")
-            mail.close()
-            mail.logout()
-
-            print(f"Returning email contents...")
+            # Connections and already downloaded emails are shared by every
+            # reader of this account, only new emails are fetched
+            mailbox = get_mailbox(
+                self.server,
+                self.username,
+                self.password,
+                port=self.port,
+                use_ssl=self.use_ssl,
+                mailbox=self.mailbox,
+                max_body_bytes=self.max_body_bytes,
+            )
+            print(f"Reading {n} most recent emails from {self.mailbox}...")
+            results = mailbox.recent(n)
+            print(f"Found {len(results)} emails.")
+
             return "\n\n------------------------\n\n".join(results)
 
         except Exception as e:
@@ -100,6 +73,7 @@ class EmailSenderTool(BaseTool):
     password: str = Field(..., description="Sender's email password")
     server: str = Field(..., description="SMTP server address")
     port: int = Field(587, description="SMTP server port")
+    cacheable: bool = Field(False, description="Sending has side effects, results are never cached")
 
     def _run(self, to_email: str, subject: str, body: str) -> str:
         print(
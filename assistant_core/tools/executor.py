@@ -0,0 +1,177 @@
+import asyncio
+import contextvars
+import threading
+import weakref
+from typing import Any, Callable, Sequence
+
+from langchain.tools import BaseTool
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool as create_tool
+from langgraph.prebuilt import ToolNode
+
+
+class ConcurrencyLimit:
+    """Cap on the tool calls running at once, shared by the tools of one node"""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        # One semaphore per event loop, dropped with the loop
+        self._async_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._async_semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+
+class LimitedTool(BaseTool):
+    """
+    Runs a tool with a timeout and within a concurrency limit. It takes the name,
+    schema and tool call handling of the wrapped tool, so a ToolNode runs it as
+    the wrapped tool.
+
+    A timed out sync tool cannot be interrupted, its thread runs to the end in the
+    background and keeps its slot of the limit until then, so hung tools never
+    run more than max_concurrency threads.
+    """
+
+    tool: BaseTool
+    timeout: float | None = None
+    limit: ConcurrencyLimit
+
+    def __init__(self, tool: BaseTool, **kwargs: Any):
+        super().__init__(
+            tool=tool,
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            return_direct=tool.return_direct,
+            **kwargs,
+        )
+
+    @property
+    def args(self) -> dict:
+        return self.tool.args
+
+    @property
+    def tool_call_schema(self) -> Any:
+        return self.tool.tool_call_schema
+
+    def get_input_schema(self, config: RunnableConfig | None = None) -> Any:
+        return self.tool.get_input_schema(config)
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        # Reached through run(), the input was parsed with the schema of the wrapped tool
+        return self.invoke(args[0] if args else kwargs)
+
+    def _runs_in_thread(self) -> bool:
+        """Whether the wrapped tool has no async implementation, its ainvoke would run it in a thread"""
+        if hasattr(self.tool, "coroutine"):
+            return self.tool.coroutine is None
+        return type(self.tool)._arun is BaseTool._arun
+
+    def _timeout_output(self, input: Any) -> Any:
+        content = f"Error: the tool {self.name} did not finish within {self.timeout} seconds."
+        if isinstance(input, dict) and input.get("type") == "tool_call":
+            return ToolMessage(content=content, name=self.name, tool_call_id=input["id"], status="error")
+        return content
+
+    def _invoke_tool(self, input: Any, config: RunnableConfig | None, **kwargs: Any) -> Any:
+        if getattr(self.tool, "func", True) is None and getattr(self.tool, "coroutine", None) is not None:
+            # Async only tool, this runs in a worker thread so it gets its own event loop
+            return asyncio.run(self.tool.ainvoke(input, config, **kwargs))
+        return self.tool.invoke(input, config, **kwargs)
+
+    def invoke(self, input: Any, config: RunnableConfig | None = None, **kwargs: Any) -> Any:
+        self.limit.semaphore.acquire()
+        if self.timeout is None:
+            try:
+                return self._invoke_tool(input, config, **kwargs)
+            finally:
+                self.limit.semaphore.release()
+
+        result: dict[str, Any] = {}
+        context = contextvars.copy_context()
+
+        def target():
+            try:
+                result["output"] = context.run(self._invoke_tool, input, config, **kwargs)
+            except BaseException as e:
+                result["error"] = e
+            finally:
+                # Released when the tool ends, not when the caller stops waiting
+                self.limit.semaphore.release()
+
+        thread = threading.Thread(target=target, name=f"tool-{self.name}", daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        if thread.is_alive():
+            return self._timeout_output(input)
+        if "error" in result:
+            raise result["error"]
+        return result["output"]
+
+    async def ainvoke(self, input: Any, config: RunnableConfig | None = None, **kwargs: Any) -> Any:
+        semaphore = self.limit.async_semaphore()
+        if not self._runs_in_thread():
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(self.tool.ainvoke(input, config, **kwargs), self.timeout)
+                except asyncio.TimeoutError:
+                    return self._timeout_output(input)
+
+        await semaphore.acquire()
+        task = asyncio.ensure_future(asyncio.to_thread(self.tool.invoke, input, config, **kwargs))
+
+        def done(task: asyncio.Future):
+            # Released when the thread ends, not when the caller stops waiting
+            semaphore.release()
+            if not task.cancelled():
+                task.exception()
+
+        task.add_done_callback(done)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            return self._timeout_output(input)
+
+
+class ParallelToolNode(ToolNode):
+    """
+    ToolNode that runs the tool calls of one AI message concurrently, with a
+    timeout per call and a cap on the calls running at once.
+
+    Sync tools run in a thread pool and async tools on the event loop when the
+    graph is run with astream or ainvoke. The cap is shared by every graph run
+    that uses this node, so it also bounds the tool calls of concurrent sessions
+    sharing one graph.
+
+    Every tool is wrapped in a LimitedTool, the calls themselves are made by
+    ToolNode. A call that times out returns an error ToolMessage, so the model can
+    react to it.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool | Callable],
+        *,
+        timeout: float | None = None,
+        tool_timeouts: dict[str, float] | None = None,
+        max_concurrency: int = 8,
+        **kwargs: Any,
+    ):
+        self.timeout = timeout
+        self.tool_timeouts = tool_timeouts or {}
+        self.max_concurrency = max_concurrency
+        self.limit = ConcurrencyLimit(max_concurrency)
+        limited = []
+        for tool in tools:
+            if not isinstance(tool, BaseTool):
+                tool = create_tool(tool)
+            limited.append(LimitedTool(
+                tool, timeout=self.tool_timeouts.get(tool.name, timeout), limit=self.limit))
+        super().__init__(limited, **kwargs)
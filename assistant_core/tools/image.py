@@ -16,6 +16,7 @@ class ImageGenerationTool(BaseTool):
     Returns:
         str: The URL of the generated image.
     """
+    cacheable: bool = False  # Every call generates a new image
 
     def _run(self, prompt: str) -> str:
         try:
@@ -0,0 +1,261 @@
+import imaplib
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from email.parser import BytesParser
+from typing import Iterator
+
+_SEQUENCE_UID = re.compile(rb"(\d+) \(.*?UID (\d+)")
+_UID = re.compile(rb"UID (\d+)")
+_MESSAGE_START = re.compile(rb"^\d+ \(")
+
+HEADER_FIELDS = "SUBJECT FROM DATE MIME-VERSION CONTENT-TYPE CONTENT-TRANSFER-ENCODING"
+
+
+def format_email(raw_email: bytes) -> str:
+    """Subject, sender, date and plain text body of a raw email"""
+    email_message = BytesParser().parsebytes(raw_email)
+
+    email_content = f"Subject: {email_message['Subject']}\n"
+    email_content += f"From: {email_message['From']}\n"
+    email_content += f"Date: {email_message['Date']}\n\n"
+
+    for part in email_message.walk():
+        if part.get_content_type() == 'text/plain':
+            charset = part.get_content_charset()
+            if charset is None:
+                charset = 'utf-8'
+            payload = part.get_payload(decode=True) or b""
+            email_content += payload.decode(charset, errors='replace')
+    return email_content
+
+
+def parse_fetch_response(data: list) -> dict[int, dict[str, bytes]]:
+    """Header and text literals of every message of a UID FETCH response, by UID"""
+    messages: list[dict] = []
+    for item in data:
+        descriptor, literal = item if isinstance(item, tuple) else (item, None)
+        if not isinstance(descriptor, bytes):
+            continue
+        if _MESSAGE_START.match(descriptor) or not messages:
+            messages.append({})
+        current = messages[-1]
+        uid = _UID.search(descriptor)
+        if uid:
+            current["uid"] = int(uid.group(1))
+        if literal is not None:
+            if b"BODY[HEADER" in descriptor:
+                current["header"] = literal
+            elif b"BODY[TEXT]" in descriptor:
+                current["text"] = literal
+    return {message.pop("uid"): message for message in messages if "uid" in message}
+
+
+class IMAPConnectionPool:
+    """
+    Logged in IMAP connections reused across calls.
+
+    At most `max_connections` connections are open at once. A connection idle for
+    more than `keepalive_seconds` is checked with NOOP before it is reused and
+    replaced if the server dropped it. A connection is discarded when anything
+    raises while it is in use, and returned to the pool otherwise.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        username: str,
+        password: str,
+        port: int | None = None,
+        use_ssl: bool = True,
+        max_connections: int = 2,
+        keepalive_seconds: float = 60.0,
+    ):
+        self.server = server
+        self.username = username
+        self.password = password
+        self.port = port or (imaplib.IMAP4_SSL_PORT if use_ssl else imaplib.IMAP4_PORT)
+        self.use_ssl = use_ssl
+        self.keepalive_seconds = keepalive_seconds
+        self.connects = 0
+        self.reuses = 0
+
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._idle: list[tuple[imaplib.IMAP4, float]] = []
+
+    def _connect(self) -> imaplib.IMAP4:
+        connection_class = imaplib.IMAP4_SSL if self.use_ssl else imaplib.IMAP4
+        connection = connection_class(self.server, self.port)
+        try:
+            connection.login(self.username, self.password)
+        except BaseException:
+            self._discard(connection)
+            raise
+        self.connects += 1
+        return connection
+
+    def _take_idle(self) -> imaplib.IMAP4 | None:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, last_used = self._idle.pop()
+            if time.monotonic() - last_used <= self.keepalive_seconds:
+                return connection
+            try:
+                connection.noop()
+                return connection
+            except Exception:
+                self._discard(connection)
+
+    @staticmethod
+    def _discard(connection: imaplib.IMAP4):
+        try:
+            connection.logout()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self) -> Iterator[imaplib.IMAP4]:
+        with self._slots:
+            connection = self._take_idle()
+            if connection is None:
+                connection = self._connect()
+            else:
+                self.reuses += 1
+            try:
+                yield connection
+            except BaseException:
+                # The session may be left in any state (a dropped socket, a half read
+                # response, another mailbox selected), never hand it out again
+                self._discard(connection)
+                raise
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._discard(connection)
+
+
+class IMAPMailbox:
+    """
+    Incrementally synced view of the most recent emails of a mailbox.
+
+    Emails are cached by UID together with the UIDVALIDITY of the mailbox, so a
+    call only downloads the emails it has not seen before (the whole cache is
+    dropped if UIDVALIDITY changes). The UIDs of the n most recent emails come from
+    a FETCH of the last n sequence numbers instead of a SEARCH over the mailbox,
+    and missing emails are downloaded with a single UID FETCH of their headers and
+    the first `max_body_bytes` of their text, with BODY.PEEK so they stay unread.
+    """
+
+    def __init__(
+        self,
+        pool: IMAPConnectionPool,
+        mailbox: str = "INBOX",
+        max_body_bytes: int = 16384,
+        max_cached: int = 500,
+    ):
+        self.pool = pool
+        self.mailbox = mailbox
+        self.max_body_bytes = max_body_bytes
+        self.max_cached = max_cached
+        self.uidvalidity: int | None = None
+        self.last_uid = 0
+        self.fetched = 0
+
+        self._lock = threading.Lock()
+        self._emails: OrderedDict[int, str] = OrderedDict()
+
+    def _fetch(self, connection: imaplib.IMAP4, uids: list[int]) -> None:
+        if self.last_uid and min(uids) > self.last_uid:
+            # Only new emails are missing, ask for the range above the last seen UID
+            uid_set = f"{min(uids)}:*"
+        else:
+            uid_set = ",".join(str(uid) for uid in uids)
+        typ, data = connection.uid(
+            "FETCH",
+            uid_set,
+            f"(UID BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})] BODY.PEEK[TEXT]<0.{self.max_body_bytes}>)",
+        )
+        if typ != "OK":
+            raise Exception(f"Could not fetch emails {uid_set}: {data}")
+        wanted = set(uids)
+        for uid, parts in parse_fetch_response(data).items():
+            if uid in wanted:
+                self._emails[uid] = format_email(parts.get("header", b"") + parts.get("text", b""))
+                self.fetched += 1
+
+    def recent(self, n: int = 5) -> list[str]:
+        """The n most recent emails, oldest first"""
+        with self._lock:
+            try:
+                return self._recent(n)
+            except (imaplib.IMAP4.abort, OSError):
+                # The server may drop a pooled connection at any time, retry once on a new one
+                return self._recent(n)
+
+    def _recent(self, n: int) -> list[str]:
+        with self.pool.connection() as connection:
+            typ, data = connection.select(self.mailbox, readonly=True)
+            if typ != "OK":
+                raise Exception(f"Could not open mailbox {self.mailbox}: {data}")
+            exists = int(data[0])
+            _, uidvalidity = connection.response("UIDVALIDITY")
+            uidvalidity = int(uidvalidity[0]) if uidvalidity and uidvalidity[0] else None
+            if uidvalidity != self.uidvalidity:
+                self._emails.clear()
+                self.last_uid = 0
+                self.uidvalidity = uidvalidity
+            if exists == 0 or n <= 0:
+                return []
+
+            typ, data = connection.fetch(f"{max(1, exists - n + 1)}:{exists}", "(UID)")
+            if typ != "OK":
+                raise Exception(f"Could not list emails: {data}")
+            uids = sorted(
+                int(match.group(2))
+                for item in data if isinstance(item, bytes)
+                for match in [_SEQUENCE_UID.search(item)] if match
+            )
+
+            missing = [uid for uid in uids if uid not in self._emails]
+            if missing:
+                self._fetch(connection, missing)
+            if uids:
+                self.last_uid = max(self.last_uid, uids[-1])
+
+            for uid in uids:
+                if uid in self._emails:
+                    self._emails.move_to_end(uid)
+            while len(self._emails) > self.max_cached:
+                self._emails.popitem(last=False)
+            return [self._emails[uid] for uid in uids if uid in self._emails]
+
+
+_mailboxes: dict[tuple, IMAPMailbox] = {}
+_mailboxes_lock = threading.Lock()
+
+
+def get_mailbox(
+    server: str,
+    username: str,
+    password: str,
+    port: int | None = None,
+    use_ssl: bool = True,
+    mailbox: str = "INBOX",
+    max_body_bytes: int = 16384,
+) -> IMAPMailbox:
+    """Mailbox shared by every tool reading the same account, with its connection pool"""
+    key = (server, port, use_ssl, username, password, mailbox, max_body_bytes)
+    with _mailboxes_lock:
+        if key not in _mailboxes:
+            pool = IMAPConnectionPool(server, username, password, port=port, use_ssl=use_ssl)
+            _mailboxes[key] = IMAPMailbox(pool, mailbox, max_body_bytes)
+        return _mailboxes[key]
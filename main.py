@@ -6,9 +6,10 @@ from langchain_openai import ChatOpenAI
 from langchain_ollama import ChatOllama
 from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
 from assistant_core.assistant import Assistant
-from assistant_core.memory import BasicMemory, FileMemory
+from assistant_core.memory import BasicMemory, FileMemory, SQLiteMemory
+from assistant_core.tools.cache import ToolResultCache, cache_tools
 from assistant_core.tools.email import EmailToolkit
-from assistant_core.knowledge import KnowledgeSearchTool, get_faiss
+from assistant_core.knowledge import KnowledgeSearchTool, get_faiss, load_keyword_index
 from assistant_core.tools.image import ImageGenerationTool
 from testing.test import test_assistant_multiple_tools, test_assistant_single_tool
 from utils.cli import cli_app
@@ -32,6 +33,8 @@ def main():
 
     # knowledge_tool = KnowledgeSearchTool(
     #     knowledge_base=knowledge,
+    #     keyword_index=load_keyword_index("vectors/", "index"),
+    #     mode="hybrid",
     #     description="You use this tool if you want to get information about ReAct framework and AI agents."
     # )
 
@@ -40,6 +43,8 @@ def main():
         # knowledge_tool,
         ImageGenerationTool(),
     ]  # + email_toolkit.get_tools()
+    # Reuse the results of repeated calls, tools with side effects are left uncached
+    tools = cache_tools(tools, ToolResultCache(path="memory_files/tool_cache.db"))
 
     # Setup model
     mistral = ChatMistralAI(model="open-mistral-nemo")
@@ -59,10 +64,11 @@ def main():
     openai = ChatOpenAI(model="gpt-4o-2024-08-06")
     ollama = ChatOllama(model="mistral-nemo", num_predict=1024)
 
-    # # Setup file memory
+    # # Setup memory, one session per run in a shared database
     current_time = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-    file_memory = FileMemory(
-        path="memory_files/" + current_time + ".json",
+    memory = SQLiteMemory(
+        path="memory_files/memory.db",
+        session_id=current_time,
         summary_model=mistral,
         max_tokens=200,
         safe_tokens=150,
@@ -72,7 +78,7 @@ def main():
     assistant = Assistant(
         model=huggingface,
         tools=tools,
-        memory=file_memory,
+        memory=memory,
         description=assistant_description_with_tool_descriptions,
     )
 
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from assistant_core.assistant import Assistant
+from assistant_core.memory import BasicMemory
+from assistant_core.tokens import WhitespaceTokenCounter
+
+
+class FakeLatencyChatModel(BaseChatModel):
+    """Chat model that answers with a fixed text after `latency` seconds"""
+
+    latency: float = 0.5
+    response: str = "This is a fake answer to your question."
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency"
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+
+def new_assistant(model: BaseChatModel) -> Assistant:
+    return Assistant(model=model, memory=BasicMemory(token_counter=WhitespaceTokenCounter()))
+
+
+async def run_session(assistant: Assistant, turns: int, latencies: list[float]):
+    for turn in range(turns):
+        start = time.perf_counter()
+        await assistant.aget_response(f"Question {turn}")
+        latencies.append(time.perf_counter() - start)
+
+
+def report(name: str, turns: int, seconds: float, latencies: list[float]):
+    latencies = sorted(latencies)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(
+        f"{name:<8}{turns:>8}{seconds:>10.2f}{turns / seconds:>12.1f}"
+        f"{statistics.median(latencies):>10.3f}{p95:>10.3f}"
+    )
+
+
+def run_benchmark(sessions: int, turns: int, latency: float, sync_sessions: int):
+    model = FakeLatencyChatModel(latency=latency)
+    print(f"sessions={sessions} turns/session={turns} model latency={latency}s")
+    print(f"{'mode':<8}{'turns':>8}{'seconds':>10}{'turns/s':>12}{'p50 s':>10}{'p95 s':>10}")
+
+    assistants = [new_assistant(model) for _ in range(sync_sessions)]
+    latencies = []
+    start = time.perf_counter()
+    for assistant in assistants:
+        for turn in range(turns):
+            turn_start = time.perf_counter()
+            assistant.get_response(f"Question {turn}")
+            latencies.append(time.perf_counter() - turn_start)
+    report("sync", sync_sessions * turns, time.perf_counter() - start, latencies)
+
+    async def run_all():
+        assistants = [new_assistant(model) for _ in range(sessions)]
+        latencies = []
+        start = time.perf_counter()
+        await asyncio.gather(*(run_session(a, turns, latencies) for a in assistants))
+        report("async", sessions * turns, time.perf_counter() - start, latencies)
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent sessions served by one event loop")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--sync-sessions", type=int, default=4)
+    args = parser.parse_args()
+
+    run_benchmark(args.sessions, args.turns, args.latency, args.sync_sessions)
@@ -0,0 +1,78 @@
+import argparse
+import re
+import threading
+import time
+
+from assistant_core.tools.email import EmailReaderTool
+from testing.fakes import FakeIMAPServer, FakeMailbox
+
+
+def search_all_read(port: int, n: int) -> str:
+    """The previous EmailReaderTool flow: new connection, SEARCH ALL, one RFC822 FETCH per email"""
+    import imaplib
+    from email.parser import BytesParser
+
+    mail = imaplib.IMAP4("127.0.0.1", port)
+    mail.login("user", "password")
+    mail.select("inbox")
+    _, search_data = mail.search(None, "ALL")
+    results = []
+    for msg_id in search_data[0].split()[-n:]:
+        _, msg_data = mail.fetch(msg_id, "(RFC822)")
+        email_message = BytesParser().parsebytes(msg_data[0][1])
+        results.append(f"Subject: {email_message['Subject']}")
+    mail.close()
+    mail.logout()
+    return "\n".join(results)
+
+
+def measure(name: str, mailbox: FakeMailbox, read):
+    commands, sent, connections = sum(mailbox.commands.values()), mailbox.bytes_sent, mailbox.connections
+    start = time.perf_counter()
+    output = read()
+    seconds = time.perf_counter() - start
+    print(
+        f"{name:<28}{seconds * 1000:>10.1f}{mailbox.connections - connections:>8}"
+        f"{sum(mailbox.commands.values()) - commands:>10}{(mailbox.bytes_sent - sent) / 1024:>12.1f}"
+    )
+    return output
+
+
+def run_benchmark(size: int, n: int, body_bytes: int, max_body_bytes: int):
+    mailbox = FakeMailbox(size, body_bytes)
+    server = FakeIMAPServer(mailbox)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    tool = EmailReaderTool(username="user", password="password", server="127.0.0.1", port=port,
+                           use_ssl=False, max_body_bytes=max_body_bytes)
+
+    print(f"mailbox={size} emails, n={n}, body={body_bytes} bytes, max_body_bytes={max_body_bytes}")
+    print(f"{'call':<28}{'ms':>10}{'conns':>8}{'commands':>10}{'KiB sent':>12}")
+    measure("search all + RFC822", mailbox, lambda: search_all_read(port, n))
+    first = measure("pooled, cold", mailbox, lambda: tool._run(n))
+    second = measure("pooled, no new mail", mailbox, lambda: tool._run(n))
+    mailbox.add(2)
+    third = measure("pooled, 2 new emails", mailbox, lambda: tool._run(n))
+    mailbox.uidvalidity += 1
+    fourth = measure("pooled, UIDVALIDITY changed", mailbox, lambda: tool._run(n))
+
+    subjects = lambda output: re.findall(r"Subject: (.*)", output)
+    expected = [f"Message {uid}" for uid in range(size - n + 1, size + 1)]
+    assert subjects(first) == expected, subjects(first)
+    assert first == second
+    assert subjects(third) == [f"Message {uid}" for uid in range(size - n + 3, size + 3)], subjects(third)
+    assert fourth == third
+    assert "Body of message" in first
+    server.shutdown()
+    print("all checks ok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EmailReaderTool against a local fake IMAP server")
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--n", type=int, default=10)
+    parser.add_argument("--body-bytes", type=int, default=50000)
+    parser.add_argument("--max-body-bytes", type=int, default=16384)
+    args = parser.parse_args()
+
+    run_benchmark(args.size, args.n, args.body_bytes, args.max_body_bytes)
@@ -0,0 +1,43 @@
+import argparse
+import asyncio
+import time
+
+from testing.fakes import start_fake_server
+from utils.ollama import OllamaEmbeddings
+
+
+def run_benchmark(num_docs: int, batch_size: int, concurrency: int, latency: float):
+    server = start_fake_server(latency)
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+    texts = [f"chunk number {i} of the benchmark corpus" for i in range(num_docs)]
+
+    embeddings = OllamaEmbeddings(
+        model="fake", host=host, batch_size=batch_size, max_concurrency=concurrency
+    )
+
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    sync_elapsed = time.perf_counter() - start
+    assert len(vectors) == num_docs
+
+    start = time.perf_counter()
+    vectors = asyncio.run(embeddings.aembed_documents(texts))
+    async_elapsed = time.perf_counter() - start
+    assert len(vectors) == num_docs
+
+    server.shutdown()
+
+    print(f"docs={num_docs} batch_size={batch_size} concurrency={concurrency}")
+    print(f"sync:  {num_docs / sync_elapsed:10.1f} docs/sec")
+    print(f"async: {num_docs / async_elapsed:10.1f} docs/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OllamaEmbeddings")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    run_benchmark(args.docs, args.batch_size, args.concurrency, args.latency)
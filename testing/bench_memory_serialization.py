@@ -0,0 +1,85 @@
+import argparse
+import os
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from assistant_core.memory import FileMemory, JournalFileMemory, SQLiteMemory
+from assistant_core.tokens import WhitespaceTokenCounter
+
+
+def synthetic_history(num_messages: int) -> list:
+    """Turns of a human question, a tool call, its result and the final answer"""
+    messages = []
+    i = 0
+    while len(messages) < num_messages:
+        call_id = f"call_{i}"
+        messages.extend(
+            [
+                HumanMessage(content=f"Question {i}: what is in the report about topic {i}?"),
+                AIMessage(
+                    content="",
+                    id=f"run-{i}",
+                    tool_calls=[
+                        {"name": "knowledge_search", "args": {"query": f"topic {i}"}, "id": call_id}
+                    ],
+                    additional_kwargs={"tool_calls": [{"id": call_id, "type": "function"}]},
+                ),
+                ToolMessage(content=f"Result {i}. " * 20, tool_call_id=call_id, name="knowledge_search"),
+                AIMessage(content=f"The report says this about topic {i}. " * 5, id=f"run-{i}-final"),
+            ]
+        )
+        i += 1
+    return messages[:num_messages]
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def run_benchmark(num_messages: int):
+    history = synthetic_history(num_messages)
+    # Large limits so nothing is trimmed or summarized while measuring
+    settings = dict(max_tokens=10**9, safe_tokens=10**9, token_counter=WhitespaceTokenCounter())
+    folder = tempfile.mkdtemp()
+    print(f"messages={num_messages}")
+    print(f"{'backend':<10}{'save s':>10}{'load s':>10}{'size KB':>10}  round trip")
+
+    path = os.path.join(folder, "memory.json")
+    memory = FileMemory(path=path, chat_history=list(history), **settings)
+    save = timed(memory._save_memory)
+    loaded = []
+    load = timed(lambda: loaded.append(FileMemory(path=path, **settings)))
+    report("file", save, load, path, history, loaded[0].chat_history)
+
+    path = os.path.join(folder, "memory.jsonl")
+    memory = JournalFileMemory(path=path, chat_history=list(history), **settings)
+    save = timed(memory.compact)
+    loaded = []
+    load = timed(lambda: loaded.append(JournalFileMemory(path=path, **settings)))
+    report("journal", save, load, path, history, loaded[0].chat_history)
+
+    path = os.path.join(folder, "memory.db")
+    saved = []
+    save = timed(lambda: saved.append(SQLiteMemory(path=path, chat_history=list(history), **settings)))
+    saved[0].close()
+    loaded = []
+    load = timed(lambda: loaded.append(SQLiteMemory(path=path, **settings)))
+    report("sqlite", save, load, path, history, loaded[0].chat_history)
+
+
+def report(name: str, save: float, load: float, path: str, history: list, loaded: list):
+    size = os.path.getsize(path) / 1024
+    lossless = loaded == history
+    print(f"{name:<10}{save:>10.3f}{load:>10.3f}{size:>10.0f}  {'ok' if lossless else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Save and load time of the memory backends")
+    parser.add_argument("--messages", type=int, default=10_000)
+    args = parser.parse_args()
+
+    run_benchmark(args.messages)
@@ -0,0 +1,81 @@
+import argparse
+import time
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from assistant_core._knowledge.numpy_store import NumpyVectorStore
+from assistant_core._knowledge.vector_ops import normalize
+
+
+def synthetic_corpus(
+    num_vectors: int, dim: int, num_clusters: int, seed: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Clustered unit vectors and queries drawn around the same clusters"""
+    rng = np.random.default_rng(seed)
+    centers = normalize(rng.standard_normal((num_clusters, dim)))
+    # Noise with roughly 0.6 of the norm of the centers
+    noise = 0.6 / np.sqrt(dim)
+    labels = rng.integers(num_clusters, size=num_vectors)
+    vectors = normalize(centers[labels] + noise * rng.standard_normal((num_vectors, dim)))
+    query_labels = rng.integers(num_clusters, size=200)
+    queries = normalize(centers[query_labels] + noise * rng.standard_normal((200, dim)))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def build_store(vectors: np.ndarray, mode: str, n_lists: int | None) -> NumpyVectorStore:
+    store = NumpyVectorStore(
+        DeterministicFakeEmbedding(size=vectors.shape[1]), mode=mode, n_lists=n_lists
+    )
+    store.add_embeddings(
+        [""] * len(vectors),
+        vectors,
+        [{} for _ in range(len(vectors))],
+        [str(i) for i in range(len(vectors))],
+    )
+    return store
+
+
+def search_ids(store: NumpyVectorStore, queries: np.ndarray, k: int, **kwargs):
+    start = time.perf_counter()
+    results = [
+        {doc.id for doc, _ in store.similarity_search_with_score_by_vector(q, k, **kwargs)}
+        for q in queries
+    ]
+    latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return results, latency_ms
+
+
+def run_benchmark(num_vectors: int, dim: int, k: int, n_lists: int | None):
+    vectors, queries = synthetic_corpus(num_vectors, dim, num_clusters=64)
+
+    exact = build_store(vectors, "exact", None)
+    truth, exact_latency = search_ids(exact, queries, k)
+
+    ivf = build_store(vectors, "ivf", n_lists)
+    start = time.perf_counter()
+    ivf.train()
+    train_seconds = time.perf_counter() - start
+
+    print(f"vectors={num_vectors} dim={dim} k={k} n_lists={ivf.n_lists}")
+    print(f"ivf training: {train_seconds:.2f}s")
+    print(f"{'mode':<14}{'recall@k':>10}{'ms/query':>12}")
+    print(f"{'exact':<14}{1.0:>10.3f}{exact_latency:>12.3f}")
+
+    for n_probe in (1, 2, 4, 8, 16, 32, 64):
+        if n_probe > ivf.n_lists:
+            break
+        found, latency = search_ids(ivf, queries, k, n_probe=n_probe)
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        print(f"{f'ivf nprobe={n_probe}':<14}{recall:>10.3f}{latency:>12.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall vs latency of NumpyVectorStore")
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=None)
+    args = parser.parse_args()
+
+    run_benchmark(args.vectors, args.dim, args.k, args.n_lists)
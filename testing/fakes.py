@@ -0,0 +1,166 @@
+import hashlib
+import json
+import re
+import socketserver
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.policy import SMTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/embed with deterministic vectors after a fixed latency"""
+
+    latency: float = 0.01
+    dimensions: int = 384
+
+    def log_message(self, format, *args):
+        pass
+
+    def _vector(self, text: str) -> list[float]:
+        digest = hashlib.sha256(text.encode()).digest()
+        return [digest[i % len(digest)] / 255 for i in range(self.dimensions)]
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path != "/api/embed":
+            self.send_error(404)
+            return
+
+        time.sleep(self.latency)
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        payload = json.dumps(
+            {"model": body["model"], "embeddings": [self._vector(t) for t in inputs]}
+        ).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_fake_server(latency: float) -> ThreadingHTTPServer:
+    FakeOllamaHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_email(i: int, body_bytes: int) -> bytes:
+    msg = MIMEMultipart()
+    msg["From"] = f"sender{i}@example.com"
+    msg["To"] = "user@example.com"
+    msg["Subject"] = f"Message {i}"
+    msg["Date"] = "Mon, 01 Jan 2024 10:00:00 +0000"
+    msg.attach(MIMEText(f"Body of message {i}\n" + "x" * body_bytes, "plain"))
+    msg.attach(MIMEText(f"<p>Body of message {i}</p>", "html"))
+    return msg.as_bytes(policy=SMTP)
+
+
+class FakeMailbox:
+    def __init__(self, size: int, body_bytes: int):
+        self.lock = threading.Lock()
+        self.uidvalidity = 1
+        self.body_bytes = body_bytes
+        self.messages: list[tuple[int, bytes]] = []
+        self.next_uid = 1
+        self.connections = 0
+        self.commands: dict[str, int] = {}
+        self.bytes_sent = 0
+        self.add(size)
+
+    def add(self, count: int):
+        with self.lock:
+            for _ in range(count):
+                self.messages.append((self.next_uid, make_email(self.next_uid, self.body_bytes)))
+                self.next_uid += 1
+
+
+def _uid_set(spec: str, highest: int) -> set[int]:
+    uids = set()
+    for part in spec.split(","):
+        if ":" in part:
+            low, high = part.split(":")
+            low = highest if low == "*" else int(low)
+            high = highest if high == "*" else int(high)
+            uids.update(range(min(low, high), max(low, high) + 1))
+        else:
+            uids.add(highest if part == "*" else int(part))
+    return uids
+
+
+class FakeIMAPHandler(socketserver.StreamRequestHandler):
+    """Just enough IMAP4rev1 for imaplib and EmailReaderTool, over plain TCP"""
+
+    def send(self, data: bytes):
+        self.server.mailbox.bytes_sent += len(data)
+        self.wfile.write(data)
+
+    def handle(self):
+        mailbox: FakeMailbox = self.server.mailbox
+        mailbox.connections += 1
+        self.send(b"* OK [CAPABILITY IMAP4rev1] Fake IMAP ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, command, *rest = line.decode().rstrip("\r\n").split(" ", 2)
+            command = command.upper()
+            args = rest[0] if rest else ""
+            if command == "UID":
+                command, _, args = args.partition(" ")
+                command = "UID " + command.upper()
+            mailbox.commands[command] = mailbox.commands.get(command, 0) + 1
+
+            with mailbox.lock:
+                messages = list(mailbox.messages)
+            if command == "CAPABILITY":
+                self.send(b"* CAPABILITY IMAP4rev1\r\n")
+            elif command in ("SELECT", "EXAMINE"):
+                self.send(
+                    f"* {len(messages)} EXISTS\r\n* 0 RECENT\r\n"
+                    f"* OK [UIDVALIDITY {mailbox.uidvalidity}] UIDs valid\r\n"
+                    f"* OK [UIDNEXT {mailbox.next_uid}] Predicted next UID\r\n".encode())
+            elif command == "SEARCH":
+                self.send(b"* SEARCH " + " ".join(str(i + 1) for i in range(len(messages))).encode() + b"\r\n")
+            elif command == "FETCH":
+                spec, items = args.split(" ", 1)
+                for seq in sorted(_uid_set(spec, len(messages))):
+                    uid, raw = messages[seq - 1]
+                    if "RFC822" in items:
+                        self.send(f"* {seq} FETCH (RFC822 {{{len(raw)}}}\r\n".encode() + raw + b")\r\n")
+                    else:
+                        self.send(f"* {seq} FETCH (UID {uid})\r\n".encode())
+            elif command == "UID FETCH":
+                spec, items = args.split(" ", 1)
+                wanted = _uid_set(spec, messages[-1][0] if messages else 0)
+                header_request = re.search(r"BODY\.PEEK\[(HEADER[^\]]*)\]", items)
+                text_request = re.search(r"BODY\.PEEK\[TEXT\]<0\.(\d+)>", items)
+                for seq, (uid, raw) in enumerate(messages, start=1):
+                    if uid not in wanted:
+                        continue
+                    header, _, text = raw.partition(b"\r\n\r\n")
+                    header += b"\r\n\r\n"
+                    response = f"* {seq} FETCH (UID {uid}".encode()
+                    if header_request:
+                        response += f" BODY[{header_request.group(1)}] {{{len(header)}}}\r\n".encode() + header
+                    if text_request:
+                        text = text[:int(text_request.group(1))]
+                        response += f" BODY[TEXT]<0> {{{len(text)}}}\r\n".encode() + text
+                    self.send(response + b")\r\n")
+            elif command == "LOGOUT":
+                self.send(b"* BYE Logging out\r\n" + f"{tag} OK LOGOUT completed\r\n".encode())
+                return
+            self.send(f"{tag} OK {command} completed\r\n".encode())
+
+
+class FakeIMAPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, mailbox: FakeMailbox):
+        super().__init__(("127.0.0.1", 0), FakeIMAPHandler)
+        self.mailbox = mailbox
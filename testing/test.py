@@ -1,3 +1,4 @@
+import functools
 import yaml
 import datetime
 import os
@@ -18,7 +19,9 @@ from utils.system_prompts import (
 )
 
 
+@functools.cache
 def setup_tools():
+    """Built once, so every test assistant gets the same tools and shares one compiled graph"""
     email_toolkit = EmailToolkit(
         username=os.getenv("EMAIL_USERNAME"),
         password=os.getenv("EMAIL_PASSWORD"),
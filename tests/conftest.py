@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Deterministic fake embedding that counts the documents it embeds"""
+
+    embedded: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def counting_embedding() -> CountingEmbedding:
+    return CountingEmbedding(size=16)
+
+
+@pytest.fixture
+def faiss_without_get_by_ids(monkeypatch):
+    """The locked langchain-community FAISS has no get_by_ids"""
+    def get_by_ids(self, ids):
+        raise NotImplementedError
+
+    monkeypatch.setattr(FAISS, "get_by_ids", get_by_ids, raising=False)
+
+
+def write_pdf(path: Path, text: str) -> None:
+    """Writes a one page PDF whose extracted text is `text`"""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(pdf)
+
+
+@pytest.fixture
+def make_pdf():
+    return write_pdf
@@ -0,0 +1,35 @@
+from langchain_core.documents import Document
+
+from assistant_core._knowledge.bm25 import BM25Index
+
+
+def make_index() -> BM25Index:
+    index = BM25Index()
+    index.add_documents(
+        [Document(page_content="graphs of tools"), Document(page_content="• — …")],
+        ids=["words", "symbols"],
+    )
+    return index
+
+
+def test_reloaded_index_deletes_and_replaces_chunks_without_terms(tmp_path):
+    make_index().save_local(str(tmp_path))
+    index = BM25Index.load_local(str(tmp_path))
+
+    index.add_documents([Document(page_content="* * *")], ids=["symbols"])
+    index.delete(["symbols"])
+
+    assert len(index) == 1
+    assert [doc_id for doc_id, _ in index.search("tools")] == ["words"]
+
+
+def test_reloaded_index_matches_the_saved_one(tmp_path):
+    index = make_index()
+    index.save_local(str(tmp_path))
+
+    reloaded = BM25Index.load_local(str(tmp_path))
+    reloaded.delete(["words"])
+    index.delete(["words"])
+
+    assert reloaded._doc_terms == index._doc_terms
+    assert reloaded._total_length == index._total_length == 0
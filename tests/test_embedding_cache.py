@@ -0,0 +1,72 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from assistant_core._knowledge.embedding_cache import CachedEmbeddings
+
+
+class ModelEmbedding(DeterministicFakeEmbedding):
+    """Fake embedding model that records the texts it embeds"""
+
+    model: str = "small"
+    embedded: list[str] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def make_cache(tmp_path, model: str = "small", **kwargs) -> CachedEmbeddings:
+    embedding = ModelEmbedding(size=8, model=model, embedded=[])
+    return CachedEmbeddings(embedding, tmp_path / "embeddings.db", **kwargs)
+
+
+def test_hits_and_misses_count_each_text_once(tmp_path):
+    cache = make_cache(tmp_path)
+
+    first = cache.embed_documents(["a", "b", "a"])
+    second = cache.embed_documents(["b", "c"])
+
+    assert first[0] == first[2]
+    assert cache.embedding.embedded == ["a", "b", "c"]
+    assert (cache.hits, cache.misses) == (2, 3)
+    assert cache.stats["entries"] == 3
+    # Vectors are stored as float32
+    assert second == [pytest.approx(first[1]), pytest.approx(cache.embedding.embed_query("c"))]
+
+
+def test_least_recently_used_vectors_are_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.embed_documents(["a"])
+    cache.embed_documents(["b"])
+    cache.embed_documents(["a"])  # a is now more recent than b
+
+    cache.embed_documents(["c"])
+    assert len(cache) == 2
+    cache.embedding.embedded.clear()
+    cache.embed_documents(["a", "b"])
+
+    assert cache.embedding.embedded == ["b"]
+
+
+def test_vectors_are_reused_after_reopening(tmp_path):
+    cache = make_cache(tmp_path)
+    vectors = cache.embed_documents(["a", "b"])
+    cache.close()
+
+    reopened = make_cache(tmp_path)
+
+    assert reopened.embed_documents(["a", "b"]) == [pytest.approx(vector) for vector in vectors]
+    assert reopened.embedding.embedded == []
+    assert (reopened.hits, reopened.misses) == (2, 0)
+
+
+def test_vectors_are_namespaced_by_model(tmp_path):
+    make_cache(tmp_path, model="small").embed_documents(["a"])
+
+    other = make_cache(tmp_path, model="large")
+    other.embed_documents(["a"])
+
+    assert other.embedding.embedded == ["a"]
+    assert other.misses == 1
+    other.clear()
+    assert len(other) == 1
@@ -0,0 +1,26 @@
+import pytest
+from langchain_openai import ChatOpenAI
+
+from assistant_core.graph import GraphFactory, model_fingerprint
+
+
+def openai(**kwargs) -> ChatOpenAI:
+    return ChatOpenAI(model="gpt-4o-mini", **{"api_key": "key-a", **kwargs})
+
+
+def test_same_configuration_shares_a_key():
+    assert GraphFactory.key(openai(), [], "prompt") == GraphFactory.key(openai(), [], "prompt")
+
+
+@pytest.mark.parametrize("change", [
+    {"api_key": "key-b"},
+    {"base_url": "http://localhost:8000/v1"},
+    {"organization": "org-b"},
+    {"default_headers": {"X-Tenant": "b"}},
+])
+def test_credentials_and_endpoints_are_part_of_the_key(change):
+    assert GraphFactory.key(openai(), [], "prompt") != GraphFactory.key(openai(**change), [], "prompt")
+
+
+def test_secrets_are_hashed_in_the_key_material():
+    assert "key-a" not in str(model_fingerprint(openai()))
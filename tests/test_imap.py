@@ -0,0 +1,55 @@
+import threading
+
+import pytest
+
+from assistant_core.tools.imap import IMAPConnectionPool, IMAPMailbox
+from testing.fakes import FakeIMAPServer, FakeMailbox
+
+
+@pytest.fixture
+def fake_mailbox():
+    mailbox = FakeMailbox(size=20, body_bytes=100)
+    server = FakeIMAPServer(mailbox)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield mailbox, server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def make_pool(port: int, **kwargs) -> IMAPConnectionPool:
+    return IMAPConnectionPool("127.0.0.1", "user", "password", port=port, use_ssl=False, **kwargs)
+
+
+def test_recent_reuses_one_connection_and_prints_nothing(fake_mailbox, capsys):
+    fake_mailbox, port = fake_mailbox
+    pool = make_pool(port)
+    mailbox = IMAPMailbox(pool)
+
+    first = mailbox.recent(3)
+    fake_mailbox.add(1)
+    second = mailbox.recent(3)
+
+    assert [email.splitlines()[0] for email in second] == [
+        "Subject: Message 19", "Subject: Message 20", "Subject: Message 21"]
+    assert second[:2] == first[1:]
+    assert pool.connects == 1 and pool.reuses == 1
+    assert capsys.readouterr().out == ""
+    pool.close()
+
+
+@pytest.mark.parametrize("error", [RuntimeError("Could not fetch emails"), ValueError("bad response")])
+def test_connection_is_discarded_when_anything_raises(fake_mailbox, error):
+    fake_mailbox, port = fake_mailbox
+    pool = make_pool(port, max_connections=1)
+
+    with pytest.raises(type(error)):
+        with pool.connection():
+            raise error
+
+    assert pool._idle == []
+    assert fake_mailbox.commands.get("LOGOUT") == 1
+    # The slot is free again, the next call opens a new connection
+    with pool.connection() as connection:
+        assert connection.noop()[0] == "OK"
+    assert pool.connects == 2
+    pool.close()
@@ -0,0 +1,101 @@
+from typing import Iterator
+
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from assistant_core._knowledge.base import AssistantKnowledge
+
+
+class ListKnowledge(AssistantKnowledge):
+    """Knowledge base over documents held in memory, one list per source"""
+
+    sources: dict[str, str] = {}
+
+    @property
+    def document_lists(self) -> Iterator[list[Document]]:
+        for source, text in self.sources.items():
+            yield [Document(page_content=text, metadata={"source": source})]
+
+
+def stored_texts(knowledge: AssistantKnowledge) -> list[str]:
+    return sorted(doc.page_content for doc in knowledge._stored_documents().values())
+
+
+@pytest.fixture(params=["in_memory", "faiss"])
+def knowledge(request, counting_embedding):
+    embedding = counting_embedding
+    if request.param == "in_memory":
+        vector_db = InMemoryVectorStore(embedding)
+    else:
+        request.getfixturevalue("faiss_without_get_by_ids")
+        vector_db = FAISS.from_texts(["placeholder"], embedding, ids=["placeholder"])
+        vector_db.delete(["placeholder"])
+        embedding.embedded = 0
+    return ListKnowledge(vector_db=vector_db, sources={"a": "alpha text", "b": "beta text"})
+
+
+def test_load_skips_existing_chunks(knowledge):
+    knowledge.load()
+    assert knowledge.stats.embed.chunks == 2
+
+    knowledge.load()
+
+    assert knowledge.stats.embed.chunks == 0
+    assert knowledge.vector_db.embeddings.embedded == 2
+    assert stored_texts(knowledge) == ["alpha text", "beta text"]
+
+
+def test_load_without_skip_existing_replaces_chunks(knowledge):
+    knowledge.load()
+
+    knowledge.load(skip_existing=False)
+
+    assert knowledge.stats.embed.chunks == 2
+    assert knowledge.vector_db.embeddings.embedded == 4
+    assert stored_texts(knowledge) == ["alpha text", "beta text"]
+
+
+def test_load_with_upsert_drops_stale_chunks_of_loaded_sources(knowledge):
+    knowledge.load()
+    knowledge.load_text("other text", source="c")
+    knowledge.sources = {"a": "alpha text changed"}
+
+    knowledge.load(upsert=True)
+
+    assert stored_texts(knowledge) == ["alpha text changed", "beta text", "other text"]
+
+
+def test_load_without_upsert_keeps_stale_chunks(knowledge):
+    knowledge.load()
+    knowledge.sources = {"a": "alpha text changed"}
+
+    knowledge.load()
+
+    assert stored_texts(knowledge) == ["alpha text", "alpha text changed", "beta text"]
+
+
+def test_load_with_recreate_clears_the_store(knowledge):
+    knowledge.load()
+    knowledge.load_text("other text", source="c")
+    knowledge.sources = {"a": "alpha text"}
+
+    knowledge.load(recreate=True)
+
+    assert stored_texts(knowledge) == ["alpha text"]
+    assert knowledge.stats.embed.chunks == 1
+
+
+def test_load_with_upsert_reads_the_store_once(knowledge, monkeypatch):
+    knowledge.sources = {source: f"{source} text" for source in "abcdef"}
+    knowledge.load()
+    knowledge.sources = {source: f"{source} text changed" for source in "abcdef"}
+    reads = []
+    stored_documents = knowledge._stored_documents
+    monkeypatch.setattr(knowledge, "_stored_documents", lambda: reads.append(1) or stored_documents())
+
+    knowledge.load(upsert=True)
+
+    assert len(reads) == 1
+    assert stored_texts(knowledge) == [f"{source} text changed" for source in "abcdef"]
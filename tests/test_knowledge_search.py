@@ -0,0 +1,133 @@
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from assistant_core._knowledge.base import AssistantKnowledge
+from assistant_core._knowledge.bm25 import BM25Index
+from assistant_core._knowledge.embedding_cache import CachedEmbeddings
+from assistant_core._knowledge.query_cache import QueryCache
+from assistant_core.knowledge import KnowledgeSearchTool
+
+
+class AsymmetricEmbedding(DeterministicFakeEmbedding):
+    """Embeds queries and documents into different spaces, like OpenAI v3 or nomic"""
+
+    documents: list[str] = []
+    queries: list[str] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.documents.extend(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        self.queries.append(text)
+        return super().embed_query("query: " + text)
+
+
+TEXTS = [f"document number {i}" for i in range(20)]
+
+
+@pytest.fixture
+def embedding():
+    return AsymmetricEmbedding(size=16, documents=[], queries=[])
+
+
+def make_knowledge(embedding, **kwargs) -> AssistantKnowledge:
+    vector_db = InMemoryVectorStore(embedding)
+    vector_db.add_documents([Document(page_content=text) for text in TEXTS], ids=TEXTS)
+    embedding.documents.clear()
+    return AssistantKnowledge(vector_db=vector_db, num_documents=4, **kwargs)
+
+
+def test_search_many_embeds_queries_like_search(embedding):
+    knowledge = make_knowledge(embedding)
+
+    merged = knowledge.search_many(["document number 3"])
+
+    assert embedding.documents == []
+    assert embedding.queries == ["document number 3"]
+    assert merged == knowledge.search("document number 3")
+
+
+def test_search_many_returns_at_most_num_documents(embedding):
+    knowledge = make_knowledge(embedding)
+    queries = [f"question {i}" for i in range(5)]
+
+    merged = knowledge.search_many(queries, num_documents=3)
+
+    assert len(merged) == 3
+    assert sorted(embedding.queries) == sorted(queries)
+    assert embedding.documents == []
+
+
+def test_search_many_does_not_store_queries_in_the_embedding_cache(embedding, tmp_path):
+    cached = CachedEmbeddings(embedding, str(tmp_path / "embeddings.db"))
+    knowledge = make_knowledge(embedding)
+    knowledge.vector_db.embedding = cached
+
+    knowledge.search_many(["first question", "second question"])
+
+    assert len(cached) == 0
+    assert cached.hits == cached.misses == 0
+
+
+def test_search_many_caches_query_space_vectors(embedding):
+    knowledge = make_knowledge(embedding, query_cache=QueryCache())
+    results = knowledge.search_many(["document number 3"])
+
+    # The semantic level of search() compares query embeddings
+    query_vector = embedding.embed_query("document number 3")
+    assert knowledge.query_cache.get_similar(query_vector, 4) == results
+    knowledge.search("document number 3")
+    assert knowledge.query_cache.stats.exact_hits == 1
+
+
+@pytest.fixture
+def faiss_index(faiss_without_get_by_ids):
+    texts = ["the ReAct framework for agents", "bananas are yellow", "graphs of tools"]
+    documents = [Document(page_content=text) for text in texts]
+    vector_db = FAISS.from_documents(documents, DeterministicFakeEmbedding(size=16), ids=texts)
+    keyword_index = BM25Index()
+    keyword_index.add_documents(documents, ids=texts)
+    return vector_db, keyword_index
+
+
+@pytest.mark.parametrize("mode", ["keyword", "hybrid"])
+def test_knowledge_search_tool_modes_on_faiss(faiss_index, mode):
+    vector_db, keyword_index = faiss_index
+    tool = KnowledgeSearchTool(knowledge_base=vector_db, keyword_index=keyword_index, mode=mode)
+
+    result = tool.invoke({"query": "bananas", "num_documents": 1 if mode == "keyword" else 3})
+
+    assert result.startswith("Document 1:\nbananas are yellow")
+
+
+def test_knowledge_search_tool_keyword_mode_needs_an_index(faiss_index):
+    vector_db, _ = faiss_index
+    tool = KnowledgeSearchTool(knowledge_base=vector_db, mode="keyword")
+
+    assert tool.invoke({"query": "bananas"}) == "An error occurred: No keyword index provided"
+
+
+class BatchedQueryEmbedding(AsymmetricEmbedding):
+    """Asymmetric embedding with a batched query path"""
+
+    query_batches: list[list[str]] = []
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        self.query_batches.append(list(texts))
+        return [self.embed_query(text) for text in texts]
+
+
+def test_search_many_uses_the_batched_query_path(tmp_path):
+    embedding = BatchedQueryEmbedding(size=16, documents=[], queries=[], query_batches=[])
+    knowledge = make_knowledge(embedding)
+    knowledge.vector_db.embedding = CachedEmbeddings(embedding, str(tmp_path / "embeddings.db"))
+
+    merged = knowledge.search_many(["document number 3", "document number 4"])
+
+    assert embedding.query_batches == [["document number 3", "document number 4"]]
+    assert embedding.documents == []
+    assert len(merged) == 4
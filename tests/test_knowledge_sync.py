@@ -0,0 +1,56 @@
+import os
+from pathlib import Path
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from assistant_core.knowledge import get_faiss, load_manifest, sync_faiss
+
+
+@pytest.fixture
+def corpus(tmp_path, make_pdf):
+    data_path = tmp_path / "data"
+    for name in ("a", "b", "c"):
+        make_pdf(data_path / f"{name}.pdf", f"Document {name} talks about topic {name}")
+    return str(data_path), str(tmp_path / "vectors")
+
+
+def sources(db) -> list[str]:
+    return sorted(os.path.basename(doc.metadata["source"]) for doc in db.docstore._dict.values())
+
+
+def test_sync_after_get_faiss_reuses_unchanged_files(corpus, counting_embedding):
+    data_path, vectors_path = corpus
+    db = get_faiss(data_path, vectors_path, embedding=DeterministicFakeEmbedding(size=16))
+    assert sources(db) == ["a.pdf", "b.pdf", "c.pdf"]
+
+    embedding = counting_embedding
+    db = sync_faiss(data_path, vectors_path, embedding=embedding)
+
+    assert embedding.embedded == 0
+    assert db.index.ntotal == 3
+    assert sources(db) == ["a.pdf", "b.pdf", "c.pdf"]
+    assert all(entry["sha256"] for entry in load_manifest(vectors_path, "index").values())
+
+
+def test_sync_after_get_faiss_applies_changes(corpus, make_pdf, counting_embedding):
+    data_path, vectors_path = corpus
+    get_faiss(data_path, vectors_path, embedding=DeterministicFakeEmbedding(size=16))
+    make_pdf(Path(data_path) / "b.pdf", "Document b was rewritten")
+    os.remove(os.path.join(data_path, "c.pdf"))
+    make_pdf(Path(data_path) / "d.pdf", "Document d is new")
+
+    embedding = counting_embedding
+    db = sync_faiss(data_path, vectors_path, embedding=embedding)
+
+    assert embedding.embedded == 2
+    assert db.index.ntotal == 3
+    assert sources(db) == ["a.pdf", "b.pdf", "d.pdf"]
+    contents = sorted(doc.page_content for doc in db.docstore._dict.values())
+    assert "Document b was rewritten" in contents
+
+    # The manifest is complete now, a second sync changes nothing
+    embedding.embedded = 0
+    sync_faiss(data_path, vectors_path, embedding=embedding)
+    assert embedding.embedded == 0
+
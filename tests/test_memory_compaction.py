@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from assistant_core.memory import BasicMemory, FileMemory, JournalFileMemory, SQLiteMemory
+from assistant_core.tokens import WhitespaceTokenCounter
+
+
+class FlakySummaryModel(BaseChatModel):
+    """Fails the first `failures` calls, then answers with a numbered summary"""
+
+    failures: int = 0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "flaky"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError(f"summary call {self.calls} failed")
+        message = AIMessage(content=f"summary {self.calls}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def turn(i: int) -> list:
+    return [HumanMessage(content=f"question {i} " + "word " * 8),
+            AIMessage(content=f"answer {i} " + "word " * 8)]
+
+
+def memory_options(model: BaseChatModel, **kwargs) -> dict:
+    return dict(summary_model=model, max_tokens=60, safe_tokens=30,
+                token_counter=WhitespaceTokenCounter(), **kwargs)
+
+
+def test_failed_compaction_keeps_evicted_messages_and_is_retried():
+    model = FlakySummaryModel(failures=1)
+    memory = BasicMemory(**memory_options(model))
+
+    memory.add_chat_messages(turn(0) + turn(1))
+    with pytest.raises(RuntimeError):
+        memory.add_chat_messages(turn(2))
+    evicted = list(memory.pending_evicted)
+    assert evicted and memory.summary.content == ""
+
+    memory.add_chat_message(HumanMessage(content="short"))
+
+    assert memory.pending_evicted == []
+    assert memory.summary_segments == ["summary 2"]
+    assert memory.compactions[-1].messages == len(evicted)
+
+
+def test_flush_reports_every_failed_background_compaction():
+    model = FlakySummaryModel(failures=2)
+    memory = BasicMemory(**memory_options(model, background_compaction=True))
+
+    # Two evictions, the compaction of each one fails
+    memory.add_chat_messages(turn(0) + turn(1) + turn(2))
+    memory.add_chat_messages(turn(3) + turn(4))
+
+    with pytest.raises(ExceptionGroup) as raised:
+        memory.flush()
+    assert [str(e) for e in raised.value.exceptions] == [
+        "summary call 1 failed", "summary call 2 failed"]
+    memory.flush()  # errors are reported once
+    pending = len(memory.pending_evicted)
+    assert pending > 0
+
+    memory.add_chat_messages(turn(5) + turn(6))
+    memory.flush()
+    assert memory.pending_evicted == []
+    assert memory.summary_segments == ["summary 3"]
+    assert memory.compactions[-1].messages > pending
+    memory.close()
+
+
+@pytest.mark.parametrize("backend", ["file", "journal", "sqlite"])
+def test_pending_messages_survive_a_restart(tmp_path, backend):
+    def open_memory(model):
+        if backend == "file":
+            return FileMemory(path=str(tmp_path / "memory.json"), **memory_options(model))
+        if backend == "journal":
+            return JournalFileMemory(path=str(tmp_path / "memory.jsonl"), **memory_options(model))
+        return SQLiteMemory(path=str(tmp_path / "memory.db"), keep_evicted=False,
+                            **memory_options(model))
+
+    memory = open_memory(FlakySummaryModel(failures=1))
+    with pytest.raises(RuntimeError):
+        memory.add_chat_messages(turn(0) + turn(1) + turn(2))
+    pending = list(memory.pending_evicted)
+    history = list(memory.chat_history)
+    assert pending
+    memory.close()
+
+    model = FlakySummaryModel()
+    memory = open_memory(model)
+    assert memory.pending_evicted == pending
+    assert memory.chat_history == history
+
+    memory.add_chat_messages(turn(3) + turn(4))
+    assert memory.pending_evicted == []
+    assert memory.summary_segments == ["summary 1"]
+    memory.close()
+
+    memory = open_memory(FlakySummaryModel())
+    assert memory.pending_evicted == []
+    assert memory.summary_segments == ["summary 1"]
+    memory.close()
+
+
+@pytest.mark.parametrize("backend", ["basic", "journal", "sqlite"])
+def test_messages_are_appended_under_the_memory_lock(tmp_path, backend):
+    if backend == "basic":
+        memory = BasicMemory(token_counter=WhitespaceTokenCounter())
+    elif backend == "journal":
+        memory = JournalFileMemory(path=str(tmp_path / "memory.jsonl"),
+                                   token_counter=WhitespaceTokenCounter())
+    else:
+        memory = SQLiteMemory(path=str(tmp_path / "memory.db"), token_counter=WhitespaceTokenCounter())
+
+    # A background compaction holding the lock sees no message appended meanwhile
+    with memory._lock:
+        writer = threading.Thread(target=memory.add_chat_message, args=[HumanMessage(content="hi")])
+        writer.start()
+        writer.join(0.2)
+        assert writer.is_alive()
+        assert memory.chat_history == []
+    writer.join()
+
+    assert [message.content for message in memory.chat_history] == ["hi"]
+    memory.close()
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from assistant_core.memory import FileMemory, JournalFileMemory, serialize_messages
+from assistant_core.tokens import WhitespaceTokenCounter
+
+
+def open_journal(path) -> JournalFileMemory:
+    return JournalFileMemory(path=str(path), token_counter=WhitespaceTokenCounter())
+
+
+HISTORY = [HumanMessage(content="hello"), AIMessage(content="hi there")]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_file_memory_files_are_converted_into_a_snapshot(tmp_path, indent):
+    path = tmp_path / "memory.json"
+    legacy = FileMemory(path=str(path), token_counter=WhitespaceTokenCounter())
+    legacy.summary_segments = ["earlier talk"]
+    legacy.add_chat_messages(HISTORY)
+    if indent:
+        path.write_text(json.dumps(json.loads(path.read_text()), indent=indent))
+
+    memory = open_journal(path)
+
+    assert memory.chat_history == HISTORY
+    assert memory.summary_segments == ["earlier talk"]
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["op"] for record in records] == ["snapshot"]
+
+    memory.add_chat_message(HumanMessage(content="again"))
+    memory.close()
+    assert open_journal(path).chat_history == HISTORY + [HumanMessage(content="again")]
+
+
+def test_snapshot_is_found_whatever_the_key_order(tmp_path):
+    path = tmp_path / "memory.jsonl"
+    records = [
+        {"op": "append", "message": {"type": "human", "content": "dropped"}},
+        {"summary": "", "summary_segments": [], "op": "snapshot",
+         "chat_history": serialize_messages(HISTORY)},
+        {"message": {"type": "human", "content": "after"}, "op": "append"},
+    ]
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    memory = open_journal(path)
+
+    assert [message.content for message in memory.chat_history] == ["hello", "hi there", "after"]
+    # Only the snapshot and the records after it are replayed
+    assert memory._records_since_snapshot == 2
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    path = tmp_path / "memory.jsonl"
+    memory = open_journal(path)
+    memory.add_chat_messages(HISTORY)
+    memory.close()
+    with open(path, "a") as f:
+        f.write('{"op": "append", "message": {"type": "hu')
+
+    memory = open_journal(path)
+
+    assert memory.chat_history == HISTORY
+    assert path.read_text().endswith("\n")
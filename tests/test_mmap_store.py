@@ -0,0 +1,41 @@
+import os
+import stat
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from assistant_core._knowledge.mmap_store import MmapVectorStore
+
+TEXTS = ["alpha", "beta", "gamma"]
+
+
+def make_store(path) -> MmapVectorStore:
+    return MmapVectorStore.from_texts(
+        TEXTS, DeterministicFakeEmbedding(size=8), ids=TEXTS, folder_path=str(path))
+
+
+def test_mask_is_mapped_read_only_and_deletes_persist(tmp_path):
+    store = make_store(tmp_path)
+    assert store._mask.mode == "r"
+
+    store.delete(["beta"])
+
+    assert len(store) == 2
+    reopened = MmapVectorStore.load_local(str(tmp_path), DeterministicFakeEmbedding(size=8))
+    assert sorted(reopened.stored_documents()) == ["alpha", "gamma"]
+
+
+@pytest.mark.skipif(os.geteuid() == 0, reason="root ignores file permissions")
+def test_read_only_index_can_be_opened_and_searched(tmp_path):
+    make_store(tmp_path)
+    for path in [*tmp_path.iterdir(), tmp_path]:
+        path.chmod(path.stat().st_mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+    try:
+        store = MmapVectorStore.load_local(str(tmp_path), DeterministicFakeEmbedding(size=8))
+
+        assert [doc.id for doc in store.similarity_search("alpha", k=1)] == ["alpha"]
+        with pytest.raises(PermissionError):
+            store.delete(["alpha"])
+    finally:
+        for path in [tmp_path, *tmp_path.iterdir()]:
+            path.chmod(path.stat().st_mode | stat.S_IWUSR)
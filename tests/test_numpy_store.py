@@ -0,0 +1,49 @@
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from assistant_core._knowledge.mmap_store import MmapVectorStore
+from assistant_core._knowledge.numpy_store import NumpyVectorStore
+
+
+def make_store(texts: list[str], **kwargs) -> NumpyVectorStore:
+    return NumpyVectorStore.from_texts(
+        texts, DeterministicFakeEmbedding(size=8), ids=texts, **kwargs
+    )
+
+
+def test_exact_save_removes_earlier_centroids(tmp_path):
+    ivf = make_store([f"text {i}" for i in range(50)], mode="ivf", n_lists=4)
+    ivf.train()
+    ivf.save_local(str(tmp_path))
+    assert (tmp_path / "index.ivf.npy").exists()
+
+    make_store(["other"], mode="exact").save_local(str(tmp_path))
+
+    assert not (tmp_path / "index.ivf.npy").exists()
+    loaded = NumpyVectorStore.load_local(
+        str(tmp_path), DeterministicFakeEmbedding(size=8), mode="ivf"
+    )
+    assert loaded._centroids is None
+    assert [doc.page_content for doc in loaded.similarity_search("other", k=1)] == ["other"]
+
+
+def test_ivf_save_round_trips_centroids(tmp_path):
+    ivf = make_store([f"text {i}" for i in range(50)], mode="ivf", n_lists=4)
+    ivf.train()
+    ivf.save_local(str(tmp_path))
+
+    loaded = NumpyVectorStore.load_local(
+        str(tmp_path), DeterministicFakeEmbedding(size=8), mode="ivf"
+    )
+
+    np.testing.assert_array_equal(loaded._centroids, ivf._centroids)
+
+
+def test_delete_local_removes_centroids(tmp_path):
+    ivf = make_store([f"text {i}" for i in range(50)], mode="ivf", n_lists=4)
+    ivf.train()
+    ivf.save_local(str(tmp_path))
+
+    MmapVectorStore.delete_local(str(tmp_path))
+
+    assert list(tmp_path.iterdir()) == []
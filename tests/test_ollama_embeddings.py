@@ -0,0 +1,117 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from assistant_core._knowledge.base import AssistantKnowledge
+from assistant_core._knowledge.embedding_cache import CachedEmbeddings
+from testing.fakes import FakeOllamaHandler
+from utils.ollama import OllamaEmbeddings
+
+
+class RecordingOllamaHandler(FakeOllamaHandler):
+    """Fake Ollama that records the batch sizes it receives and can fail the first requests"""
+
+    latency = 0.05
+    dimensions = 8
+    batches: list[int] = []
+    in_flight = 0
+    max_in_flight = 0
+    failures = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cls = type(self)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with cls.lock:
+            if cls.failures:
+                cls.failures -= 1
+                self.send_error(500)
+                return
+            cls.batches.append(len(body["input"]))
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+
+        time.sleep(self.latency)
+        payload = json.dumps(
+            {"model": body["model"], "embeddings": [self._vector(t) for t in body["input"]]}
+        ).encode()
+        with cls.lock:
+            cls.in_flight -= 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def ollama_host():
+    RecordingOllamaHandler.batches = []
+    RecordingOllamaHandler.in_flight = 0
+    RecordingOllamaHandler.max_in_flight = 0
+    RecordingOllamaHandler.failures = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_embed_documents_batches_and_keeps_order(ollama_host):
+    embeddings = OllamaEmbeddings(model="fake", host=ollama_host, batch_size=4)
+    texts = [f"text {i}" for i in range(10)]
+
+    vectors = embeddings.embed_documents(texts)
+
+    assert RecordingOllamaHandler.batches == [4, 4, 2]
+    assert vectors == [embeddings.embed_query(text) for text in texts]
+
+
+def test_aembed_documents_caps_concurrency(ollama_host):
+    embeddings = OllamaEmbeddings(model="fake", host=ollama_host, batch_size=2, max_concurrency=3)
+    texts = [f"text {i}" for i in range(20)]
+
+    start = time.perf_counter()
+    vectors = asyncio.run(embeddings.aembed_documents(texts))
+    elapsed = time.perf_counter() - start
+
+    assert vectors == embeddings.embed_documents(texts)
+    assert sorted(RecordingOllamaHandler.batches[:10]) == [2] * 10
+    assert RecordingOllamaHandler.max_in_flight == 3
+    # 10 batches of 50 ms, 3 at a time
+    assert elapsed < 10 * RecordingOllamaHandler.latency
+
+
+def test_server_errors_are_retried(ollama_host):
+    RecordingOllamaHandler.failures = 2
+    embeddings = OllamaEmbeddings(model="fake", host=ollama_host, retry_backoff=0.01)
+
+    assert len(embeddings.embed_query("hello")) == RecordingOllamaHandler.dimensions
+    assert RecordingOllamaHandler.failures == 0
+
+
+def test_server_errors_are_raised_after_max_retries(ollama_host):
+    RecordingOllamaHandler.failures = 3
+    embeddings = OllamaEmbeddings(model="fake", host=ollama_host, max_retries=1, retry_backoff=0.01)
+
+    with pytest.raises(Exception):
+        embeddings.embed_query("hello")
+
+
+def test_search_many_embeds_its_queries_in_one_request(ollama_host, tmp_path):
+    embeddings = CachedEmbeddings(OllamaEmbeddings(model="fake", host=ollama_host),
+                                  tmp_path / "embeddings.db")
+    vector_db = InMemoryVectorStore(embeddings)
+    vector_db.add_documents([Document(page_content=f"document {i}") for i in range(5)])
+    RecordingOllamaHandler.batches = []
+
+    AssistantKnowledge(vector_db=vector_db).search_many(["first", "second", "third"])
+
+    assert RecordingOllamaHandler.batches == [3]
+    assert len(embeddings) == 5
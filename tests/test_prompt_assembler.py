@@ -0,0 +1,40 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from assistant_core.assistant import Assistant
+from assistant_core.graph import GraphFactory
+from assistant_core.memory import BasicMemory
+from assistant_core.prompt import PromptAssembler
+from assistant_core.tokens import WhitespaceTokenCounter
+
+
+def long_turn(i: int, words: int) -> list:
+    return [HumanMessage(content=f"question {i} " + "word " * words),
+            AIMessage(content=f"answer {i} " + "word " * words)]
+
+
+def test_assistant_sends_the_history_the_memory_has_not_compacted():
+    memory = BasicMemory(token_counter=WhitespaceTokenCounter())
+    for i in range(10):
+        memory.add_chat_messages(long_turn(i, 1000))
+    assert memory.total_tokens > 20000
+    assert memory.total_tokens < memory.max_tokens
+    assistant = Assistant(model=FakeListChatModel(responses=["ok"]), memory=memory,
+                          description="You are a helpful assistant", graph_factory=GraphFactory())
+
+    assistant.get_response("one more question")
+
+    breakdown = assistant.last_prompt_breakdown
+    assert breakdown.dropped_messages == 0
+    assert breakdown.history > 20000
+
+
+def test_for_memory_budget_covers_the_summary_and_recall_limits():
+    counter = WhitespaceTokenCounter()
+    memory = BasicMemory(token_counter=counter, max_tokens=1000, max_summary_tokens=50,
+                         max_summary_segments=4, summary_model=FakeListChatModel(responses=["ok"]))
+    assembler = PromptAssembler.for_memory(memory, system_prompt="be brief")
+
+    assert assembler.token_counter is counter
+    assert 1000 + 2 + 2 * 50 * 4 < assembler.max_tokens < 1500
+    assert PromptAssembler.for_memory(BasicMemory(max_tokens=1000)).max_tokens == 1000
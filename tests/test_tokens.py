@@ -0,0 +1,122 @@
+import sys
+import time
+import types
+import warnings
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from assistant_core import tokens
+from assistant_core.memory import BasicMemory
+from assistant_core.tokens import TiktokenCounter, WhitespaceTokenCounter
+
+
+class CallCountingCounter(WhitespaceTokenCounter):
+    """Counts words and records how many messages it was asked to count"""
+
+    calls: int = 0
+
+    def count_message(self, message):
+        self.calls += 1
+        return super().count_message(message)
+
+
+@pytest.fixture
+def fake_tiktoken(monkeypatch):
+    """Replaces tiktoken with a module whose get_encoding is set by the test"""
+    module = types.ModuleType("tiktoken")
+    monkeypatch.setitem(sys.modules, "tiktoken", module)
+    monkeypatch.setattr(tokens, "_ENCODINGS", {})
+    return module
+
+
+def test_tiktoken_counter_loads_the_encoding_on_first_count(fake_tiktoken):
+    loaded = []
+
+    class Encoding:
+        def encode(self, text, disallowed_special=()):
+            return list(text)
+
+    def get_encoding(name):
+        loaded.append(name)
+        return Encoding()
+
+    fake_tiktoken.get_encoding = get_encoding
+    counter = TiktokenCounter()
+    BasicMemory(token_counter=counter)
+    assert loaded == []
+
+    assert counter.count_text("abc") == 3
+    assert counter.count_text("abcd") == 4
+    assert TiktokenCounter().count_text("ab") == 2
+    assert loaded == ["cl100k_base"]
+
+
+def test_tiktoken_counter_warns_and_counts_words_without_the_encoding(fake_tiktoken, capsys):
+    def get_encoding(name):
+        raise ConnectionError("offline")
+
+    fake_tiktoken.get_encoding = get_encoding
+    counter = TiktokenCounter()
+    with pytest.warns(RuntimeWarning, match="offline"):
+        assert counter.count_text("one two three") == 3
+    assert capsys.readouterr().out == ""
+
+    # The failure is remembered, later counters fall back without retrying
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert TiktokenCounter().count_text("one two") == 2
+
+
+def test_tiktoken_counter_stops_waiting_for_a_slow_download(fake_tiktoken):
+    def get_encoding(name):
+        time.sleep(5)
+
+    fake_tiktoken.get_encoding = get_encoding
+    counter = TiktokenCounter(load_timeout=0.05)
+    start = time.monotonic()
+    with pytest.warns(RuntimeWarning, match="within 0.05 seconds"):
+        assert counter.count_text("one two three") == 3
+    assert time.monotonic() - start < 1
+
+
+def test_list_content_counts_text_parts_and_a_flat_cost_per_other_part():
+    counter = WhitespaceTokenCounter(non_text_part_tokens=85)
+    message = HumanMessage(content=[
+        {"type": "text", "text": "what is in"},
+        "this picture",
+        {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
+        {"type": "image_url", "image_url": {"url": "data:image/png;base64,BBBB"}},
+    ])
+    assert counter.count_message(message) == 5 + 2 * 85
+    assert counter.count_message(HumanMessage(content="what is in this picture")) == 5
+
+
+def test_memory_counts_each_message_once():
+    counter = CallCountingCounter()
+    memory = BasicMemory(token_counter=counter, max_tokens=1000, safe_tokens=500)
+    memory.add_chat_messages([HumanMessage(content="one two"), AIMessage(content="three")])
+    memory.add_chat_message(HumanMessage(content="four five six"))
+    assert memory.total_tokens == 6
+    assert memory.total_tokens == 6
+    assert counter.calls == 3
+
+    # A replaced history is counted again
+    memory.chat_history = [HumanMessage(content="seven")]
+    assert memory.total_tokens == 1
+    assert counter.calls == 4
+
+
+def test_trimming_reuses_the_counts_of_the_kept_messages():
+    counter = CallCountingCounter()
+    memory = BasicMemory(token_counter=counter, max_tokens=20, safe_tokens=10)
+    for i in range(5):
+        memory.add_chat_message(HumanMessage(content=f"message {i} " + "word " * 2))
+    # 5 messages of 4 words reach max_tokens, the oldest ones are evicted
+    assert len(memory.chat_history) == 2
+    assert memory.total_tokens == 8
+    assert counter.calls == 5
+
+    memory.add_chat_message(HumanMessage(content="one more"))
+    assert memory.total_tokens == 10
+    assert counter.calls == 6
@@ -0,0 +1,45 @@
+from langchain.tools import BaseTool
+
+from assistant_core.tools.cache import CachedTool, ToolResultCache, cache_key
+
+runs: list[str] = []
+
+
+class InboxTool(BaseTool):
+    name: str = "inbox"
+    description: str = "Reads the inbox of the account"
+    account: str
+    password: str
+
+    def _run(self, n: int = 5) -> str:
+        runs.append(self.account)
+        return f"{n} emails of {self.account}"
+
+
+def test_differently_configured_tools_do_not_share_results(tmp_path):
+    cache = ToolResultCache(path=str(tmp_path / "tool_cache.db"))
+    alice = CachedTool(InboxTool(account="alice", password="a"), cache)
+    bob = CachedTool(InboxTool(account="bob", password="b"), cache)
+
+    runs.clear()
+
+    assert alice.invoke({"n": 3}) == "3 emails of alice"
+    assert bob.invoke({"n": 3}) == "3 emails of bob"
+    assert alice.invoke({"n": 3}) == "3 emails of alice"
+    assert runs == ["alice", "bob"]
+    assert cache_key(InboxTool(account="alice", password="a"), {"n": 3}) != cache_key(
+        InboxTool(account="alice", password="other"), {"n": 3})
+
+
+def test_results_are_reused_across_restarts_for_the_same_configuration(tmp_path):
+    path = str(tmp_path / "tool_cache.db")
+    CachedTool(InboxTool(account="alice", password="a"), ToolResultCache(path=path)).invoke({"n": 3})
+
+    runs.clear()
+
+    cached = CachedTool(InboxTool(account="alice", password="a"), ToolResultCache(path=path))
+
+    assert cached.invoke({"n": "3"}) == "3 emails of alice"
+    assert runs == []
+    assert CachedTool(InboxTool(account="bob", password="b"), ToolResultCache(path=path)).invoke(
+        {"n": 3}) == "3 emails of bob"
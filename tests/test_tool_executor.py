@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from assistant_core.tools.executor import ParallelToolNode
+
+release = threading.Event()
+
+
+@tool
+def wait(seconds: float) -> str:
+    """Waits a number of seconds"""
+    time.sleep(seconds)
+    return "waited"
+
+
+@tool
+def hang() -> str:
+    """Waits until released"""
+    release.wait(5)
+    return "released"
+
+
+@tool
+async def async_wait(seconds: float) -> str:
+    """Waits a number of seconds on the event loop"""
+    await asyncio.sleep(seconds)
+    return "waited"
+
+
+def calls(*calls: tuple[str, dict]) -> dict:
+    return {"messages": [AIMessage(content="", tool_calls=[
+        {"name": name, "args": args, "id": f"call-{i}"} for i, (name, args) in enumerate(calls)])]}
+
+
+def contents(output: dict) -> list[str]:
+    return [message.content for message in output["messages"]]
+
+
+def test_tool_calls_of_one_message_run_concurrently():
+    node = ParallelToolNode([wait])
+
+    start = time.perf_counter()
+    output = node.invoke(calls(("wait", {"seconds": 0.3}), ("wait", {"seconds": 0.3})))
+
+    assert contents(output) == ["waited", "waited"]
+    assert time.perf_counter() - start < 0.55
+
+
+def test_timed_out_call_returns_an_error_message():
+    node = ParallelToolNode([wait, async_wait], tool_timeouts={"wait": 0.05, "async_wait": 0.05})
+
+    output = node.invoke(calls(("wait", {"seconds": 0.5})))
+    message = output["messages"][0]
+    assert message.status == "error" and message.tool_call_id == "call-0"
+    assert "did not finish within 0.05 seconds" in message.content
+
+    output = asyncio.run(node.ainvoke(calls(("async_wait", {"seconds": 0.5}))))
+    assert "did not finish within 0.05 seconds" in output["messages"][0].content
+
+
+def test_timed_out_call_keeps_its_slot_until_it_ends():
+    release.clear()
+    node = ParallelToolNode([hang, wait], timeout=0.05, max_concurrency=1)
+    node.invoke(calls(("hang", {})))
+
+    done = threading.Event()
+    threading.Thread(target=lambda: (node.invoke(calls(("wait", {"seconds": 0}))), done.set())).start()
+    assert not done.wait(0.2)
+
+    release.set()
+    assert done.wait(1)
+
+
+def test_timed_out_sync_call_keeps_its_async_slot_until_it_ends():
+    release.clear()
+    node = ParallelToolNode([hang, wait], timeout=0.05, max_concurrency=1)
+
+    async def run():
+        output = await node.ainvoke(calls(("hang", {})))
+        assert "did not finish within 0.05 seconds" in output["messages"][0].content
+
+        waiting = asyncio.ensure_future(node.ainvoke(calls(("wait", {"seconds": 0}))))
+        await asyncio.sleep(0.2)
+        assert not waiting.done()
+
+        release.set()
+        output = await asyncio.wait_for(waiting, 1)
+        assert contents(output) == ["waited"]
+
+    asyncio.run(run())
+
+
+def test_run_calls_the_wrapped_tool():
+    node = ParallelToolNode([wait, hang], tool_timeouts={"wait": 0.05})
+
+    assert node.tools_by_name["wait"].run({"seconds": 0}) == "waited"
+    assert "did not finish" in node.tools_by_name["wait"].run({"seconds": 0.5})
+    release.set()
+    assert node.tools_by_name["hang"].run({}) == "released"
+
+
+def test_tools_keep_their_schema():
+    node = ParallelToolNode([wait])
+
+    assert convert_to_openai_tool(node.tools_by_name["wait"]) == convert_to_openai_tool(wait)
@@ -0,0 +1,60 @@
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from assistant_core.assistant import Assistant, TranscriptPolicy
+from assistant_core.graph import GraphFactory
+from assistant_core.memory import BasicMemory
+
+
+class ScriptedModel(BaseChatModel):
+    """Answers with the scripted messages in order"""
+
+    script: list[AIMessage]
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self.script[self.calls]
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@tool
+def clock() -> str:
+    """Tells the time"""
+    return "noon"
+
+
+def call_clock(content: str = "") -> AIMessage:
+    return AIMessage(content=content, tool_calls=[{"name": "clock", "args": {}, "id": "call-1"}])
+
+
+def test_final_mode_skips_messages_that_only_called_tools():
+    policy = TranscriptPolicy(mode="final")
+    answer = AIMessage(content="It is noon")
+    result = ToolMessage(content="noon", tool_call_id="call-1")
+
+    assert policy.select([answer, call_clock(), result, call_clock()]) == [answer]
+    assert policy.select([call_clock(), result]) == []
+    stripped = policy.select([call_clock("Let me check")])
+    assert [(message.content, message.tool_calls) for message in stripped] == [("Let me check", [])]
+
+
+def test_print_response_stores_what_the_policy_keeps():
+    model = ScriptedModel(script=[call_clock(), AIMessage(content="It is noon")])
+    memory = BasicMemory()
+    assistant = Assistant(model=model, memory=memory, tools=[clock],
+                          transcript_policy="compact", graph_factory=GraphFactory())
+
+    assistant.print_response("What time is it?")
+
+    assert [(message.type, message.content) for message in memory.chat_history] == [
+        ("human", "What time is it?"), ("ai", ""), ("tool", "noon"), ("ai", "It is noon")]
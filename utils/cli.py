@@ -16,16 +16,20 @@ def cli_app(assistant: Assistant):
         print("\n" + "="*50 + "\n")  # Add a separator line
 
         try:
-            response = assistant.get_response(user_input)
             print("Assistant: ")
             print("\033[94m" + "-"*50)  # Start blue formatting
 
-            if response.tool_call:
-                print(f"I need to use a tool to answer this question.")
-                print(f"Tool: {response.tool_call}")
-                print("-"*50)
-                # print("\nHere's the result:") # TODO: add the tool response
-            print(response.content)
+            # Print the answer as it is generated
+            for event in assistant.stream(user_input):
+                if event.type == "token":
+                    print(event.content, end="", flush=True)
+                elif event.type == "tool_start":
+                    print(f"\nI need to use a tool to answer this question.")
+                    print(f"Tool: {event.tool_name} {event.tool_args}", flush=True)
+                elif event.type == "tool_end":
+                    print(f"Tool {event.tool_name} finished.")
+                    print("-"*50, flush=True)
+            print()
             print("-"*50 + "\033[0m")  # End blue formatting
         except Exception as e:
             print(
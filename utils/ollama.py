@@ -1,19 +1,36 @@
-from typing import List
+import asyncio
+import time
+from typing import Any, List
 
+import httpx
 from langchain_core.embeddings import Embeddings
-from langchain_core.pydantic_v1 import BaseModel, Extra
-from ollama import AsyncClient, Client
+from langchain_core.pydantic_v1 import BaseModel, Extra, PrivateAttr
+from ollama import AsyncClient, Client, ResponseError
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Transport failures, rate limiting and server errors are worth retrying."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, ResponseError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
 
 
 class OllamaEmbeddings(BaseModel, Embeddings):
     """OllamaEmbeddings embedding model.
 
+    Texts are sent to the ``/api/embed`` endpoint in micro-batches of
+    ``batch_size`` over a single pooled HTTP client. The async path runs up to
+    ``max_concurrency`` batches at a time. Failed requests are retried
+    ``max_retries`` times with exponential backoff.
+
     Example:
         .. code-block:: python
 
-            from langchain_ollama import OllamaEmbeddings
+            from utils.ollama import OllamaEmbeddings
 
-            model = OllamaEmbeddings(model="llama3")
+            embedder = OllamaEmbeddings(model="llama3", batch_size=64)
             embedder.embed_query("what is the place that jonathan worked at?")
     """
 
@@ -21,32 +38,103 @@ class OllamaEmbeddings(BaseModel, Embeddings):
     """Model name to use."""
     host: str = None
     """Host to use."""
+    batch_size: int = 32
+    """Number of texts sent in a single embed request."""
+    max_concurrency: int = 4
+    """Maximum number of batches in flight in the async path."""
+    max_retries: int = 3
+    """Number of times a failed request is retried."""
+    retry_backoff: float = 0.5
+    """Delay in seconds before the first retry, doubled on every attempt."""
+    timeout: float | None = 60.0
+    """Timeout in seconds for a single request."""
+    max_connections: int = 8
+    """Size of the HTTP connection pool."""
+
+    _client: Client | None = PrivateAttr(default=None)
+    _async_client: AsyncClient | None = PrivateAttr(default=None)
+    _async_loop: Any = PrivateAttr(default=None)
 
     class Config:
         """Configuration for this pydantic object."""
 
         extra = Extra.forbid
 
+    def _client_kwargs(self) -> dict:
+        return {
+            "host": self.host,
+            "timeout": self.timeout,
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        }
+
+    @property
+    def client(self) -> Client:
+        """Shared synchronous client, created on first use."""
+        if self._client is None:
+            self._client = Client(**self._client_kwargs())
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncClient:
+        """Shared asynchronous client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = AsyncClient(**self._client_kwargs())
+            self._async_loop = loop
+        return self._async_client
+
+    def _batches(self, texts: List[str]) -> List[List[str]]:
+        size = max(1, self.batch_size)
+        return [texts[i : i + size] for i in range(0, len(texts), size)]
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.embed(self.model, batch)
+                return [list(embedding) for embedding in response["embeddings"]]
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                time.sleep(self.retry_backoff * 2**attempt)
+
+    async def _aembed_batch(
+        self, batch: List[str], semaphore: asyncio.Semaphore
+    ) -> List[List[float]]:
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await self.async_client.embed(self.model, batch)
+                    return [list(embedding) for embedding in response["embeddings"]]
+                except Exception as e:
+                    if attempt == self.max_retries or not _is_retryable(e):
+                        raise
+                    await asyncio.sleep(self.retry_backoff * 2**attempt)
+
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed search docs."""
         embedded_docs = []
-        for doc in texts:
-            embedded_docs.append(
-                list(Client(host=self.host).embeddings(self.model, doc)["embedding"]))
+        for batch in self._batches(texts):
+            embedded_docs.extend(self._embed_batch(batch))
         return embedded_docs
 
     def embed_query(self, text: str) -> List[float]:
         """Embed query text."""
         return self.embed_documents([text])[0]
 
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several query texts in micro-batches, like embed_documents."""
+        return self.embed_documents(texts)
+
     async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed search docs."""
-        embedded_docs = []
-        for doc in texts:
-            embedded_docs.append(
-                list((await AsyncClient(host=self.host).embeddings(self.model, doc))["embedding"])
-            )
-        return embedded_docs
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        results = await asyncio.gather(
+            *(self._aembed_batch(batch, semaphore) for batch in self._batches(texts))
+        )
+        return [embedding for batch in results for embedding in batch]
 
     async def aembed_query(self, text: str) -> List[float]:
         """Embed query text."""